@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Post, Group
+from .models import Job, Post, Group
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -18,5 +18,13 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "payload", "attempts", "failed", "run_after")
+    search_fields = ("name", "key")
+    list_filter = ("name", "failed")
+    empty_value_display = '-пусто-'
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,178 @@
+"""JSON API только для чтения: ленты, профиль, подписки и пост
+с комментариями.
+
+Записи читаются проекциями values() и сериализуются из словарей, без
+создания объектов моделей. Страницы листаются тем же курсором, что и
+HTML-ленты: ?cursor= из полей next и previous ответа. Выгрузка всех
+постов отдаётся потоком, не собирая ответ в памяти."""
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .models import Comment, Group, Post, User
+from .paginator import COMMENTS_PER_PAGE, POSTS_PER_PAGE, KeysetPaginator
+from .timeline import TimelinePaginator
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'author__username', 'group__slug', 'image',
+    'thumbnail', 'comments_count',
+)
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+EXPORT_CHUNK_SIZE = 2000
+
+
+class RowPaginator(KeysetPaginator):
+    """Курсорная навигация по словарям values()."""
+
+    def key_of(self, row):
+        return row[self.date_field], row[self.id_field]
+
+
+class CommentRowPaginator(RowPaginator):
+    date_field = 'created'
+    ascending = True
+
+
+class TimelineRowPaginator(TimelinePaginator):
+
+    def __init__(self, user, per_page):
+        super().__init__(user, per_page)
+        self.queryset = Post.objects.values(*POST_FIELDS)
+
+    def key_of(self, row):
+        return row['pub_date'], row['id']
+
+    def in_bulk(self, pks):
+        return {row['id']: row for row in self.queryset.filter(pk__in=pks)}
+
+
+def post_row(row):
+    image = row['image']
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': default_storage.url(image) if image else None,
+        'thumbnail': row['thumbnail'] or None,
+        'comments_count': row['comments_count'],
+    }
+
+
+def comment_row(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'],
+        'author': row['author__username'],
+    }
+
+
+def page_data(paginator, cursor, serialize):
+    page = paginator.get_page(cursor)
+    return {
+        'results': [serialize(row) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def feed_response(request, paginator):
+    return JsonResponse(
+        page_data(paginator, request.GET.get('cursor'), post_row)
+    )
+
+
+def not_found():
+    return JsonResponse({'detail': 'Не найдено'}, status=404)
+
+
+def posts_values():
+    return Post.objects.values(*POST_FIELDS)
+
+
+def index(request):
+    return feed_response(request, RowPaginator(posts_values()))
+
+
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).values(
+        'id', 'title', 'slug', 'description'
+    ).first()
+    if group is None:
+        return not_found()
+    data = page_data(
+        RowPaginator(posts_values().filter(group_id=group.pop('id'))),
+        request.GET.get('cursor'), post_row,
+    )
+    data['group'] = group
+    return JsonResponse(data)
+
+
+def profile(request, username):
+    author = User.objects.filter(username=username).values(
+        'id', 'username', 'first_name', 'last_name', 'stats__posts_count',
+        'stats__followers_count', 'stats__following_count',
+    ).first()
+    if author is None:
+        return not_found()
+    data = page_data(
+        RowPaginator(posts_values().filter(author_id=author['id'])),
+        request.GET.get('cursor'), post_row,
+    )
+    data['author'] = {
+        'username': author['username'],
+        'full_name': f'{author["first_name"]} {author["last_name"]}'.strip(),
+        'posts_count': author['stats__posts_count'] or 0,
+        'followers_count': author['stats__followers_count'] or 0,
+        'following_count': author['stats__following_count'] or 0,
+    }
+    return JsonResponse(data)
+
+
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Нужна авторизация'}, status=401)
+    if settings.TIMELINE_ENABLED:
+        paginator = TimelineRowPaginator(request.user, POSTS_PER_PAGE)
+    else:
+        # без материализованных лент, как views.follow_index
+        paginator = RowPaginator(posts_values().filter(
+            author__following__user=request.user
+        ))
+    return feed_response(request, paginator)
+
+
+def post_detail(request, post_id):
+    """Пост и первая страница комментариев; следующие страницы -
+    по курсору ?cursor= из comments.next."""
+    row = posts_values().filter(pk=post_id).first()
+    if row is None:
+        return not_found()
+    data = post_row(row)
+    data['comments'] = page_data(
+        CommentRowPaginator(
+            Comment.objects.filter(post_id=post_id).values(*COMMENT_FIELDS),
+            COMMENTS_PER_PAGE,
+        ),
+        request.GET.get('cursor'), comment_row,
+    )
+    return JsonResponse(data)
+
+
+def export_posts(request):
+    """Все посты одним JSON-массивом, потоком по мере чтения из базы."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+    def stream():
+        yield '['
+        rows = posts_values().order_by('id').iterator(EXPORT_CHUNK_SIZE)
+        for number, row in enumerate(rows):
+            yield (',' if number else '') + encoder.encode(post_row(row))
+        yield ']'
+
+    return StreamingHttpResponse(
+        stream(), content_type='application/json; charset=utf-8'
+    )
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import api
+
+
+urlpatterns = [
+    path('posts/', api.index, name='api_index'),
+    path('posts/export/', api.export_posts, name='api_export'),
+    path('posts/<int:post_id>/', api.post_detail, name='api_post'),
+    path('group/<slug:slug>/', api.group_posts, name='api_group'),
+    path('follow/', api.follow_index, name='api_follow'),
+    path('profile/<str:username>/', api.profile, name='api_profile'),
+]
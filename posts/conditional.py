@@ -0,0 +1,68 @@
+"""Условные GET для лент и страницы поста.
+
+Валидаторы берутся из версий областей feed_cache, которые сигналы
+сдвигают при каждом изменении постов, комментариев, групп и подписок.
+Поэтому на If-None-Match / If-Modified-Since страница отвечает 304,
+не выполняя запрос ленты и не рисуя шаблон."""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from yatube import replicas
+
+from . import feed_cache
+
+
+def conditional_page(scopes):
+    """Декоратор вида: scopes(request, **kwargs) возвращает области, от
+    которых зависит страница, или None, если её объекта нет - тогда вид
+    отвечает как обычно."""
+    def page_versions(request, kwargs):
+        # etag_func и last_modified_func вызываются по очереди:
+        # области и версии читаются один раз на запрос
+        if not hasattr(request, '_page_versions'):
+            found = scopes(request, **kwargs)
+            request._page_versions = None if found is None else (
+                feed_cache.versions(feed_cache.GLOBAL, *found)
+            )
+            if request._page_versions is not None:
+                replicas.require_primary_after(
+                    feed_cache.version_time(max(request._page_versions))
+                )
+        return request._page_versions
+
+    def etag(request, **kwargs):
+        versions = page_versions(request, kwargs)
+        if versions is None:
+            return None
+        # страница зависит и от зрителя: имя в меню, токен в формах
+        raw = '|'.join([
+            request.get_full_path(),
+            str(request.user.pk),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+            *(str(version) for version in versions),
+        ])
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        versions = page_versions(request, kwargs)
+        if versions is None:
+            return None
+        return feed_cache.version_time(max(versions))
+
+    def decorator(view):
+        conditional = condition(
+            etag_func=etag, last_modified_func=last_modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            # хранить можно, показывать - только после проверки
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,57 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def change_user_stats(user_id, field, delta):
+    """Атомарно сдвигает счётчик пользователя одним UPDATE.
+
+    Строка счётчиков создаётся только при увеличении: при каскадном
+    удалении пользователя нельзя вставлять строки, ссылающиеся на него."""
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    updated = stats.update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        UserStats.objects.get_or_create(user_id=user_id)
+        stats.update(**{field: F(field) + delta})
+
+
+def change_comments_count(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comments_count__gte=-delta)
+    posts.update(comments_count=F('comments_count') + delta)
+
+
+def follow_changed(user_id, author_id, delta):
+    change_user_stats(author_id, 'followers_count', delta)
+    change_user_stats(user_id, 'following_count', delta)
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+def rebuild_counters():
+    """Пересчитывает все счётчики с нуля по исходным таблицам."""
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=pk) for pk in User.objects.filter(
+                stats__isnull=True
+            ).values_list('pk', flat=True).iterator()
+        ),
+        batch_size=500,
+    )
+    # первичный ключ UserStats совпадает с id пользователя
+    UserStats.objects.update(
+        posts_count=_count(Post.objects, 'author'),
+        followers_count=_count(Follow.objects, 'author'),
+        following_count=_count(Follow.objects, 'user'),
+    )
+    Post.objects.update(comments_count=_count(Comment.objects, 'post'))
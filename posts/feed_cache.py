@@ -0,0 +1,136 @@
+import math
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+GLOBAL = 'all'
+INDEX = 'index'
+
+# Пересчёт заранее: чем дороже фрагмент, тем раньше (XFetch, beta)
+EARLY_BETA = 1.0
+# Сколько ждать фрагмент, который уже рисует другой процесс
+LOCK_TIMEOUT = 5
+LOCK_POLL = 0.05
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def profile_scope(author_id):
+    return f'profile:{author_id}'
+
+
+def follow_scope(user_id):
+    # подписки и подписчики пользователя: счётчики карточки, кнопка
+    return f'follow:{user_id}'
+
+
+def _version_key(scope):
+    return f'feed-version:{scope}'
+
+
+def _fresh_version():
+    # Версия от времени, а не с единицы: если кэш потерял ключ версии,
+    # новая версия не совпадёт ни с одной из уже сохранённых.
+    return time.time_ns() // 1000
+
+
+def versions(*scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _fresh_version(), settings.FEED_VERSION_TIMEOUT)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def invalidate(*scopes):
+    """Сдвигает версии областей: все фрагменты с прежней версией
+    в ключе больше не читаются и вытесняются кэшем сами."""
+    for scope in set(scopes):
+        key = _version_key(scope)
+        # версия растёт до текущего времени: это и метка последнего
+        # изменения области для Last-Modified
+        current = cache.get(key)
+        if current is None:
+            cache.add(key, _fresh_version(), settings.FEED_VERSION_TIMEOUT)
+            continue
+        try:
+            cache.incr(key, max(1, _fresh_version() - current))
+        except ValueError:
+            # ключ вытеснили между get и incr
+            cache.add(key, _fresh_version(), settings.FEED_VERSION_TIMEOUT)
+
+
+def invalidate_post(author_id, *group_ids):
+    """Сбрасывает ленты, в которых показывается пост."""
+    invalidate(
+        INDEX,
+        profile_scope(author_id),
+        *(group_scope(pk) for pk in group_ids if pk),
+    )
+
+
+def version_time(version):
+    """Версия как время последнего изменения области. У области, чья
+    версия заведена при первом чтении, - не раньше настоящего."""
+    return datetime.fromtimestamp(version / 1e6, timezone.utc)
+
+
+def feed_key(kind, scope, cursor_page, **viewer):
+    """Ключ фрагмента ленты: вид ленты, версии её области, курсор
+    страницы и зависящие от зрителя признаки вроде is_author."""
+    version = '.'.join(str(v) for v in versions(GLOBAL, scope))
+    bits = ','.join(f'{name}={viewer[name]}' for name in sorted(viewer))
+    return f'feed:{kind}:{scope}:{version}:{cursor_page.token}:{bits}'
+
+
+def get_or_render(key, render):
+    """Фрагмент из кэша или отрисованный заново, с защитой от давки.
+
+    После сброса версии фрагмент рисует один процесс, взявший
+    блокировку, остальные ждут его результат. Незадолго до истечения
+    срока фрагмент с растущей вероятностью пересчитывается заранее
+    (XFetch), чтобы записи не истекали у всех воркеров одновременно.
+    Снимает блокировку только её владелец: процесс, не дождавшийся
+    фрагмента, рисует его сам, но чужую блокировку не трогает, и
+    блокировка, истёкшая за время долгой отрисовки и взятая другим
+    процессом, тоже остаётся на месте."""
+    entry = cache.get(key)
+    if entry is not None:
+        html, expires, cost = entry
+        early = cost * EARLY_BETA * -math.log(1 - random.random())
+        if time.time() + early < expires:
+            return html
+    lock = f'{key}:lock'
+    token = uuid.uuid4().hex
+    if not cache.add(lock, token, LOCK_TIMEOUT):
+        token = None
+        if entry is not None:
+            return entry[0]
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+    try:
+        started = time.monotonic()
+        html = render()
+        store(key, html, time.monotonic() - started)
+    finally:
+        if token is not None and cache.get(lock) == token:
+            cache.delete(lock)
+    return html
+
+
+def store(key, html, cost):
+    """Кладёт фрагмент, отрисованный за cost секунд."""
+    timeout = settings.FEED_CACHE_TIMEOUT
+    cache.set(key, (html, time.time() + timeout, cost), timeout)
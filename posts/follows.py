@@ -0,0 +1,54 @@
+"""Подписки одним запросом на запись.
+
+INSERT ... ON CONFLICT DO NOTHING и DELETE опираются на уникальность
+пары (user, author) и сообщают числом строк, изменилось ли что-нибудь.
+Двойной клик или два параллельных запроса не создают вторую подписку
+и не сдвигают счётчики дважды: следствия подписки применяются только
+тем запросом, который действительно вставил или удалил строку."""
+from django.db import connection, transaction
+
+from . import counters, feed_cache, timeline
+from .models import Follow
+
+
+def follow_changed(user_id, author_id, delta):
+    """Счётчики, лента подписчика и версии страниц после подписки
+    (delta = 1) или отписки (delta = -1)."""
+    counters.follow_changed(user_id, author_id, delta)
+    if delta > 0:
+        timeline.backfill(user_id, author_id)
+    else:
+        timeline.trim(user_id, author_id)
+    feed_cache.invalidate(
+        feed_cache.follow_scope(user_id), feed_cache.follow_scope(author_id)
+    )
+
+
+def _write(sql, user_id, author_id, delta):
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, (user_id, author_id))
+            changed = cursor.rowcount == 1
+        if changed:
+            follow_changed(user_id, author_id, delta)
+    return changed
+
+
+def follow(user_id, author_id):
+    """Подписывает, если подписки ещё нет. True, если она появилась."""
+    if user_id == author_id:
+        return False
+    return _write(
+        f'INSERT INTO {Follow._meta.db_table} (user_id, author_id) '
+        'VALUES (%s, %s) ON CONFLICT DO NOTHING',
+        user_id, author_id, 1,
+    )
+
+
+def unfollow(user_id, author_id):
+    """Отписывает. True, если подписка была."""
+    return _write(
+        f'DELETE FROM {Follow._meta.db_table} '
+        'WHERE user_id = %s AND author_id = %s',
+        user_id, author_id, -1,
+    )
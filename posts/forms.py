@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images
 from .models import Post, Comment
 
 
@@ -18,6 +20,19 @@ class PostForm(forms.ModelForm):
             'text': 'Добавьте текст для новой записи'
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # от слишком большой загрузки на диске лишь начало файла:
+        # ImageField отклонил бы его как битую картинку, поэтому файл
+        # не разбирается, а clean_image сообщает о размере
+        self.oversized = None
+        name = self.add_prefix('image')
+        upload = self.files.get(name)
+        if isinstance(upload, UploadedFile) and images.is_too_large(upload):
+            self.files = self.files.copy()
+            del self.files[name]
+            self.oversized = upload
+
     def clean_text(self):
         text = self.cleaned_data['text']
         if text == '':
@@ -26,6 +41,25 @@ class PostForm(forms.ModelForm):
             ) 
         return text
 
+    def clean_image(self):
+        if self.oversized is not None:
+            images.check_size(self.oversized)
+        image = self.cleaned_data['image']
+        # новая загрузка, а не уже сохранённая картинка поста
+        if isinstance(image, UploadedFile):
+            images.check_limits(image)
+            self.renditions = images.render(image)
+            return self.renditions[images.FULL]
+        return image
+
+    def save(self, commit=True):
+        renditions = getattr(self, 'renditions', None)
+        if renditions:
+            self.instance.thumbnail = images.save_thumbnail(
+                renditions[images.FEED]
+            )
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
 
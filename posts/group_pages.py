@@ -0,0 +1,121 @@
+"""Группы по slug без запроса и заранее отрисованные первые страницы
+их лент.
+
+Карта slug -> группа хранится в кэше целиком и привязана к версии
+области GLOBAL, которую сдвигает любое изменение групп, поэтому вид
+группы находит её без обращения к базе.
+
+Первые GROUP_HOT_PAGES страниц ленты группы рисует фоновая задача после
+каждого изменения постов группы: создания, правки, удаления, переноса
+в другую группу, комментария, готовой миниатюры. Задача читает ленту
+одним запросом, раскладывает её по страницам тем же курсором, что и
+вид, и кладёт фрагменты под ключами feed_cache.feed_key текущей версии
+- читатели популярных групп не ждут отрисовки после сброса версии.
+Снимок страниц (их строки и HTML) хранится в кэше: страница, строки
+которой не изменились, не перерисовывается, а переносится под новую
+версию как есть. Без очереди задач страницы рисуются при чтении."""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from . import feed_cache, jobs
+from .models import Group, Post
+from .paginator import NEXT, POSTS_PER_PAGE, KeysetPaginator
+
+PAGE_TEMPLATE = 'includes/feed_page.html'
+
+
+def _group_map():
+    version = feed_cache.versions(feed_cache.GLOBAL)[0]
+    key = f'group-map:{version}'
+    groups = cache.get(key)
+    if groups is None:
+        groups = {
+            row['slug']: row for row in Group.objects.values(
+                'id', 'title', 'slug', 'description'
+            )
+        }
+        cache.set(key, groups, settings.FEED_CACHE_TIMEOUT)
+    return groups
+
+
+def get_group(slug):
+    """Группа по slug из кэшированной карты или None."""
+    row = _group_map().get(slug)
+    return None if row is None else Group(**row)
+
+
+class SnapshotPaginator(KeysetPaginator):
+    """Курсор по уже прочитанным строкам ленты, без запросов."""
+
+    def __init__(self, rows, per_page=POSTS_PER_PAGE):
+        super().__init__(None, per_page)
+        self.rows = rows
+
+    def fetch(self, direction, key, limit):
+        assert direction == NEXT
+        return [
+            row for row in self.rows
+            if key is None or self.key_of(row) < key
+        ][:limit]
+
+
+def _signature(rows, has_next):
+    """Всё, что карточки страницы и её переключатель берут из строк."""
+    return has_next, [
+        (
+            post.pk, post.text, post.pub_date, post.image.name,
+            post.thumbnail, post.comments_count, post.author.username,
+            post.group.slug, post.group.title,
+        )
+        for post in rows
+    ]
+
+
+def _snapshot_key(group_id):
+    return f'group-pages:{group_id}'
+
+
+@jobs.handler('group_pages.refresh')
+def refresh(group_id):
+    """Рисует первые страницы ленты группы под текущей версией."""
+    pages = settings.GROUP_HOT_PAGES
+    rows = list(Post.objects.for_feed().filter(group_id=group_id).order_by(
+        '-pub_date', '-id'
+    )[:pages * POSTS_PER_PAGE + 1])
+    scope = feed_cache.group_scope(group_id)
+    previous = cache.get(_snapshot_key(group_id)) or []
+    snapshot = []
+    cursor_page = SnapshotPaginator(rows).get_page()
+    for number in range(pages):
+        signature = _signature(cursor_page, cursor_page.has_next())
+        if number < len(previous) and previous[number][0] == signature:
+            html, cost = previous[number][1:]
+        else:
+            started = time.monotonic()
+            html = render_to_string(PAGE_TEMPLATE, {
+                'page': cursor_page, 'cursor_page': cursor_page,
+            })
+            cost = time.monotonic() - started
+        feed_cache.store(
+            feed_cache.feed_key('group', scope, cursor_page), html, cost
+        )
+        snapshot.append((signature, html, cost))
+        if not cursor_page.has_next():
+            break
+        cursor_page = cursor_page.paginator.get_page(cursor_page.next_cursor)
+    cache.set(_snapshot_key(group_id), snapshot, settings.FEED_CACHE_TIMEOUT)
+
+
+def schedule_refresh(*group_ids):
+    """Ставит перерисовку страниц групп; пока задача группы ждёт,
+    новые изменения к ней присоединяются. Без очереди - ничего: первые
+    страницы нарисует первый читатель."""
+    if not (settings.JOB_QUEUE_ENABLED and settings.GROUP_HOT_PAGES):
+        return
+    for group_id in set(group_ids) - {None}:
+        jobs.enqueue(
+            'group_pages.refresh', group_id, key=f'group-pages:{group_id}'
+        )
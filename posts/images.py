@@ -0,0 +1,130 @@
+"""Приём картинок постов: ограничения загрузки и перекодирование.
+
+Загрузка пишется на диск кусками, а не в память. Размер файла и картинки
+проверяются до декодирования пикселей, после чего картинка один раз
+декодируется и сохраняется в компактном формате сразу в нескольких
+размерах: исходный ограничивается по длинной стороне, для ленты
+готовится миниатюра."""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.forms import ValidationError
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps, features
+
+# WebP заметно меньше JPEG; без поддержки в Pillow - прогрессивный JPEG
+if features.check('webp'):
+    FORMAT, EXTENSION = 'WEBP', 'webp'
+    SAVE_OPTIONS = {'quality': 80, 'method': 4}
+else:
+    FORMAT, EXTENSION = 'JPEG', 'jpg'
+    SAVE_OPTIONS = {'quality': 82, 'optimize': True, 'progressive': True}
+
+# Размеры: имя -> (ширина, высота, обрезать ли под размер)
+FULL = 'full'
+FEED = 'feed'
+SIZES = {
+    FULL: (1920, 1920, False),
+    FEED: (960, 339, True),
+}
+THUMBNAIL_DIR = 'posts/thumbs/'
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку во временный файл, но не больше лимита.
+
+    Остаток слишком большого файла дочитывается из запроса и
+    отбрасывается, а файл помечается too_large. Размер загрузки при
+    этом полный, и валидатор check_size поля Post.image отклоняет
+    обрезанный файл в любой форме, даже если его начало сходит за
+    картинку."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.too_large = self.received > settings.IMAGE_UPLOAD_MAX_SIZE
+        return upload
+
+
+def is_too_large(upload):
+    return (
+        getattr(upload, 'too_large', False)
+        or upload.size > settings.IMAGE_UPLOAD_MAX_SIZE
+    )
+
+
+def check_size(upload):
+    """Валидатор поля картинки: загрузка не больше
+    IMAGE_UPLOAD_MAX_SIZE. Уже сохранённые файлы не проверяются."""
+    if getattr(upload, '_committed', False):
+        return
+    if is_too_large(upload):
+        raise ValidationError(
+            'Файл больше %s.'
+            % filesizeformat(settings.IMAGE_UPLOAD_MAX_SIZE)
+        )
+
+
+def check_limits(image):
+    """Проверяет размер картинки по заголовку.
+
+    ImageField уже открыл картинку и оставил её в image.image: Pillow
+    читает при этом только заголовок, пиксели ещё не декодированы."""
+    width, height = image.image.size
+    if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+        raise ValidationError(
+            f'Картинка {width}×{height} слишком большая.'
+        )
+
+
+def _encode(image):
+    buffer = BytesIO()
+    image.save(buffer, FORMAT, **SAVE_OPTIONS)
+    return buffer.getvalue()
+
+
+def render(upload):
+    """Декодирует картинку один раз и возвращает словарь
+    имя размера -> ContentFile в формате FORMAT."""
+    upload.seek(0)
+    image = Image.open(upload)
+    width, height = SIZES[FULL][:2]
+    # JPEG можно декодировать сразу в уменьшенном масштабе
+    image.draft('RGB', (width, height))
+    image = ImageOps.exif_transpose(image)
+    has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+    image = image.convert(
+        'RGBA' if has_alpha and FORMAT == 'WEBP' else 'RGB'
+    )
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    result = {}
+    for name, (width, height, crop) in SIZES.items():
+        if crop:
+            resized = ImageOps.fit(
+                image, (width, height), Image.LANCZOS
+            )
+        else:
+            resized = image.copy()
+            resized.thumbnail((width, height), Image.LANCZOS)
+        result[name] = ContentFile(
+            _encode(resized), name=f'{stem}.{EXTENSION}'
+        )
+    return result
+
+
+def save_thumbnail(content):
+    """Сохраняет миниатюру для ленты и возвращает её адрес."""
+    name = default_storage.save(THUMBNAIL_DIR + content.name, content)
+    return default_storage.url(name)
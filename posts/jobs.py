@@ -0,0 +1,213 @@
+"""Очередь фоновых задач в таблице базы.
+
+Виды ставят задачу в той же транзакции, что и саму запись: задача
+появляется тогда и только тогда, когда зафиксирован пост или
+комментарий, и вид отвечает, не дожидаясь миниатюры, раскладки по
+лентам и поискового индекса. Задачи выполняет команда run_workers.
+
+- Ключ идемпотентности: пока задача с ключом ждёт, повторная постановка
+  не создаёт вторую строку, а только поднимает версию. Если задачу в
+  это время уже выполнял воркер, после неё она выполнится ещё раз.
+- Повторы: упавшая задача ждёт JOB_RETRY_DELAY * 2 ** (попытка - 1)
+  секунд, после JOB_MAX_ATTEMPTS попыток помечается проваленной.
+- Пачки: задачи batch-обработчика одного вида выполняются одним
+  вызовом, например весь поисковый индекс пачки - одним запросом.
+- Воркер занимает пачку на JOB_LEASE секунд: задачи упавшего процесса
+  достанутся другим после истечения срока.
+
+Обработчики должны быть идемпотентны: задача выполняется хотя бы раз.
+С JOB_QUEUE_ENABLED = False задачи выполняются сразу при постановке."""
+import json
+import logging
+import time
+import uuid
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+POLL_INTERVAL = 0.5
+# задержки последних задач для отчёта воркера
+LATENCY_SAMPLES = 10000
+
+_handlers = {}
+
+
+def handler(name, batch=False):
+    """Регистрирует обработчик задачи name: функцию одного аргумента
+    или, с batch=True, списка аргументов пачки."""
+    def decorator(function):
+        _handlers[name] = (function, batch)
+        return function
+    return decorator
+
+
+def _call(name, payloads):
+    function, batch = _handlers[name]
+    if batch:
+        function(payloads)
+    else:
+        for payload in payloads:
+            function(payload)
+
+
+def enqueue(name, payload, key=None):
+    """Ставит задачу name с JSON-аргументом payload."""
+    if name not in _handlers:
+        raise ValueError(f'Неизвестная задача: {name}')
+    if not settings.JOB_QUEUE_ENABLED:
+        _call(name, [payload])
+        return
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {Job._meta.db_table} (name, payload, key, '
+            'version, attempts, run_after, claim, failed, error, created) '
+            "VALUES (%s, %s, %s, 0, 0, %s, '', %s, '', %s) "
+            'ON CONFLICT (key) DO UPDATE SET version = version + 1, '
+            "attempts = 0, failed = excluded.failed, error = '', "
+            'run_after = excluded.run_after',
+            (name, json.dumps(payload), key, now, False, now),
+        )
+
+
+class WorkerStats:
+    """Счётчики воркера для отчёта о пропускной способности."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.done = 0
+        self.batches = 0
+        self.retried = 0
+        self.failed = 0
+        # от постановки до выполнения, секунды
+        self.latencies = []
+
+    def throughput(self):
+        return self.done / max(time.monotonic() - self.started, 1e-9)
+
+    def latency(self, share):
+        if not self.latencies:
+            return 0
+        latencies = sorted(self.latencies)
+        return latencies[min(int(len(latencies) * share), len(latencies) - 1)]
+
+    def summary(self):
+        return (
+            f'{self.done} задач, {self.throughput():.1f}/с, '
+            f'пачек {self.batches}, повторов {self.retried}, '
+            f'провалено {self.failed}, задержка p50 '
+            f'{self.latency(0.5):.2f} с, p95 {self.latency(0.95):.2f} с'
+        )
+
+
+def claim(limit=BATCH_SIZE):
+    """Занимает до limit готовых задач одним UPDATE, поэтому воркеры
+    разных процессов не берут одну задачу дважды."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    ready = Job.objects.filter(
+        failed=False, run_after__lte=now
+    ).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    ).order_by('pk').values('pk')[:limit]
+    claimed = Job.objects.filter(pk__in=ready).update(
+        claim=token,
+        locked_until=now + timedelta(seconds=settings.JOB_LEASE),
+        attempts=F('attempts') + 1,
+    )
+    if not claimed:
+        return []
+    return list(Job.objects.filter(claim=token).order_by('pk'))
+
+
+def _finish(jobs, stats):
+    now = timezone.now()
+    # задачу, которую переставили во время выполнения, не удаляем,
+    # а освобождаем: она выполнится ещё раз
+    Job.objects.filter(
+        reduce(or_, (Q(pk=job.pk, version=job.version) for job in jobs))
+    ).delete()
+    Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+        claim='', locked_until=None, attempts=0
+    )
+    stats.done += len(jobs)
+    stats.latencies += [(now - job.created).total_seconds() for job in jobs]
+    del stats.latencies[:-LATENCY_SAMPLES]
+
+
+def _fail(job, error, stats, retry=True):
+    if not retry or job.attempts >= settings.JOB_MAX_ATTEMPTS:
+        changes = {'failed': True}
+        stats.failed += 1
+    else:
+        delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+        changes = {'run_after': timezone.now() + timedelta(seconds=delay)}
+        stats.retried += 1
+    Job.objects.filter(pk=job.pk).update(
+        claim='', locked_until=None, error=error, **changes
+    )
+
+
+def _run(name, jobs, stats):
+    # без общей транзакции: в WAL транзакция, начатая чтением, не
+    # может перейти к записи после чужой фиксации и сразу падает с
+    # «database is locked», а долгий обработчик держал бы блокировку
+    # записи всей базы
+    _call(name, [json.loads(job.payload) for job in jobs])
+    _finish(jobs, stats)
+
+
+def process(limit=BATCH_SIZE, stats=None):
+    """Выполняет одну пачку готовых задач. Возвращает её размер."""
+    stats = stats or WorkerStats()
+    jobs = claim(limit)
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job.name, []).append(job)
+    for name, group in groups.items():
+        if name not in _handlers:
+            for job in group:
+                _fail(job, f'Неизвестная задача: {name}', stats, retry=False)
+            continue
+        if _handlers[name][1] and len(group) > 1:
+            try:
+                _run(name, group, stats)
+                continue
+            except Exception:
+                # одна сломанная задача не должна держать всю пачку:
+                # дальше по одной
+                logger.exception('Пачка задач %s упала', name)
+        for job in group:
+            try:
+                _run(name, [job], stats)
+            except Exception as error:
+                logger.exception('Задача %s(%s) упала', name, job.payload)
+                _fail(job, repr(error), stats)
+    if jobs:
+        stats.batches += 1
+    return len(jobs)
+
+
+def work(stats, limit=BATCH_SIZE, poll=POLL_INTERVAL, until_empty=False,
+         report=None, log=lambda message: None):
+    """Цикл воркера: пачка за пачкой, пауза poll, когда задач нет.
+    С until_empty возвращается, как только готовых задач не осталось."""
+    next_report = time.monotonic() + report if report else None
+    while True:
+        if not process(limit, stats):
+            if until_empty:
+                return stats
+            time.sleep(poll)
+        if next_report is not None and time.monotonic() >= next_report:
+            log(stats.summary())
+            next_report += report
@@ -0,0 +1,118 @@
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from yatube.cache import cache_from_url
+
+
+def build_cache(url):
+    config = cache_from_url(url)
+    backend = import_string(config.pop('BACKEND'))
+    return backend(config.pop('LOCATION', ''), config)
+
+
+def init_worker(counter):
+    global writes
+    writes = counter
+
+
+def run_worker(args):
+    """Один воркер: читает страницы лент с распределением Ципфа,
+    при промахе «рисует» страницу и кладёт её в кэш.
+
+    Число записей ведётся и в кэше, и в общей памяти процессов: если
+    версия из кэша отстаёт от общей, воркер отдал устаревшую страницу."""
+    url, requests, pages, render_ms, write_ratio, seed = args
+    cache = build_cache(url)
+    rnd = random.Random(seed)
+    hits, stale, latencies = 0, 0, []
+    for _ in range(requests):
+        started = time.perf_counter()
+        if rnd.random() < write_ratio:
+            with writes.get_lock():
+                writes.value += 1
+            try:
+                cache.incr('bench:version')
+            except ValueError:
+                cache.set('bench:version', 1, None)
+        version = cache.get('bench:version', 0)
+        page = min(int(rnd.paretovariate(1.2)), pages)
+        key = f'bench:feed:{version}:{page}'
+        if cache.get(key) is not None:
+            hits += 1
+            stale += version < writes.value
+        else:
+            time.sleep(render_ms / 1000)
+            cache.set(key, 'x' * 4096, 300)
+        latencies.append(time.perf_counter() - started)
+    return hits, stale, latencies
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает кэши при нескольких воркерах: доля попаданий, '
+        'задержка и пропускная способность'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cache', action='append', dest='urls',
+            help='URL кэша, можно несколько раз (по умолчанию locmem '
+                 'и sqlite во временном файле)',
+        )
+        parser.add_argument(
+            '--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+        )
+        parser.add_argument(
+            '--requests', type=int, default=8000,
+            help='Всего запросов, делятся поровну между воркерами',
+        )
+        parser.add_argument('--pages', type=int, default=200)
+        parser.add_argument('--render-ms', type=float, default=5)
+        parser.add_argument('--write-ratio', type=float, default=0.01)
+
+    def handle(self, *args, **options):
+        tmpdir = tempfile.mkdtemp()
+        urls = options['urls'] or [
+            'locmem://',
+            f'sqlite://{os.path.join(tmpdir, "bench.sqlite3")}',
+        ]
+        self.stdout.write(
+            f'{"кэш":<40} {"воркеры":>7} {"попадания":>9} '
+            f'{"устарело":>8} {"p50, мс":>8} {"p95, мс":>8} {"RPS":>8}'
+        )
+        for url in urls:
+            for workers in options['workers']:
+                build_cache(url).clear()
+                jobs = [
+                    (url, options['requests'] // workers, options['pages'],
+                     options['render_ms'], options['write_ratio'], seed)
+                    for seed in range(workers)
+                ]
+                context = get_context('fork')
+                counter = context.Value('i', 0)
+                started = time.perf_counter()
+                with context.Pool(workers, init_worker, (counter,)) as pool:
+                    results = pool.map(run_worker, jobs)
+                elapsed = time.perf_counter() - started
+                hits = sum(result[0] for result in results)
+                stale = sum(result[1] for result in results)
+                latencies = sorted(
+                    latency for result in results for latency in result[2]
+                )
+                total = len(latencies)
+                self.stdout.write(
+                    f'{url:<40} {workers:>7} {hits / total:>9.1%} '
+                    f'{stale / total:>8.1%} '
+                    f'{statistics.median(latencies) * 1000:>8.2f} '
+                    f'{latencies[int(total * 0.95)] * 1000:>8.2f} '
+                    f'{total / elapsed:>8.0f}'
+                )
+        shutil.rmtree(tmpdir, ignore_errors=True)
@@ -0,0 +1,163 @@
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.stemmer import terms
+
+STEMS = (
+    'книг', 'кошк', 'город', 'дорог', 'музык', 'песн', 'гитар', 'концерт',
+    'альбом', 'групп', 'зим', 'мор', 'погод', 'работ', 'друз', 'поход',
+    'фотограф', 'закат', 'рассвет', 'истори', 'памят', 'вечер', 'лес',
+    'рек', 'площад', 'улиц', 'машин', 'поезд', 'вокзал', 'окн',
+)
+ENDINGS = ('а', 'и', 'у', 'ой', 'ами', 'ах', 'е', 'ы', 'ом', '')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск LIKE %слово% (icontains) с индексами FTS5 '
+        'и SearchTerm на синтетических постах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--words', type=int, default=20)
+        parser.add_argument('--queries', type=int, default=30)
+        parser.add_argument(
+            '--methods', nargs='+', default=['like', 'fts5', 'terms'],
+            choices=['like', 'fts5', 'terms'],
+        )
+
+    def handle(self, *args, **options):
+        rnd = random.Random(0)
+        # редкие слова встречаются в немногих постах, частые - везде
+        vocabulary = [
+            stem + ending for stem in STEMS for ending in ENDINGS
+        ] + [f'слово{n}' for n in range(50000)]
+        cum_weights, total = [], 0
+        for rank in range(len(vocabulary)):
+            total += 1 / (rank + 1)
+            cum_weights.append(total)
+        tmpdir = tempfile.mkdtemp()
+        db = sqlite3.connect(os.path.join(tmpdir, 'bench.sqlite3'))
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT)')
+
+        started = time.perf_counter()
+        batch = []
+        for pk in range(1, options['posts'] + 1):
+            words = rnd.choices(
+                vocabulary, cum_weights=cum_weights, k=options['words']
+            )
+            batch.append((pk, ' '.join(words)))
+            if len(batch) == 10000:
+                db.executemany('INSERT INTO post VALUES (?, ?)', batch)
+                batch = []
+        db.executemany('INSERT INTO post VALUES (?, ?)', batch)
+        db.commit()
+        self.stdout.write(
+            f'{options["posts"]} постов за '
+            f'{time.perf_counter() - started:.1f} с'
+        )
+
+        # половина запросов - частые слова, половина - редкие
+        frequent = vocabulary[:len(STEMS) * len(ENDINGS)]
+        queries = [
+            rnd.choice(frequent if n % 2 else vocabulary[-1000:])
+            for n in range(options['queries'])
+        ]
+        builders = {'fts5': self.build_fts5, 'terms': self.build_terms}
+        searches = {
+            'like': self.search_like,
+            'fts5': self.search_fts5,
+            'terms': self.search_terms,
+        }
+        self.stdout.write(
+            f'{"способ":<8} {"индекс, с":>10} {"p50, мс":>9} '
+            f'{"p95, мс":>9} {"найдено":>9}'
+        )
+        for method in options['methods']:
+            build = 0
+            if method in builders:
+                started = time.perf_counter()
+                builders[method](db)
+                build = time.perf_counter() - started
+            latencies, found = [], 0
+            for query in queries:
+                started = time.perf_counter()
+                found += len(searches[method](db, query))
+                latencies.append(time.perf_counter() - started)
+            latencies.sort()
+            self.stdout.write(
+                f'{method:<8} {build:>10.1f} '
+                f'{statistics.median(latencies) * 1000:>9.2f} '
+                f'{latencies[int(len(latencies) * 0.95)] * 1000:>9.2f} '
+                f'{found / len(queries):>9.0f}'
+            )
+        db.close()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    @staticmethod
+    def rows(db):
+        return db.execute('SELECT id, text FROM post')
+
+    def build_fts5(self, db):
+        db.execute(
+            'CREATE VIRTUAL TABLE post_search USING fts5(text, '
+            'tokenize="unicode61 remove_diacritics 2")'
+        )
+        db.executemany(
+            'INSERT INTO post_search (rowid, text) VALUES (?, ?)',
+            ((pk, ' '.join(terms(text))) for pk, text in self.rows(db)),
+        )
+        db.commit()
+
+    def build_terms(self, db):
+        db.execute(
+            'CREATE TABLE term (term TEXT, post_id INTEGER, weight INTEGER, '
+            'PRIMARY KEY (term, post_id)) WITHOUT ROWID'
+        )
+
+        def postings():
+            for pk, text in self.rows(db):
+                weights = {}
+                for term in terms(text):
+                    weights[term] = weights.get(term, 0) + 1
+                for term, weight in weights.items():
+                    yield term, pk, weight
+
+        db.executemany('INSERT INTO term VALUES (?, ?, ?)', postings())
+        db.commit()
+
+    @staticmethod
+    def search_like(db, query):
+        # так выглядит Post.objects.filter(text__icontains=query)
+        return db.execute(
+            "SELECT id FROM post WHERE text LIKE ? ESCAPE '\\' "
+            'ORDER BY id DESC LIMIT 1000',
+            (f'%{query}%',),
+        ).fetchall()
+
+    @staticmethod
+    def search_fts5(db, query):
+        match = ' '.join(f'"{term}"' for term in terms(query))
+        return db.execute(
+            'SELECT rowid FROM post_search WHERE post_search MATCH ? '
+            'ORDER BY bm25(post_search) LIMIT 1000',
+            (match,),
+        ).fetchall()
+
+    @staticmethod
+    def search_terms(db, query):
+        return db.execute(
+            'SELECT post_id FROM term WHERE term IN (%s) '
+            'GROUP BY post_id ORDER BY SUM(weight) DESC LIMIT 1000'
+            % ', '.join('?' * len(terms(query))),
+            terms(query),
+        ).fetchall()
@@ -0,0 +1,127 @@
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.management.commands.bench_views import percentile
+from yatube.sqlite import apply_pragmas
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'pub_date REAL, text TEXT)',
+    'CREATE INDEX post_author_date ON post (author_id, pub_date)',
+)
+READ = (
+    'SELECT id, text FROM post WHERE author_id = ? '
+    'ORDER BY pub_date DESC LIMIT 10'
+)
+WRITE = 'INSERT INTO post (author_id, pub_date, text) VALUES (?, ?, ?)'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность чтения и записи SQLite с '
+        'настройками по умолчанию и с прагмами SQLITE_PRAGMAS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--seconds', type=float, default=5,
+            help='Длительность каждого замера',
+        )
+
+    def handle(self, *args, **options):
+        modes = {
+            'по умолчанию': {},
+            'SQLITE_PRAGMAS': settings.SQLITE_PRAGMAS,
+        }
+        self.stdout.write(
+            f'{"режим":<16} {"чтений/с":>10} {"записей/с":>10} '
+            f'{"p99 чт, мс":>11} {"p99 зап, мс":>12} {"ошибки":>7}'
+        )
+        for name, pragmas in modes.items():
+            tmpdir = tempfile.mkdtemp()
+            try:
+                path = os.path.join(tmpdir, 'bench.sqlite3')
+                self.fill(path, options)
+                result = self.run(path, pragmas, options)
+            finally:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+            self.stdout.write(
+                f'{name:<16} {result["reads"]:>10.0f} '
+                f'{result["writes"]:>10.0f} {result["read_p99"]:>11.2f} '
+                f'{result["write_p99"]:>12.2f} {result["errors"]:>7}'
+            )
+
+    def fill(self, path, options):
+        db = sqlite3.connect(path)
+        for statement in SCHEMA:
+            db.execute(statement)
+        rnd = random.Random(0)
+        db.executemany(WRITE, (
+            (rnd.randrange(options['authors']), time.time() - n, 'x' * 200)
+            for n in range(options['rows'])
+        ))
+        db.commit()
+        db.close()
+
+    def run(self, path, pragmas, options):
+        """Читатели и писатели в своих потоках и соединениях, как
+        воркеры сервера; запись фиксируется после каждой строки."""
+        stop = threading.Event()
+        lock = threading.Lock()
+        stats = {'read': [], 'write': [], 'errors': 0}
+
+        def worker(number, statement, kind):
+            # timeout=5 - как у соединений Django по умолчанию
+            db = sqlite3.connect(path, timeout=5, isolation_level=None)
+            apply_pragmas(db, pragmas)
+            rnd = random.Random(number)
+            latencies, errors = [], 0
+            while not stop.is_set():
+                params = (rnd.randrange(options['authors']),)
+                if kind == 'write':
+                    params += (time.time(), 'y' * 200)
+                started = time.perf_counter()
+                try:
+                    db.execute(statement, params).fetchall()
+                except sqlite3.OperationalError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+            db.close()
+            with lock:
+                stats[kind] += latencies
+                stats['errors'] += errors
+
+        threads = [
+            threading.Thread(target=worker, args=(n, READ, 'read'))
+            for n in range(options['readers'])
+        ] + [
+            threading.Thread(target=worker, args=(n, WRITE, 'write'))
+            for n in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        reads, writes = sorted(stats['read']), sorted(stats['write'])
+        return {
+            'reads': len(reads) / options['seconds'],
+            'writes': len(writes) / options['seconds'],
+            'read_p99': percentile(reads, 0.99) * 1000,
+            'write_p99': percentile(writes, 0.99) * 1000,
+            'errors': stats['errors'],
+        }
@@ -0,0 +1,105 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from django.utils import timezone
+
+from posts.group_pages import SnapshotPaginator
+from posts.models import Group, Post, User
+from posts.paginator import POSTS_PER_PAGE
+from yatube.templates import compile_templates
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# название -> (debug, кэширующий загрузчик)
+CONFIGS = {
+    'как при разработке': (True, False),
+    'без кэша': (False, False),
+    'кэш загрузчика': (False, True),
+}
+
+
+def build_backend(debug, cached):
+    """Движок с настройками проекта, но своим загрузчиком и debug."""
+    options = dict(settings.TEMPLATES[0]['OPTIONS'])
+    options['debug'] = debug
+    options['loaders'] = (
+        [('django.template.loaders.cached.Loader', LOADERS)] if cached
+        else LOADERS
+    )
+    return DjangoTemplates({
+        'NAME': 'bench',
+        'DIRS': settings.TEMPLATES[0]['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': options,
+    })
+
+
+def index_context(posts=POSTS_PER_PAGE):
+    """Контекст главной из несохранённых постов: замер не ходит в базу.
+    Лишний пост включает переключатель страниц."""
+    author = User(pk=1, username='ringo', first_name='Ринго')
+    group = Group(pk=1, title='Битлз', slug='beatles')
+    now = timezone.now()
+    rows = [
+        Post(
+            pk=pk, text=f'Пост {pk}\nвторая строка', author=author,
+            group=group, pub_date=now - timedelta(minutes=pk),
+            comments_count=pk % 3,
+        )
+        for pk in range(1, posts + 2)
+    ]
+    cursor_page = SnapshotPaginator(rows, posts).get_page()
+    return {'page': cursor_page, 'cursor_page': cursor_page}
+
+
+def render_times(backend, renders, template='index.html'):
+    """Время каждого из renders рендерингов шаблона, секунды. Шаблон
+    ищется заново на каждый рендеринг, как в render() вида."""
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    context = index_context()
+    # как wsgi.py при запуске; без кэша загрузчика это ничего не даёт
+    compile_templates(backends=[backend])
+    times = []
+    for _ in range(renders):
+        started = time.perf_counter()
+        backend.get_template(template).render(context, request)
+        times.append(time.perf_counter() - started)
+    return times
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время рендеринга главной с 10 постами без кэша '
+        'шаблонов и с кэширующим загрузчиком'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"настройка":<20} {"p50, мс":>8} {"p95, мс":>8} '
+            f'{"в секунду":>10}'
+        )
+        baseline = None
+        for name, (debug, cached) in CONFIGS.items():
+            times = sorted(render_times(
+                build_backend(debug, cached), options['renders']
+            ))
+            median = statistics.median(times)
+            baseline = baseline or median
+            self.stdout.write(
+                f'{name:<20} {median * 1000:>8.2f} '
+                f'{times[int(len(times) * 0.95)] * 1000:>8.2f} '
+                f'{len(times) / sum(times):>10.0f}  '
+                f'x{baseline / median:.1f}'
+            )
@@ -0,0 +1,285 @@
+import json
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.shortcuts import resolve_url
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post, User
+from posts.seeding import seed
+from yatube.metrics import RequestStats
+
+VIEWS = (
+    'index', 'group_posts', 'profile', 'post_view', 'follow_index',
+    'add_comment', 'search',
+)
+DEFAULT_VIEWS = (
+    'index', 'profile', 'post_view', 'follow_index', 'add_comment',
+)
+# комментарий после сохранения перенаправляет на страницу поста
+EXPECTED_STATUS = {'add_comment': 302}
+
+
+def percentile(values, share):
+    """Значение, ниже которого лежит доля share отсортированных values."""
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def failed(response, expected):
+    """Ответ не тот, что ждёт сценарий: другой код или редирект на вход
+    - клиент оказался анонимным и замер мерил бы страницу входа."""
+    if response.status_code != expected:
+        return True
+    login_url = resolve_url(settings.LOGIN_URL)
+    return response.status_code in (301, 302) and response.url.startswith(
+        login_url
+    )
+
+
+def drive(make_request, users, requests, clients, expected=200):
+    """Выполняет requests запросов в clients потоках, у каждого потока
+    свой клиент со своим пользователем. make_request(client, rnd)
+    возвращает ответ; ошибка - исключение или ответ с кодом, отличным
+    от expected. Возвращает сводку по задержкам и запросам к базе."""
+    results = []
+    lock = threading.Lock()
+
+    def worker(number, count):
+        rnd = random.Random(number)
+        client = logged_in[number]
+        latencies, queries, errors = [], 0, 0
+        try:
+            for _ in range(count):
+                stats = RequestStats()
+                started = time.perf_counter()
+                try:
+                    with connection.execute_wrapper(stats.execute):
+                        response = make_request(client, rnd)
+                    errors += failed(response, expected)
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+                queries += stats.queries
+        finally:
+            connection.close()
+            with lock:
+                results.append((latencies, queries, errors))
+
+    # сессии создаются заранее: вход пишет в базу, а параллельные
+    # записи SQLite отклоняет. Входить нужно сохранёнными
+    # пользователями: хэш сессии считается от пароля из базы
+    by_pk = User.objects.in_bulk(users)
+    logged_in = []
+    for number in range(clients):
+        client = Client()
+        client.force_login(by_pk[users[number % len(users)]])
+        logged_in.append(client)
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(n, requests // clients + (n < requests % clients)),
+        )
+        for n in range(clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies = sorted(l for result in results for l in result[0])
+    total = len(latencies)
+    return {
+        'requests': total,
+        'errors': sum(result[2] for result in results),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'queries': round(
+            sum(result[1] for result in results) / max(total, 1), 2
+        ),
+        'rps': round(total / elapsed, 1),
+    }
+
+
+def requests_for(view, posts, usernames, slugs):
+    """Функция-запрос для вида: страницы и посты выбираются случайно."""
+    def request(client, rnd):
+        if view == 'index':
+            return client.get(reverse('index'))
+        if view == 'group_posts':
+            return client.get(reverse('group_posts', args=(
+                rnd.choice(slugs),
+            )))
+        if view == 'profile':
+            return client.get(reverse('profile', args=(
+                rnd.choice(usernames),
+            )))
+        if view == 'follow_index':
+            return client.get(reverse('follow_index'))
+        if view == 'search':
+            return client.get(reverse('search'), {'q': 'город поезд'})
+        username, post_id = rnd.choice(posts)
+        if view == 'post_view':
+            return client.get(
+                reverse('post_view', args=(username, post_id))
+            )
+        return client.post(
+            reverse('add_comment', args=(username, post_id)),
+            {'text': 'Нагрузочный комментарий'},
+        )
+    return request
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный замер видов posts на синтетических данных во '
+        'временной базе: p50/p95/p99, запросы к базе и RPS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок у каждого пользователя',
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.2,
+            help='Доля постов с картинкой',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--views', nargs='+', choices=VIEWS, default=DEFAULT_VIEWS,
+        )
+        parser.add_argument('--clients', type=int, default=4)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов к каждому виду',
+        )
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+        parser.add_argument(
+            '--compare', help='JSON прошлого замера для сравнения',
+        )
+
+    def handle(self, *args, **options):
+        tmpdir = tempfile.mkdtemp()
+        # отдельная файловая база: потоки клиентов видят одни данные
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        test_settings['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with override_settings(
+                DEBUG=False,
+                RATE_LIMIT_ENABLED=False,
+                MEDIA_ROOT=os.path.join(tmpdir, 'media'),
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            ):
+                result = self.run_views(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        self.report(result, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(result, output, ensure_ascii=False, indent=2)
+
+    def run_views(self, options):
+        started = time.perf_counter()
+        user_ids, post_ids = seed(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            image_share=options['image_share'],
+            random_seed=options['seed'],
+        )
+        self.stdout.write(
+            f'Данные созданы за {time.perf_counter() - started:.1f} с'
+        )
+        rnd = random.Random(options['seed'])
+        posts = list(Post.objects.filter(
+            pk__in=rnd.sample(post_ids, min(1000, len(post_ids)))
+        ).values_list('author__username', 'pk'))
+        usernames = list(
+            User.objects.filter(pk__in=user_ids).values_list(
+                'username', flat=True
+            )
+        )
+        slugs = list(
+            Post.objects.exclude(group=None).values_list(
+                'group__slug', flat=True
+            ).distinct()
+        )
+        connection.close()
+        cache.clear()
+        views = {}
+        for view in options['views']:
+            views[view] = drive(
+                requests_for(view, posts, usernames, slugs),
+                user_ids, options['requests'], options['clients'],
+                expected=EXPECTED_STATUS.get(view, 200),
+            )
+        return {
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'params': {
+                name: options[name] for name in (
+                    'users', 'groups', 'posts', 'comments', 'follows',
+                    'image_share', 'seed', 'clients', 'requests',
+                )
+            },
+            'views': views,
+        }
+
+    def report(self, result, compare):
+        previous = {}
+        if compare:
+            with open(compare, encoding='utf-8') as source:
+                previous = json.load(source)['views']
+        self.stdout.write(
+            f'{"вид":<14} {"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9} '
+            f'{"запросы":>8} {"RPS":>8} {"ошибки":>7}'
+        )
+        for view, row in result['views'].items():
+            line = (
+                f'{view:<14} {row["p50_ms"]:>9.2f} {row["p95_ms"]:>9.2f} '
+                f'{row["p99_ms"]:>9.2f} {row["queries"]:>8.1f} '
+                f'{row["rps"]:>8.0f} {row["errors"]:>7}'
+            )
+            if view in previous:
+                before = previous[view]
+                line += (
+                    f'   p95 {row["p95_ms"] - before["p95_ms"]:+.2f} мс, '
+                    f'RPS {row["rps"] - before["rps"]:+.0f}'
+                )
+            self.stdout.write(line)
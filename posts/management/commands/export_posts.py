@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import CHUNK_SIZE, export_records, open_stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, пользователей, посты, комментарии и подписки '
+        'в NDJSON; файл *.gz сжимается gzip'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', nargs='?', default='-',
+            help='Файл выгрузки, по умолчанию stdout',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Строк, читаемых из базы за раз',
+        )
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            counts = export_records(sys.stdout, options['chunk_size'])
+        else:
+            with open_stream(options['output'], 'w') as output:
+                counts = export_records(output, options['chunk_size'])
+        self.stderr.write(', '.join(
+            f'{model}: {count}' for model, count in counts.items()
+        ))
@@ -0,0 +1,44 @@
+import os
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def generate(post_id):
+    try:
+        return thumbnails.generate(post_id) is not None
+    except Exception:
+        thumbnails.logger.exception(
+            'Не удалось подготовить миниатюру поста %s', post_id
+        )
+        return False
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры картинок постов на всех ядрах'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать и уже готовые миниатюры',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(thumbnail='')
+        post_ids = list(posts.values_list('pk', flat=True))
+        # дочерние процессы не должны делить соединение с родителем
+        connections.close_all()
+        with get_context('fork').Pool(options['workers']) as pool:
+            done = sum(pool.imap_unordered(generate, post_ids, chunksize=8))
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры готовы: {done} из {len(post_ids)}'
+        ))
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.seeding import DERIVED
+from posts.transfer import BATCH_SIZE, import_records, open_stream
+
+
+class Command(BaseCommand):
+    help = 'Загружает выгрузку export_posts, сохраняя связи записей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input', nargs='?', default='-',
+            help='Файл выгрузки, по умолчанию stdin',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--skip', nargs='+', choices=DERIVED, default=[],
+            help='Не пересчитывать после загрузки',
+        )
+
+    def handle(self, *args, **options):
+        kwargs = {
+            'batch_size': options['batch_size'],
+            'derived': [
+                name for name in DERIVED if name not in options['skip']
+            ],
+            'log': self.stderr.write,
+        }
+        if options['input'] == '-':
+            counts = import_records(sys.stdin, **kwargs)
+        else:
+            with open_stream(options['input'], 'r') as lines:
+                counts = import_records(lines, **kwargs)
+        self.stdout.write(self.style.SUCCESS('Загружено: ' + ', '.join(
+            f'{model}: {count}' for model, count in counts.items()
+        )))
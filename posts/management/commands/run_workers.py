@@ -0,0 +1,103 @@
+import multiprocessing
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, OutputWrapper
+from django.db import connections
+
+from posts import jobs
+
+
+def _worker(number, results, options):
+    """Процесс воркера: выполняет задачи и отдаёт свою статистику."""
+    stdout = OutputWrapper(sys.stdout)
+    stats = jobs.WorkerStats()
+    try:
+        jobs.work(
+            stats,
+            limit=options['batch_size'],
+            poll=options['poll'],
+            until_empty=options['until_empty'],
+            report=options['report'],
+            log=lambda message: stdout.write(f'воркер {number}: {message}'),
+        )
+    except KeyboardInterrupt:
+        # занятые задачи вернутся в очередь по истечении JOB_LEASE
+        pass
+    finally:
+        connections.close_all()
+    results.put({
+        'done': stats.done,
+        'batches': stats.batches,
+        'retried': stats.retried,
+        'failed': stats.failed,
+        'latencies': stats.latencies,
+    })
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи posts.jobs в нескольких процессах и '
+        'печатает пропускную способность'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=2, help='Число воркеров',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=jobs.BATCH_SIZE,
+            help='Сколько задач воркер занимает за раз',
+        )
+        parser.add_argument(
+            '--poll', type=float, default=jobs.POLL_INTERVAL,
+            help='Пауза, когда задач нет, секунды',
+        )
+        parser.add_argument(
+            '--report', type=float, default=10,
+            help='Как часто воркеры печатают статистику, секунды; 0 - никогда',
+        )
+        parser.add_argument(
+            '--until-empty', action='store_true',
+            help='Завершиться, когда готовых задач не останется',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.JOB_QUEUE_ENABLED:
+            self.stderr.write(
+                'JOB_QUEUE_ENABLED выключен: виды выполняют задачи сами, '
+                'воркеры разберут только уже поставленные'
+            )
+        # процессы наследуют открытые соединения родителя через fork
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [
+            context.Process(target=_worker, args=(number, results, options))
+            for number in range(1, options['processes'] + 1)
+        ]
+        started = time.monotonic()
+        for worker in workers:
+            worker.start()
+        collected = []
+        while len(collected) < len(workers):
+            try:
+                collected.append(results.get())
+            except KeyboardInterrupt:
+                # воркеры получили тот же сигнал и сейчас завершатся
+                continue
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - started
+        total = jobs.WorkerStats()
+        total.started = started
+        for result in collected:
+            total.done += result['done']
+            total.batches += result['batches']
+            total.retried += result['retried']
+            total.failed += result['failed']
+            total.latencies += result['latencies']
+        self.stdout.write(
+            f'{len(workers)} воркер(а) за {elapsed:.1f} с: {total.summary()}'
+        )
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.6 on 2026-10-18 02:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def has_fts5(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pragma_module_list WHERE name = 'fts5'"
+        )
+        return cursor.fetchone() is not None
+
+
+def create_fts_table(apps, schema_editor):
+    # без FTS5 поиск работает по таблице SearchTerm;
+    # заполнить индекс по старым постам: rebuild_search_index
+    if has_fts5(schema_editor.connection):
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_post_search USING fts5('
+            'text, comments, tokenize="unicode61 remove_diacritics 2")'
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if has_fts5(schema_editor.connection):
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_thumbnail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Терм')),
+                ('weight', models.PositiveIntegerField(default=1, help_text='Вхождения в текст поста считаются дважды', verbose_name='Вес')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_comment_ordering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, verbose_name='Задача')),
+                ('payload', models.TextField(help_text='JSON', verbose_name='Аргумент')),
+                ('key', models.CharField(blank=True, help_text='Ожидающая задача с тем же ключом не дублируется', max_length=128, null=True, unique=True, verbose_name='Ключ идемпотентности')),
+                ('version', models.PositiveIntegerField(default=0, help_text='Растёт при повторной постановке задачи с тем же ключом', verbose_name='Версия')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('run_after', models.DateTimeField(verbose_name='Не раньше')),
+                ('claim', models.CharField(blank=True, max_length=32, verbose_name='Метка воркера')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Занята до')),
+                ('failed', models.BooleanField(default=False, verbose_name='Провалена')),
+                ('error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('created', models.DateTimeField(verbose_name='Поставлена')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['failed', 'run_after'], name='job_ready_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['claim'], name='job_claim_idx'),
+        ),
+    ]
@@ -0,0 +1,154 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from posts.stemmer import terms
+
+TOKENIZE = 'tokenize="unicode61 remove_diacritics 2"'
+TEXT_WEIGHT = 2
+BATCH_SIZE = 500
+
+
+def has_fts5(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pragma_module_list WHERE name = 'fts5'"
+        )
+        return cursor.fetchone() is not None
+
+
+def _batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _weights(text, weight, length):
+    weights = {}
+    for term in terms(text):
+        term = term[:length]
+        weights[term] = weights.get(term, 0) + weight
+    return weights
+
+
+def split_fts_table(apps, schema_editor):
+    # комментарии - отдельные строки своей таблицы, у постов остаётся
+    # только текст; ранее проиндексированные комментарии переносятся
+    if not has_fts5(schema_editor.connection):
+        return
+    Comment = apps.get_model('posts', 'Comment')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM posts_post_search)')
+        indexed = cursor.fetchone()[0]
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE posts_post_search_text USING fts5('
+            f'text, {TOKENIZE})'
+        )
+        cursor.execute(
+            'INSERT INTO posts_post_search_text (rowid, text) '
+            'SELECT rowid, text FROM posts_post_search'
+        )
+        cursor.execute('DROP TABLE posts_post_search')
+        cursor.execute(
+            'ALTER TABLE posts_post_search_text RENAME TO posts_post_search'
+        )
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE posts_comment_search USING fts5('
+            f'text, post UNINDEXED, {TOKENIZE})'
+        )
+        if not indexed:
+            return
+        comments = Comment.objects.order_by('pk').values_list(
+            'pk', 'post_id', 'text'
+        )
+        for batch in _batches(comments.iterator()):
+            cursor.executemany(
+                'INSERT INTO posts_comment_search (rowid, text, post) '
+                'VALUES (%s, %s, %s)',
+                [(pk, ' '.join(terms(text)), post_id)
+                 for pk, post_id, text in batch],
+            )
+
+
+def merge_fts_table(apps, schema_editor):
+    # прежняя таблица создаётся пустой: rebuild_search_index
+    if not has_fts5(schema_editor.connection):
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS posts_comment_search')
+    schema_editor.execute('DROP TABLE IF EXISTS posts_post_search')
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE posts_post_search USING fts5('
+        f'text, comments, {TOKENIZE})'
+    )
+
+
+def split_search_terms(apps, schema_editor):
+    # веса комментариев были слиты с весами постов: термы уже
+    # проиндексированных постов строятся заново, комментарии - отдельно
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    post_ids = set(SearchTerm.objects.values_list('post_id', flat=True))
+    if not post_ids:
+        return
+    length = SearchTerm._meta.get_field('term').max_length
+    SearchTerm.objects.all().delete()
+    posts = Post.objects.filter(pk__in=post_ids).values_list('pk', 'text')
+    comments = Comment.objects.filter(post_id__in=post_ids).values_list(
+        'pk', 'post_id', 'text'
+    )
+    SearchTerm.objects.bulk_create(
+        (
+            SearchTerm(term=term, post_id=pk, weight=weight)
+            for pk, text in posts.iterator()
+            for term, weight in _weights(text, TEXT_WEIGHT, length).items()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    SearchTerm.objects.bulk_create(
+        (
+            SearchTerm(
+                term=term, post_id=post_id, comment_id=pk, weight=weight
+            )
+            for pk, post_id, text in comments.iterator()
+            for term, weight in _weights(text, 1, length).items()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_job'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='searchterm',
+            name='unique_search_term',
+        ),
+        migrations.AddField(
+            model_name='searchterm',
+            name='comment',
+            field=models.ForeignKey(blank=True, help_text='Пусто у термов текста поста', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Comment', verbose_name='Комментарий'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(condition=models.Q(comment=None), fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'comment'), name='unique_comment_term'),
+        ),
+        migrations.RunPython(split_fts_table, merge_fts_table),
+        migrations.RunPython(split_search_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:52
+
+from django.db import migrations, models
+import posts.images
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_search_comments'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to='posts/', validators=[posts.images.check_size], verbose_name='Изображение'),
+        ),
+    ]
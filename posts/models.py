@@ -1,9 +1,19 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from . import images
+
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+
+    def for_feed(self):
+        """Автор и группа одним JOIN: карточке поста в ленте не нужны
+        дополнительные запросы, число комментариев хранится в посте."""
+        return self.select_related('author', 'group')
+
+
 class Group(models.Model):
     title = models.CharField(
         verbose_name='Группа',
@@ -57,12 +67,92 @@ class Post(models.Model):
         verbose_name='Изображение',
         upload_to='posts/',
         blank=True, 
-        null=True
+        null=True,
+        validators=[images.check_size],
     )  
+    thumbnail = models.CharField(
+        verbose_name='Миниатюра',
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text='Адрес готовой миниатюры для ленты',
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    # меняются атомарными UPDATE в обход объекта: полное сохранение
+    # записало бы поверх значение, прочитанное в начале запроса
+    DETACHED_FIELDS = ('comments_count', 'thumbnail')
 
     class Meta:
         ordering = ('-pub_date',)  
+        indexes = [
+            # лента автора и лента группы: фильтр и порядок по дате
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_date_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_date_idx',
+            ),
+            # главная лента: ключ курсора (pub_date, id)
+            models.Index(
+                fields=('-pub_date', '-id'), name='post_date_id_idx'
+            ),
+        ]
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        post._remember_loaded()
+        return post
+
+    def _remember_loaded(self):
+        # group_id - чтобы при смене группы сбросить и прежнюю ленту
+        deferred = self.get_deferred_fields()
+        self._loaded = {
+            name: getattr(self, name)
+            for name in self.DETACHED_FIELDS + ('group_id',)
+            if name not in deferred
+        }
+        if 'image' not in deferred:
+            self._loaded['image'] = self.image.name
+
+    def save(self, *args, **kwargs):
+        """Обновление прочитанной из базы записи не трогает
+        DETACHED_FIELDS, если их не изменили на этом объекте."""
+        loaded = getattr(self, '_loaded', None)
+        if (
+            loaded is not None
+            and not self._state.adding
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            # новой картинке нужна новая миниатюра, если форма не
+            # приготовила её вместе с картинкой
+            if (
+                'image' in loaded and self.image.name != loaded['image']
+                and self.thumbnail == loaded.get('thumbnail')
+            ):
+                self.thumbnail = ''
+            skip = self.get_deferred_fields() | {
+                name for name in self.DETACHED_FIELDS
+                if name not in loaded or getattr(self, name) == loaded[name]
+            }
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skip
+                and field.name not in skip
+            ]
+        super().save(*args, **kwargs)
+        self._remember_loaded()
+
     def __str__(self): 
         return self.text[:15]      
 
@@ -89,6 +179,15 @@ class Comment(models.Model):
         verbose_name='Дата создания',
         auto_now_add=True,
     )
+
+    class Meta:
+        # в индексе SQLite за created следует rowid, то есть id
+        ordering = ('created', 'id')
+        indexes = [
+            models.Index(
+                fields=('post', 'created'), name='comment_post_created_idx'
+            ),
+        ]
     
     def __str__(self): 
         return self.text[:15]  
@@ -109,3 +208,180 @@ class Follow(models.Model):
         related_name='following',
         help_text='Автор',
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Записей',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Подписан',
+        default=0,
+    )
+
+    def __str__(self):
+        return f'{self.user}: {self.posts_count}'
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        verbose_name='Читатель',
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='timeline_user_date_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'), name='timeline_user_author_idx'
+            ),
+        ]
+
+
+class SearchTerm(models.Model):
+    """Вхождение терма в пост или комментарий к нему: обратный индекс
+    поиска для баз без FTS5."""
+    term = models.CharField(
+        verbose_name='Терм',
+        max_length=64,
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    comment = models.ForeignKey(
+        Comment,
+        verbose_name='Комментарий',
+        on_delete=models.CASCADE,
+        related_name='+',
+        blank=True,
+        null=True,
+        help_text='Пусто у термов текста поста',
+    )
+    weight = models.PositiveIntegerField(
+        verbose_name='Вес',
+        default=1,
+        help_text='Вхождения в текст поста считаются дважды',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('term', 'post'), condition=models.Q(comment=None),
+                name='unique_search_term',
+            ),
+            models.UniqueConstraint(
+                fields=('term', 'comment'), name='unique_comment_term'
+            ),
+        ]
+
+
+class Job(models.Model):
+    """Фоновая задача очереди posts.jobs."""
+    name = models.CharField(
+        verbose_name='Задача',
+        max_length=64,
+    )
+    payload = models.TextField(
+        verbose_name='Аргумент',
+        help_text='JSON',
+    )
+    key = models.CharField(
+        verbose_name='Ключ идемпотентности',
+        max_length=128,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text='Ожидающая задача с тем же ключом не дублируется',
+    )
+    version = models.PositiveIntegerField(
+        verbose_name='Версия',
+        default=0,
+        help_text='Растёт при повторной постановке задачи с тем же ключом',
+    )
+    attempts = models.PositiveIntegerField(
+        verbose_name='Попыток',
+        default=0,
+    )
+    run_after = models.DateTimeField(
+        verbose_name='Не раньше',
+    )
+    claim = models.CharField(
+        verbose_name='Метка воркера',
+        max_length=32,
+        blank=True,
+    )
+    locked_until = models.DateTimeField(
+        verbose_name='Занята до',
+        null=True,
+        blank=True,
+    )
+    failed = models.BooleanField(
+        verbose_name='Провалена',
+        default=False,
+    )
+    error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True,
+    )
+    created = models.DateTimeField(
+        verbose_name='Поставлена',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('failed', 'run_after'), name='job_ready_idx'
+            ),
+            models.Index(fields=('claim',), name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name}({self.payload})'
@@ -0,0 +1,199 @@
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+NEWEST = 'newest'
+OLDEST = 'oldest'
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, number, key):
+    """Упаковывает направление, номер страницы и ключ (дата, id)
+    в непрозрачную строку для ссылки ?cursor=."""
+    pub_date, pk = key
+    raw = f'{direction}|{number}|{pub_date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор; для пустого или испорченного курсора
+    возвращает None, как Paginator.get_page для неверного номера."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, number, pub_date, pk = raw.decode().split('|')
+        pub_date = parse_datetime(pub_date)
+        number, pk = int(number), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, max(number, 1), (pub_date, pk)
+
+
+def keyset_range(queryset, direction, key, date_field='pub_date',
+                 id_field='id'):
+    """Строки строго после ключа (вперёд) или до него (назад),
+    упорядоченные по ключу в сторону чтения."""
+    if direction == NEXT:
+        lookup, ordering = 'lt', ('-' + date_field, '-' + id_field)
+    else:
+        lookup, ordering = 'gt', (date_field, id_field)
+    queryset = queryset.order_by(*ordering)
+    if key is None:
+        return queryset
+    pub_date, pk = key
+    return queryset.filter(
+        Q(**{f'{date_field}__{lookup}': pub_date})
+        | Q(**{date_field: pub_date, f'{id_field}__{lookup}': pk})
+    )
+
+
+class CursorPage:
+    """Страница ленты, выбранная по ключу (pub_date, id).
+
+    Запрос выполняется лениво, при первом обращении к записям,
+    и всегда читает не больше per_page + 1 строк."""
+
+    def __init__(self, paginator, number, direction=NEXT, key=None):
+        self.paginator = paginator
+        self.number = number
+        self.direction = direction
+        self.key = key
+        self._object_list = None
+        self._has_more = False
+
+    def _fetch(self):
+        if self._object_list is None:
+            rows = self.paginator.fetch(
+                self.direction, self.key, self.paginator.per_page + 1
+            )
+            self._has_more = len(rows) > self.paginator.per_page
+            rows = rows[:self.paginator.per_page]
+            if self.direction == PREVIOUS:
+                rows.reverse()
+            self._object_list = rows
+        return self._object_list
+
+    @property
+    def object_list(self):
+        return self._fetch()
+
+    def __len__(self):
+        return len(self._fetch())
+
+    def __iter__(self):
+        return iter(self._fetch())
+
+    def __getitem__(self, index):
+        return self._fetch()[index]
+
+    def __bool__(self):
+        return bool(self._fetch())
+
+    def has_next(self):
+        self._fetch()
+        if self.direction == NEXT:
+            return self._has_more
+        return self.key is not None
+
+    def has_previous(self):
+        self._fetch()
+        if self.direction == PREVIOUS:
+            return self._has_more
+        return self.key is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def token(self):
+        """Курсор, которым открыта страница; пустой для первой."""
+        if self.key is None:
+            return ''
+        return encode_cursor(self.direction, self.number, self.key)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return encode_cursor(
+            NEXT, self.number + 1, self.paginator.key_of(self[-1])
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return encode_cursor(
+            PREVIOUS, self.number - 1, self.paginator.key_of(self[0])
+        )
+
+
+class KeysetPaginator:
+    """Постраничная навигация по ключу (pub_date, id) без COUNT(*)
+    и OFFSET: стоимость страницы не зависит от её глубины."""
+
+    date_field = 'pub_date'
+    id_field = 'id'
+    # первая страница - самые старые записи, а не самые новые
+    ascending = False
+
+    def __init__(self, queryset, per_page=POSTS_PER_PAGE):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def key_of(self, obj):
+        return getattr(obj, self.date_field), getattr(obj, self.id_field)
+
+    def fetch(self, direction, key, limit):
+        if self.ascending:
+            direction = PREVIOUS if direction == NEXT else NEXT
+        return list(keyset_range(
+            self.queryset, direction, key, self.date_field, self.id_field
+        )[:limit])
+
+    def get_page(self, cursor=None):
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            return CursorPage(self, 1)
+        direction, number, key = decoded
+        return CursorPage(self, number, direction, key)
+
+
+class CommentPaginator(KeysetPaginator):
+    """Комментарии поста по ключу (created, id) вместе с авторами."""
+
+    date_field = 'created'
+
+    def __init__(self, post, order=OLDEST, per_page=COMMENTS_PER_PAGE):
+        super().__init__(post.comments.select_related('author'), per_page)
+        self.order = order
+        self.ascending = order != NEWEST
+
+
+def paginate(request, queryset, per_page=POSTS_PER_PAGE, keyset=None):
+    """Контекст ленты для шаблона.
+
+    page и paginator остаются стандартными Page и Paginator, но
+    записи страницы берутся из cursor_page, поэтому COUNT(*) не
+    выполняется, пока кто-то явно не спросит paginator.count.
+    keyset позволяет подставить другой источник записей страницы."""
+    if keyset is None:
+        keyset = KeysetPaginator(queryset, per_page)
+    cursor_page = keyset.get_page(request.GET.get('cursor'))
+    paginator = Paginator(queryset, per_page)
+    return {
+        'page': Page(cursor_page, cursor_page.number, paginator),
+        'paginator': paginator,
+        'cursor_page': cursor_page,
+    }
@@ -0,0 +1,109 @@
+"""Ограничение частоты записей: ведро токенов на пользователя и на IP.
+
+Ведро хранится в кэше одним целым - теоретическим временем прихода
+следующего запроса (GCRA, эквивалент ведра токенов), и меняется только
+атомарным incr, поэтому параллельные воркеры не теряют списания. Лимит
+'10/m' - ведро на 10 запросов, которое полностью наполняется за минуту.
+Сверх лимита вид отвечает 429 с заголовком Retry-After."""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+MICROSECONDS = 10 ** 6
+
+
+def parse_rate(rate):
+    """'10/m' -> (ёмкость ведра, микросекунд на один токен)."""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, PERIODS[period] * MICROSECONDS // count
+
+
+def _now():
+    return time.time_ns() // 1000
+
+
+def take(key, rate):
+    """Списывает токен. 0, если токен был, иначе секунды до
+    появления следующего."""
+    burst, interval = parse_rate(rate)
+    timeout = math.ceil(burst * interval / MICROSECONDS) + 1
+    now = _now()
+    try:
+        arrival = cache.incr(key, interval)
+    except ValueError:
+        if cache.add(key, now + interval, timeout):
+            return 0
+        arrival = cache.incr(key, interval)
+    if arrival - interval < now:
+        # ведро успело наполниться: отсчёт от текущего момента
+        arrival = cache.incr(key, now + interval - arrival)
+    if arrival - now <= burst * interval:
+        cache.touch(key, timeout)
+        return 0
+    # отказ токен не тратит
+    cache.decr(key, interval)
+    return math.ceil((arrival - now - burst * interval) / MICROSECONDS)
+
+
+def give_back(key, rate):
+    cache.decr(key, parse_rate(rate)[1])
+
+
+def client_ip(request):
+    """Адрес клиента: из заголовка settings.RATE_LIMIT_IP_HEADER,
+    если он задан и в нём хватает адресов от RATE_LIMIT_PROXY_HOPS
+    прокси, иначе REMOTE_ADDR."""
+    header = settings.RATE_LIMIT_IP_HEADER
+    if header:
+        # X-Forwarded-For: что прислал клиент, клиент, прокси1, ...;
+        # левее адресов наших прокси любые значения подделываются
+        addresses = [
+            address.strip()
+            for address in request.META.get(header, '').split(',')
+        ]
+        hops = settings.RATE_LIMIT_PROXY_HOPS
+        if len(addresses) >= hops and addresses[-hops]:
+            return addresses[-hops]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _buckets(request, scope):
+    limits = settings.RATE_LIMITS.get(scope, {})
+    if 'user' in limits and request.user.is_authenticated:
+        yield f'ratelimit:{scope}:user:{request.user.pk}', limits['user']
+    if 'ip' in limits:
+        yield f'ratelimit:{scope}:ip:{client_ip(request)}', limits['ip']
+
+
+def rate_limit(scope, methods=('POST',)):
+    """Декоратор вида: запросы methods расходуют токены вёдер
+    пользователя и IP из settings.RATE_LIMITS[scope]."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.RATE_LIMIT_ENABLED and request.method in methods:
+                taken = []
+                for key, rate in _buckets(request, scope):
+                    retry_after = take(key, rate)
+                    if retry_after:
+                        for key, rate in taken:
+                            give_back(key, rate)
+                        return too_many_requests(request, retry_after)
+                    taken.append((key, rate))
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def too_many_requests(request, retry_after):
+    response = render(request, 'misc/429.html', {
+        'retry_after': retry_after,
+    }, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
@@ -0,0 +1,298 @@
+"""Полнотекстовый поиск по постам и комментариям к ним.
+
+Текст поста и каждый комментарий индексируются отдельными строками,
+связанными с постом, а найденным считается пост, в тексте которого или
+в комментариях к которому встретились все слова запроса. Новый
+комментарий добавляет в индекс только свои термы и не перечитывает
+ветку. В индекс попадают термы из posts.stemmer, поэтому «книги»
+находят «книгами». На SQLite индекс - виртуальные таблицы FTS5 с
+ранжированием bm25, на прочих базах - таблица SearchTerm с весами
+вхождений и ранжированием по tf-idf. Индекс обновляется сигналами при
+сохранении и удалении постов и комментариев: удаление - сразу,
+индексация - задачей очереди posts.jobs."""
+import math
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+
+from . import jobs
+from .models import Comment, Post, SearchTerm
+from .stemmer import terms
+
+FTS_TABLE = 'posts_post_search'
+COMMENTS_FTS_TABLE = 'posts_comment_search'
+# Вес совпадения в тексте поста относительно комментариев
+TEXT_WEIGHT = 2
+# не больше 500 строк в пачке вставки на SQLite, см. timeline.BATCH_SIZE
+BATCH_SIZE = 500
+TERM_LENGTH = SearchTerm._meta.get_field('term').max_length
+
+
+def fts5_available():
+    return _fts5_available(connection.vendor)
+
+
+@lru_cache(maxsize=None)
+def _fts5_available(vendor):
+    if vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pragma_module_list WHERE name = 'fts5'"
+        )
+        return cursor.fetchone() is not None
+
+
+def _post_terms(post_ids):
+    """Термы текста каждого из постов."""
+    return {
+        pk: terms(text)
+        for pk, text in Post.objects.filter(
+            pk__in=post_ids
+        ).values_list('pk', 'text')
+    }
+
+
+def _comment_terms(comment_ids):
+    """Пост и термы каждого из комментариев."""
+    return {
+        pk: (post_id, terms(text))
+        for pk, post_id, text in Comment.objects.filter(
+            pk__in=comment_ids
+        ).values_list('pk', 'post_id', 'text')
+    }
+
+
+def _delete_rows(cursor, table, rowids):
+    cursor.execute(
+        f'DELETE FROM {table} WHERE rowid IN (%s)'
+        % ', '.join(['%s'] * len(rowids)),
+        list(rowids),
+    )
+
+
+class FtsIndex:
+    """Индекс в таблицах FTS5 с уже выделенными основами слов: в
+    posts_post_search rowid - id поста, в posts_comment_search - id
+    комментария, а неиндексируемая колонка post связывает его с постом."""
+
+    def update(self, post_ids):
+        documents = _post_terms(post_ids)
+        with connection.cursor() as cursor:
+            _delete_rows(cursor, FTS_TABLE, post_ids)
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [(pk, ' '.join(text)) for pk, text in documents.items()],
+            )
+
+    def update_comments(self, comment_ids):
+        documents = _comment_terms(comment_ids)
+        with connection.cursor() as cursor:
+            _delete_rows(cursor, COMMENTS_FTS_TABLE, comment_ids)
+            cursor.executemany(
+                f'INSERT INTO {COMMENTS_FTS_TABLE} (rowid, text, post) '
+                'VALUES (%s, %s, %s)',
+                [(pk, ' '.join(text), post_id)
+                 for pk, (post_id, text) in documents.items()],
+            )
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            _delete_rows(cursor, FTS_TABLE, post_ids)
+
+    def remove_comments(self, comment_ids):
+        with connection.cursor() as cursor:
+            _delete_rows(cursor, COMMENTS_FTS_TABLE, comment_ids)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(f'DELETE FROM {COMMENTS_FTS_TABLE}')
+
+    def search(self, query_terms, limit):
+        # каждый терм ищется отдельно в постах и в комментариях: слова
+        # запроса могут встретиться в разных строках одного поста;
+        # термы состоят только из букв и цифр, кавычки их экранируют
+        hits, params = [], []
+        for number, term in enumerate(query_terms):
+            hits += [
+                f'SELECT rowid AS post, {number} AS term, '
+                f'bm25({FTS_TABLE}) * {TEXT_WEIGHT} AS rank '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                f'SELECT post, {number}, bm25({COMMENTS_FTS_TABLE}) '
+                f'FROM {COMMENTS_FTS_TABLE} '
+                f'WHERE {COMMENTS_FTS_TABLE} MATCH %s',
+            ]
+            params += [f'"{term}"'] * 2
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post FROM ({" UNION ALL ".join(hits)}) '
+                'GROUP BY post HAVING COUNT(DISTINCT term) = %s '
+                'ORDER BY SUM(rank), post DESC LIMIT %s',
+                params + [len(query_terms), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def _weights(text, weight):
+    """Вес каждого терма текста. Термы длиннее колонки обрезаются:
+    длинные слова с общим началом становятся одним термом."""
+    weights = {}
+    for term in text:
+        term = term[:TERM_LENGTH]
+        weights[term] = weights.get(term, 0) + weight
+    return weights
+
+
+class TermIndex:
+    """Обратный индекс в таблице SearchTerm для баз без FTS5: термы
+    текста поста - строки без комментария, термы комментария - строки
+    с ним. Термы запроса обрезаются так же, как при индексации."""
+
+    def update(self, post_ids):
+        documents = _post_terms(post_ids)
+        self.remove(post_ids)
+        SearchTerm.objects.bulk_create(
+            (
+                SearchTerm(term=term, post_id=pk, weight=weight)
+                for pk, text in documents.items()
+                for term, weight in _weights(text, TEXT_WEIGHT).items()
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+    def update_comments(self, comment_ids):
+        documents = _comment_terms(comment_ids)
+        self.remove_comments(comment_ids)
+        SearchTerm.objects.bulk_create(
+            (
+                SearchTerm(
+                    term=term, post_id=post_id, comment_id=pk, weight=weight
+                )
+                for pk, (post_id, text) in documents.items()
+                for term, weight in _weights(text, 1).items()
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+    def remove(self, post_ids):
+        SearchTerm.objects.filter(post_id__in=post_ids, comment=None).delete()
+
+    def remove_comments(self, comment_ids):
+        SearchTerm.objects.filter(comment_id__in=comment_ids).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def search(self, query_terms, limit):
+        query_terms = list(dict.fromkeys(
+            term[:TERM_LENGTH] for term in query_terms
+        ))
+        postings = SearchTerm.objects.filter(term__in=query_terms)
+        frequencies = dict(
+            postings.values_list('term').annotate(
+                Count('post', distinct=True)
+            )
+        )
+        # каждый терм запроса должен встретиться в посте
+        if len(frequencies) < len(query_terms):
+            return []
+        total = Post.objects.count()
+        idf = Case(
+            *(When(term=term, then=Value(math.log(1 + total / frequency)))
+              for term, frequency in frequencies.items()),
+            output_field=FloatField(),
+        )
+        return list(
+            postings.values('post_id').annotate(
+                matches=Count('term', distinct=True),
+                score=Sum(F('weight') * idf, output_field=FloatField()),
+            ).filter(matches=len(query_terms)).order_by(
+                '-score', '-post_id'
+            ).values_list('post_id', flat=True)[:limit]
+        )
+
+
+def get_index():
+    backend = settings.SEARCH_BACKEND
+    if backend == 'auto':
+        backend = 'fts5' if fts5_available() else 'terms'
+    return FtsIndex() if backend == 'fts5' else TermIndex()
+
+
+def index_posts(*post_ids):
+    get_index().update(post_ids)
+
+
+def index_comments(*comment_ids):
+    get_index().update_comments(comment_ids)
+
+
+@jobs.handler('search.index', batch=True)
+def _index_batch(post_ids):
+    index_posts(*post_ids)
+
+
+@jobs.handler('search.index_comments', batch=True)
+def _index_comments_batch(comment_ids):
+    index_comments(*comment_ids)
+
+
+def schedule_index(post_id):
+    """Переиндексирует текст поста в фоне; пока задача ждёт, новые
+    правки поста не ставят её повторно."""
+    jobs.enqueue('search.index', post_id, key=f'search:{post_id}')
+
+
+def schedule_comment_index(comment_id):
+    """Индексирует комментарий в фоне: только его термы, без ветки."""
+    jobs.enqueue(
+        'search.index_comments', comment_id,
+        key=f'search-comment:{comment_id}',
+    )
+
+
+def remove_posts(*post_ids):
+    get_index().remove(post_ids)
+
+
+def remove_comments(*comment_ids):
+    get_index().remove_comments(comment_ids)
+
+
+def _in_batches(index_batch, ids, batch_size):
+    batch = []
+    for pk in ids.iterator():
+        batch.append(pk)
+        if len(batch) == batch_size:
+            index_batch(batch)
+            batch = []
+    if batch:
+        index_batch(batch)
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Строит индекс заново по всем постам и комментариям."""
+    index = get_index()
+    index.clear()
+    for model, index_batch in (
+        (Post, index.update), (Comment, index.update_comments),
+    ):
+        _in_batches(
+            index_batch,
+            model.objects.order_by('pk').values_list('pk', flat=True),
+            batch_size,
+        )
+
+
+def search_post_ids(query, limit=None):
+    """id постов по запросу, от самых подходящих; все слова запроса
+    должны встретиться в посте или его комментариях."""
+    query_terms = list(dict.fromkeys(terms(query)))
+    if not query_terms:
+        return []
+    return get_index().search(
+        query_terms, limit or settings.SEARCH_MAX_RESULTS
+    )
@@ -0,0 +1,311 @@
+"""Синтетические данные для нагрузочных замеров и локальной копии
+масштаба продакшена.
+
+Строки собираются кусками по CHUNK_SIZE, при workers > 1 - в дочерних
+процессах, и вставляются одним executemany на кусок, без создания
+объектов моделей. Каждый кусок получает свой генератор случайных
+чисел от seed, имени таблицы и номера куска, поэтому данные не зависят
+от числа процессов. Сигналы при такой вставке не срабатывают:
+счётчики, ленты подписок и поисковый индекс пересчитываются в конце.
+
+Популярность пользователей подчиняется степенному закону: у немногих
+авторов много подписчиков и записей, у большинства - единицы."""
+import random
+from datetime import timedelta
+from io import BytesIO
+from multiprocessing import get_context
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from . import counters, images, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+CHUNK_SIZE = 10000
+IMAGE_VARIANTS = 8
+# Что пересчитать после вставки
+DERIVED = ('counters', 'timelines', 'search')
+
+WORDS = (
+    'город', 'дорога', 'музыка', 'песня', 'гитара', 'концерт', 'альбом',
+    'зима', 'море', 'погода', 'работа', 'друзья', 'поход', 'закат',
+    'рассвет', 'история', 'память', 'вечер', 'лес', 'река', 'улица',
+    'поезд', 'вокзал', 'окно', 'книга', 'кошка', 'утро', 'дождь', 'снег',
+    'новый', 'старый', 'тихий', 'долгий', 'первый', 'последний', 'вижу',
+    'помню', 'слушаю', 'читаю', 'иду', 'жду', 'люблю', 'сегодня', 'снова',
+)
+
+# Общие для кусков данные: дочерние процессы получают их при fork
+_context = {}
+
+
+def text(rnd, words=12):
+    return ' '.join(rnd.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def make_images(rnd):
+    """Несколько картинок с готовыми миниатюрами: (имя, адрес миниатюры)."""
+    result = []
+    for number in range(IMAGE_VARIANTS):
+        buffer = BytesIO()
+        color = tuple(rnd.randrange(256) for _ in range(3))
+        Image.new('RGB', (1200, 800), color).save(buffer, 'PNG')
+        upload = SimpleUploadedFile(f'seed-{number}.png', buffer.getvalue())
+        renditions = images.render(upload)
+        name = default_storage.save(
+            'posts/' + renditions[images.FULL].name, renditions[images.FULL]
+        )
+        result.append(
+            (name, images.save_thumbnail(renditions[images.FEED]))
+        )
+    return result
+
+
+def power_law(count, alpha):
+    """Накопленные веса рангов 1 / rank ** alpha для random.choices."""
+    cum_weights, total = [], 0
+    for rank in range(1, count + 1):
+        total += rank ** -alpha
+        cum_weights.append(total)
+    return cum_weights
+
+
+def _rnd(table, chunk):
+    return random.Random(f'{_context["seed"]}:{table}:{chunk}')
+
+
+def _chunks(total):
+    return [
+        (number, first, min(CHUNK_SIZE, total - first))
+        for number, first in enumerate(range(0, total, CHUNK_SIZE))
+    ]
+
+
+def _follow_rows(chunk):
+    """Подписки куска пользователей: у каждого follows разных авторов,
+    авторы выбираются с весами степенного закона."""
+    number, first, count = chunk
+    rnd = _rnd('follows', number)
+    user_ids = _context['user_ids']
+    follows = min(_context['follows'], len(user_ids) - 1)
+    rows = []
+    for index in range(first, first + count):
+        authors = set()
+        for _ in range(10):
+            authors.update(rnd.choices(
+                range(len(user_ids)),
+                cum_weights=_context['popularity'],
+                k=follows * 2,
+            ))
+            authors.discard(index)
+            if len(authors) >= follows:
+                break
+        else:
+            # одних популярных авторов не хватило: добираем равномерно
+            rest = [i for i in range(len(user_ids)) if i != index]
+            authors.update(rnd.sample(rest, follows))
+            authors.discard(index)
+        for author in sorted(authors)[:follows]:
+            rows.append((user_ids[index], user_ids[author]))
+    return rows
+
+
+def _post_date(index):
+    return _context['start'] + _context['step'] * index
+
+
+def _post_rows(chunk):
+    number, first, count = chunk
+    rnd = _rnd('posts', number)
+    group_ids, pictures = _context['group_ids'], _context['pictures']
+    authors = rnd.choices(
+        _context['user_ids'], cum_weights=_context['popularity'], k=count
+    )
+    rows = []
+    for index, author_id in zip(range(first, first + count), authors):
+        name, thumbnail = '', ''
+        if pictures and rnd.random() < _context['image_share']:
+            name, thumbnail = rnd.choice(pictures)
+        group_id = None
+        if group_ids and rnd.random() < 0.5:
+            group_id = rnd.choice(group_ids)
+        rows.append((
+            text(rnd), _post_date(index), author_id, group_id, name,
+            thumbnail,
+        ))
+    return rows
+
+
+def _comment_rows(chunk):
+    number, first, count = chunk
+    rnd = _rnd('comments', number)
+    user_ids, post_ids = _context['user_ids'], _context['post_ids']
+    rows = []
+    for _ in range(count):
+        index = rnd.randrange(len(post_ids))
+        created = _post_date(index) + timedelta(
+            minutes=rnd.randrange(1, 24 * 60)
+        )
+        rows.append((
+            post_ids[index], rnd.choice(user_ids), text(rnd, 6), created,
+        ))
+    return rows
+
+
+def insert_rows(model, field_names, rows):
+    """Вставляет строки одним executemany, минуя объекты моделей.
+
+    rows - кортежи значений полей field_names, остальные поля получают
+    значения по умолчанию. bulk_create в Django 2.2 на SQLite кладёт в
+    запрос не больше 999 параметров и заметно медленнее."""
+    opts = model._meta
+    given = [opts.get_field(name) for name in field_names]
+    defaults = [
+        field for field in opts.concrete_fields
+        if field not in given and not field.primary_key
+    ]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote(opts.db_table),
+        ', '.join(quote(field.column) for field in given + defaults),
+        ', '.join(['%s'] * (len(given) + len(defaults))),
+    )
+    tail = [
+        field.get_db_prep_save(field.get_default(), connection)
+        for field in defaults
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            [
+                field.get_db_prep_save(value, connection)
+                for field, value in zip(given, row)
+            ] + tail
+            for row in rows
+        ])
+
+
+def _fill(model, field_names, make_rows, total, pool, log):
+    chunks = _chunks(total)
+    rows = pool.imap(make_rows, chunks) if pool else map(make_rows, chunks)
+    inserted = 0
+    with transaction.atomic():
+        for done, chunk in enumerate(rows, 1):
+            insert_rows(model, field_names, chunk)
+            inserted += len(chunk)
+            log(
+                f'{model._meta.verbose_name_plural}: {inserted} '
+                f'({done * 100 // len(chunks)}%)'
+            )
+
+
+def last_pk(model):
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+
+
+def new_pks(model, after):
+    return list(
+        model.objects.filter(pk__gt=after).order_by('pk').values_list(
+            'pk', flat=True
+        )
+    )
+
+
+def rebuild_derived(derived=DERIVED, log=lambda message: None):
+    """Пересчитывает то, что при вставке мимо моделей не обновили
+    сигналы: счётчики, ленты подписок и поисковый индекс."""
+    if 'counters' in derived:
+        log('Пересчёт счётчиков')
+        with transaction.atomic():
+            counters.rebuild_counters()
+    if 'timelines' in derived:
+        log('Сборка лент подписок')
+        with transaction.atomic():
+            timeline.rebuild()
+    if 'search' in derived:
+        log('Построение поискового индекса')
+        with transaction.atomic():
+            search.rebuild()
+
+
+def _pool(workers):
+    # данные кусков из _context попадают в процессы при fork
+    return get_context('fork').Pool(workers) if workers > 1 else None
+
+
+def _close(pool):
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+
+def seed(users=100, groups=10, posts=1000, comments=2000, follows=10,
+         image_share=0.2, random_seed=0, prefix='bench', alpha=1.0,
+         workers=1, derived=DERIVED, log=lambda message: None):
+    """Создаёт пользователей, группы, подписки, посты и комментарии
+    и пересобирает то, что обычно поддерживают сигналы.
+
+    follows - подписок у каждого пользователя, alpha - показатель
+    степенного закона популярности авторов. Возвращает id созданных
+    пользователей и постов."""
+    rnd = random.Random(random_seed)
+    last_user, last_group = last_pk(User), last_pk(Group)
+    last_post = last_pk(Post)
+    now = timezone.now()
+    with transaction.atomic():
+        insert_rows(User, ('username', 'password', 'date_joined'), (
+            (f'{prefix}{n}', '!', now) for n in range(users)
+        ))
+        insert_rows(Group, ('title', 'slug', 'description'), (
+            (f'Группа {n}', f'{prefix}-group-{n}', text(rnd))
+            for n in range(groups)
+        ))
+    user_ids = new_pks(User, last_user)
+    _context.update(
+        seed=random_seed,
+        user_ids=user_ids,
+        group_ids=new_pks(Group, last_group),
+        pictures=make_images(rnd) if image_share else [],
+        follows=follows,
+        image_share=image_share,
+        popularity=power_law(users, alpha),
+        start=now - timedelta(days=365),
+        step=timedelta(days=365) / max(posts, 1),
+    )
+    try:
+        pool = _pool(workers)
+        try:
+            if len(user_ids) > 1 and follows:
+                _fill(
+                    Follow, ('user', 'author'), _follow_rows, users, pool,
+                    log,
+                )
+            if user_ids:
+                _fill(
+                    Post,
+                    ('text', 'pub_date', 'author', 'group', 'image',
+                     'thumbnail'),
+                    _post_rows, posts, pool, log,
+                )
+        finally:
+            _close(pool)
+        # новый пул: процессам для комментариев нужны id постов
+        _context['post_ids'] = post_ids = new_pks(Post, last_post)
+        if post_ids:
+            pool = _pool(workers)
+            try:
+                _fill(
+                    Comment, ('post', 'author', 'text', 'created'),
+                    _comment_rows, comments, pool, log,
+                )
+            finally:
+                _close(pool)
+    finally:
+        _context.clear()
+
+    rebuild_derived(derived, log)
+    return user_ids, post_ids
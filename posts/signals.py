@@ -0,0 +1,121 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import (
+    counters, feed_cache, follows, group_pages, search, thumbnails, timeline,
+)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, raw=False, update_fields=None,
+                 **kwargs):
+    # имя автора - в карточке и заголовке его профиля и страниц постов;
+    # время входа (update_last_login) на страницах не видно
+    if created or raw or update_fields == {'last_login'}:
+        return
+    feed_cache.invalidate(
+        feed_cache.profile_scope(instance.pk),
+        feed_cache.follow_scope(instance.pk),
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user_stats(instance.author_id, 'posts_count', 1)
+        timeline.schedule_fan_out(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user_stats(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        follows.follow_changed(instance.user_id, instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    follows.follow_changed(instance.user_id, instance.author_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnail(sender, instance, raw=False, **kwargs):
+    if instance.image and not instance.thumbnail and not raw:
+        thumbnails.schedule(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    # группа могла смениться: прежнюю ленту группы тоже надо сбросить
+    loaded = getattr(instance, '_loaded', {})
+    group_ids = (instance.group_id, loaded.get('group_id'))
+    feed_cache.invalidate_post(instance.author_id, *group_ids)
+    group_pages.schedule_refresh(*group_ids)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    post = Post.objects.filter(pk=instance.post_id).values(
+        'author_id', 'group_id'
+    ).first()
+    if post is not None:
+        feed_cache.invalidate_post(post['author_id'], post['group_id'])
+        group_pages.schedule_refresh(post['group_id'])
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.schedule_index(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_posts(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, raw=False, **kwargs):
+    # комментарий - своя строка индекса: ветку поста не перечитываем
+    if not raw:
+        search.schedule_comment_index(instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.remove_comments(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # название группы выводится в карточках всех лент; карта групп
+    # привязана к той же версии
+    feed_cache.invalidate(feed_cache.GLOBAL)
+    # у удалённой группы страниц нет
+    if kwargs['signal'] is post_save:
+        group_pages.schedule_refresh(instance.pk)
@@ -0,0 +1,125 @@
+"""Стеммер Snowball для русского языка и разбиение текста на термы.
+
+Реализация повторяет алгоритм russian.sbl: окончания ищутся в области
+RV (после первой гласной), словообразовательный суффикс - в R2."""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'^[а-я]+$')
+
+# Первая группа окончаний допустима только после «а» или «я»
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейш', 'ейше')
+DERIVATIONAL = ('ост', 'ость')
+
+
+def _regions(word):
+    def gopast(start, vowel):
+        for i in range(start, len(word)):
+            if (word[i] in VOWELS) == vowel:
+                return i + 1
+        return len(word)
+
+    rv = gopast(0, True)
+    r2 = gopast(gopast(gopast(rv, False), True), False)
+    return rv, r2
+
+
+def _ending(word, limit, endings):
+    """Самое длинное из окончаний, целиком лежащее в word[limit:]."""
+    found = ''
+    for ending in endings:
+        if (len(ending) > len(found) and word.endswith(ending)
+                and len(word) - len(ending) >= limit):
+            found = ending
+    return found
+
+
+def _remove(word, limit, endings, endings_after_a=()):
+    """Слово без окончания или None, если окончания нет."""
+    ending = _ending(word, limit, endings + endings_after_a)
+    if not ending:
+        return None
+    if ending in endings_after_a:
+        before = len(word) - len(ending) - 1
+        if before < limit or word[before] not in 'ая':
+            return None
+    return word[:-len(ending)]
+
+
+def _adjectival(word, limit):
+    ending = _ending(word, limit, ADJECTIVE)
+    if not ending:
+        return None
+    word = word[:-len(ending)]
+    participle = _remove(word, limit, PARTICIPLE[1], PARTICIPLE[0])
+    return word if participle is None else participle
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    """Основа русского слова в нижнем регистре."""
+    rv, r2 = _regions(word)
+    stripped = _remove(
+        word, rv, PERFECTIVE_GERUND[1], PERFECTIVE_GERUND[0]
+    )
+    if stripped is None:
+        reflexive = _ending(word, rv, REFLEXIVE)
+        if reflexive:
+            word = word[:-len(reflexive)]
+        stripped = _adjectival(word, rv)
+        if stripped is None:
+            stripped = _remove(word, rv, VERB[1], VERB[0])
+        if stripped is None:
+            stripped = _remove(word, rv, NOUN)
+    if stripped is not None:
+        word = stripped
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    derivational = _ending(word, r2, DERIVATIONAL)
+    if derivational:
+        word = word[:-len(derivational)]
+    ending = _ending(word, rv, SUPERLATIVE + ('н', 'ь'))
+    if ending == 'ь':
+        word = word[:-1]
+    elif ending:
+        if ending in SUPERLATIVE:
+            word = word[:-len(ending)]
+        if word.endswith('нн') and len(word) - 2 >= rv:
+            word = word[:-1]
+    return word
+
+
+def terms(text):
+    """Термы текста: основы русских слов, прочие слова как есть."""
+    result = []
+    for word in WORD_RE.findall(text.lower().replace('ё', 'е')):
+        result.append(stem(word) if CYRILLIC_RE.match(word) else word)
+    return result
@@ -0,0 +1,35 @@
+from django import template
+
+from posts import feed_cache
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+
+    def __init__(self, nodelist, key):
+        self.nodelist = nodelist
+        self.key = key
+
+    def render(self, context):
+        key = self.key.resolve(context)
+        if not key:
+            return self.nodelist.render(context)
+        return feed_cache.get_or_render(
+            key, lambda: self.nodelist.render(context)
+        )
+
+
+@register.tag
+def feedcache(parser, token):
+    """{% feedcache feed_key %} ... {% endfeedcache %}
+
+    Кэширует фрагмент ленты под ключом из posts.feed_cache.feed_key."""
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает ровно один аргумент: ключ ленты'
+        )
+    nodelist = parser.parse(('endfeedcache',))
+    parser.delete_first_token()
+    return FeedCacheNode(nodelist, parser.compile_filter(bits[1]))
@@ -0,0 +1,145 @@
+# posts/tests/test_api.py
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.paginator import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='george', first_name='George', last_name='Harrison'
+        )
+        cls.reader = User.objects.create_user(username='pattie')
+        cls.group = Group.objects.create(
+            title='Битлз', slug='beatles', description='Всё о битлах'
+        )
+        for i in range(POSTS_PER_PAGE + 3):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group,
+                thumbnail='/media/posts/thumbs/1.webp' if i == 0 else '',
+            )
+        cls.post = Post.objects.order_by('id').first()
+        for i in range(COMMENTS_PER_PAGE + 1):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Ответ {i}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+
+    def walk(self, url):
+        ids, cursor = [], None
+        while True:
+            data = self.client.get(url, {'cursor': cursor or ''}).json()
+            ids += [post['id'] for post in data['results']]
+            if data['next'] is None:
+                return ids, data
+            cursor = data['next']
+
+    def test_feeds_page_by_cursor(self):
+        """Ленты API листаются курсором без пропусков."""
+        expected = list(Post.objects.values_list('id', flat=True))
+        self.client.force_login(self.reader)
+        for name, args in (
+            ('api_index', ()),
+            ('api_group', (self.group.slug,)),
+            ('api_profile', (self.author.username,)),
+            ('api_follow', ()),
+        ):
+            with self.subTest(view=name):
+                ids, _ = self.walk(reverse(name, args=args))
+                self.assertEqual(ids, expected)
+
+    def test_post_projection(self):
+        data = self.client.get(reverse('api_index')).json()
+        first = data['results'][-1]
+        self.assertEqual(
+            set(first),
+            {'id', 'text', 'pub_date', 'author', 'group', 'image',
+             'thumbnail', 'comments_count'},
+        )
+        oldest = self.walk(reverse('api_index'))[1]['results'][-1]
+        self.assertEqual(oldest['thumbnail'], '/media/posts/thumbs/1.webp')
+        self.assertEqual(oldest['author'], 'george')
+        self.assertEqual(oldest['group'], 'beatles')
+        self.assertIsNone(oldest['image'])
+
+    def test_feed_is_one_query(self):
+        """Страница ленты - один запрос, без объектов моделей."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('api_index'))
+        self.assertEqual(len(queries), 1)
+
+    def test_profile_has_author_card(self):
+        data = self.client.get(
+            reverse('api_profile', args=(self.author.username,))
+        ).json()
+        self.assertEqual(data['author']['full_name'], 'George Harrison')
+        self.assertEqual(data['author']['followers_count'], 1)
+        self.assertEqual(data['author']['posts_count'], POSTS_PER_PAGE + 3)
+
+    def test_post_detail_with_comments(self):
+        url = reverse('api_post', args=(self.post.id,))
+        data = self.client.get(url).json()
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['comments_count'], COMMENTS_PER_PAGE + 1)
+        comments = data['comments']
+        self.assertEqual(len(comments['results']), COMMENTS_PER_PAGE)
+        self.assertEqual(comments['results'][0]['text'], 'Ответ 0')
+        self.assertEqual(comments['results'][0]['author'], 'pattie')
+        rest = self.client.get(url, {'cursor': comments['next']}).json()
+        self.assertEqual(
+            [c['text'] for c in rest['comments']['results']],
+            [f'Ответ {COMMENTS_PER_PAGE}'],
+        )
+
+    def test_missing_objects(self):
+        for url in (
+            reverse('api_post', args=(0,)),
+            reverse('api_group', args=('nothing',)),
+            reverse('api_profile', args=('nobody',)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+    @override_settings(TIMELINE_ENABLED=False)
+    def test_follow_feed_without_timeline(self):
+        """Без материализованных лент лента подписок читается JOIN."""
+        reader = User.objects.create_user(username='olivia')
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+        ids, _ = self.walk(reverse('api_follow'))
+        self.assertEqual(
+            ids, list(Post.objects.values_list('id', flat=True))
+        )
+        page = self.client.get(reverse('follow_index')).context['page']
+        self.assertEqual(
+            ids[:POSTS_PER_PAGE], [post.id for post in page]
+        )
+
+    def test_follow_feed_requires_login(self):
+        response = self.client.get(reverse('api_follow'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_export_streams_all_posts(self):
+        response = self.client.get(reverse('api_export'))
+        self.assertTrue(response.streaming)
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(
+            [row['id'] for row in rows],
+            list(Post.objects.order_by('id').values_list('id', flat=True)),
+        )
@@ -0,0 +1,143 @@
+import shutil
+import tempfile
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from posts.management.commands.bench_templates import (
+    build_backend, index_context, render_times,
+)
+from posts.management.commands.bench_views import drive, percentile
+from posts.models import (
+    Comment, Follow, Group, Post, TimelineEntry, User,
+)
+from posts.seeding import seed
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SeedTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_seed(self):
+        """seed создаёт данные и пересобирает счётчики и ленты."""
+        user_ids, post_ids = seed(
+            users=10, groups=2, posts=50, comments=30, follows=3,
+            image_share=0.5,
+        )
+        self.assertEqual(len(user_ids), 10)
+        self.assertEqual(len(post_ids), 50)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertEqual(Follow.objects.count(), 30)
+        self.assertTrue(TimelineEntry.objects.exists())
+        user = User.objects.select_related('stats').get(pk=user_ids[0])
+        self.assertEqual(user.stats.posts_count, user.posts.count())
+        with_image = Post.objects.exclude(image='')
+        self.assertTrue(with_image.exists())
+        self.assertFalse(with_image.filter(thumbnail='').exists())
+        dates = list(Post.objects.values_list('pub_date', flat=True))
+        self.assertEqual(len(set(dates)), 50)
+
+    def test_seed_independent_of_workers(self):
+        """Данные зависят от seed, а не от числа процессов."""
+        def snapshot():
+            return (
+                list(Follow.objects.order_by('pk').values_list(
+                    'user__username', 'author__username'
+                )),
+                list(Post.objects.order_by('pk').values_list(
+                    'text', 'author__username', 'group__slug'
+                )),
+            )
+
+        seed(users=20, groups=2, posts=40, comments=0, follows=3,
+             image_share=0, derived=(), workers=1)
+        first = snapshot()
+        Follow.objects.all().delete()
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        seed(users=20, groups=2, posts=40, comments=0, follows=3,
+             image_share=0, derived=(), workers=2)
+        self.assertEqual(first, snapshot())
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 51)
+        self.assertEqual(percentile(values, 0.99), 100)
+        self.assertEqual(percentile([], 0.5), 0)
+
+
+class DriveTests(TransactionTestCase):
+
+    def test_drive(self):
+        """drive гоняет запросы в нескольких потоках и считает сводку."""
+        user = User.objects.create_user(username='load')
+        Post.objects.create(text='Под нагрузкой', author=user)
+        summary = drive(
+            lambda client, rnd: client.get(reverse('index')),
+            [user.pk], requests=9, clients=2,
+        )
+        self.assertEqual(summary['requests'], 9)
+        self.assertEqual(summary['errors'], 0)
+        self.assertGreater(summary['queries'], 0)
+        self.assertGreater(summary['rps'], 0)
+        self.assertLessEqual(summary['p50_ms'], summary['p99_ms'])
+
+    def test_drive_logs_in_seeded_users(self):
+        """Клиенты входят настоящими пользователями: лента подписок
+        отдаёт страницы, а не редирект на вход."""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create(username='reader', password='!')
+        Follow.objects.create(user=reader, author=author)
+        Post.objects.create(text='Для подписчиков', author=author)
+        pages = []
+
+        def request(client, rnd):
+            response = client.get(reverse('follow_index'))
+            pages.append(response)
+            return response
+
+        summary = drive(request, [reader.pk], requests=4, clients=2)
+        self.assertEqual(summary['errors'], 0)
+        for response in pages:
+            self.assertContains(response, 'Для подписчиков')
+
+    def test_drive_counts_failures(self):
+        """Редирект на вход и исключения - ошибки, их замеры не теряются."""
+        user = User.objects.create_user(username='load')
+
+        def request(client, rnd):
+            if rnd.random() < 0.5:
+                raise ValueError('сломанный запрос')
+            client.logout()
+            return client.get(reverse('follow_index'))
+
+        summary = drive(request, [user.pk], requests=6, clients=2)
+        self.assertEqual(summary['requests'], 6)
+        self.assertEqual(summary['errors'], 6)
+
+
+class TemplateBenchTests(SimpleTestCase):
+
+    def test_index_renders_without_queries(self):
+        """Замер рисует главную из несохранённых постов."""
+        backend = build_backend(debug=False, cached=True)
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        html = backend.get_template('index.html').render(
+            index_context(), request
+        )
+        self.assertIn('Пост 10', html)
+        self.assertNotIn('Пост 11', html)
+        self.assertIn('?cursor=', html)
+        self.assertEqual(len(render_times(backend, 3)), 3)
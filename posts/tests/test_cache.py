@@ -0,0 +1,144 @@
+# posts/tests/test_cache.py
+import shutil
+import tempfile
+from multiprocessing import Pool
+from os import path
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from posts import feed_cache
+from yatube.cache import SQLiteCache, cache_from_url, is_process_local
+
+
+def increment(location):
+    shared = SQLiteCache(location, {})
+    for _ in range(50):
+        shared.incr('hits')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.location = path.join(self.tmpdir, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_add_does_not_overwrite_live_key(self):
+        """add записывает ключ, только если его нет или он истёк."""
+        self.assertTrue(self.cache.add('key', 'first'))
+        self.assertFalse(self.cache.add('key', 'second'))
+        self.assertEqual(self.cache.get('key'), 'first')
+        self.cache.set('old', 'value', 0)
+        self.assertIsNone(self.cache.get('old', default=None))
+        self.assertTrue(self.cache.add('old', 'new'))
+
+    def test_incr_is_atomic_across_processes(self):
+        """incr из нескольких процессов не теряет приращений."""
+        self.cache.set('hits', 0)
+        with Pool(4) as pool:
+            pool.map(increment, [self.location] * 4)
+        self.assertEqual(self.cache.get('hits'), 200)
+
+    def test_incr_missing_key_raises(self):
+        """incr отсутствующего ключа, как и в memcached, ошибка."""
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_cache_from_url(self):
+        """Настройки кэша собираются из строки окружения."""
+        self.assertEqual(
+            cache_from_url('sqlite:///tmp/c.sqlite3?timeout=60&max_entries=9'),
+            {
+                'BACKEND': 'yatube.cache.SQLiteCache',
+                'LOCATION': '/tmp/c.sqlite3',
+                'TIMEOUT': 60,
+                'OPTIONS': {'MAX_ENTRIES': 9},
+            }
+        )
+        with self.assertRaises(ValueError):
+            cache_from_url('ftp://cache')
+
+    def test_process_local(self):
+        """Только кэш в памяти процесса не виден соседним воркерам."""
+        self.assertTrue(is_process_local(cache_from_url('locmem://')))
+        for url in ('sqlite:///tmp/c.sqlite3', 'redis://127.0.0.1:6379/0'):
+            with self.subTest(url=url):
+                self.assertFalse(is_process_local(cache_from_url(url)))
+
+
+class VersionTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(FEED_VERSION_TIMEOUT=20)
+    def test_local_version_expires(self):
+        """В кэше процесса версия ленты истекает: сброс в соседнем
+        воркере виден не позже чем через FEED_VERSION_TIMEOUT."""
+        now = feed_cache.time.time()
+        version = feed_cache.versions('scope')
+        with mock.patch(
+            'django.core.cache.backends.locmem.time.time',
+            return_value=now + 21,
+        ):
+            self.assertNotEqual(feed_cache.versions('scope'), version)
+
+
+class StampedeTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_waits_for_fragment_rendered_by_another_worker(self):
+        """Пока фрагмент рисует другой процесс, ждём его результат."""
+        cache.add('feed:lock', 1)
+        render = mock.Mock(return_value='свой')
+
+        def other_worker(seconds):
+            cache.set('feed', ('чужой', float('inf'), 0.1))
+
+        with mock.patch('posts.feed_cache.time.sleep', other_worker):
+            html = feed_cache.get_or_render('feed', render)
+        self.assertEqual(html, 'чужой')
+        render.assert_not_called()
+
+    def test_stale_fragment_served_while_refreshing(self):
+        """Во время раннего пересчёта остальные отдают старый фрагмент."""
+        cache.set('feed', ('старый', 0, 0.1))
+        cache.add('feed:lock', 1)
+        render = mock.Mock(return_value='новый')
+        self.assertEqual(feed_cache.get_or_render('feed', render), 'старый')
+        render.assert_not_called()
+
+    def test_expiring_fragment_is_refreshed_early(self):
+        """Истекающий фрагмент пересчитывается до истечения срока."""
+        cache.set('feed', ('старый', 0, 0.1))
+        render = mock.Mock(return_value='новый')
+        self.assertEqual(feed_cache.get_or_render('feed', render), 'новый')
+        self.assertIsNone(cache.get('feed:lock'))
+
+    def test_foreign_lock_kept_after_wait_timeout(self):
+        """Не дождавшись фрагмента, процесс рисует его сам, но чужую
+        блокировку не снимает."""
+        cache.add('feed:lock', 'чужая')
+        render = mock.Mock(return_value='свой')
+        with mock.patch('posts.feed_cache.LOCK_TIMEOUT', 0), \
+                mock.patch('posts.feed_cache.time.sleep'):
+            html = feed_cache.get_or_render('feed', render)
+        self.assertEqual(html, 'свой')
+        self.assertEqual(cache.get('feed:lock'), 'чужая')
+
+    def test_lock_taken_over_during_render_is_kept(self):
+        """Блокировку, истёкшую за время отрисовки и взятую другим
+        процессом, владелец прежней не удаляет."""
+        def slow_render():
+            cache.set('feed:lock', 'чужая')
+            return 'свой'
+
+        self.assertEqual(feed_cache.get_or_render('feed', slow_render), 'свой')
+        self.assertEqual(cache.get('feed:lock'), 'чужая')
@@ -0,0 +1,120 @@
+# posts/tests/test_comments.py
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Post
+from posts.paginator import (
+    COMMENTS_PER_PAGE, NEWEST, PREVIOUS, CommentPaginator,
+)
+
+User = get_user_model()
+
+
+class CommentPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='paul')
+        cls.post = Post.objects.create(text='Вирусный пост', author=cls.author)
+        readers = [
+            User.objects.create_user(username=f'reader{i}') for i in range(5)
+        ]
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=readers[i % 5], text=f'Ответ {i}')
+            for i in range(45)
+        )
+        # Одинаковое время у всех: порядок держится только на id
+        Comment.objects.update(created=timezone.now())
+        cls.ids = list(
+            Comment.objects.order_by('id').values_list('id', flat=True)
+        )
+        cls.url = reverse('post_view', args=(cls.author.username, cls.post.id))
+        cls.more_url = reverse(
+            'post_comments', args=(cls.author.username, cls.post.id)
+        )
+
+    def walk(self, paginator):
+        ids, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            ids += [comment.id for comment in page]
+            if not page.has_next():
+                return ids
+            cursor = page.next_cursor
+
+    def test_pages_cover_comments_in_order(self):
+        """Страницы идут от старых к новым без пропусков и повторов."""
+        self.assertEqual(self.walk(CommentPaginator(self.post)), self.ids)
+        self.assertEqual(
+            self.walk(CommentPaginator(self.post, NEWEST)), self.ids[::-1]
+        )
+
+    def test_previous_cursor_returns_same_page(self):
+        paginator = CommentPaginator(self.post)
+        second = paginator.get_page(paginator.get_page().next_cursor)
+        first = paginator.get_page(second.previous_cursor)
+        self.assertEqual(first.direction, PREVIOUS)
+        self.assertEqual(
+            [comment.id for comment in first], self.ids[:COMMENTS_PER_PAGE]
+        )
+
+    def test_post_view_shows_first_page(self):
+        """Пост показывает одну страницу комментариев и кнопку «ещё»."""
+        response = self.client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.id for comment in comments], self.ids[:COMMENTS_PER_PAGE]
+        )
+        self.assertContains(response, 'js-comments-more')
+        response = self.client.get(self.url, {'order': NEWEST})
+        self.assertEqual(response.context['comments'][0].id, self.ids[-1])
+
+    def test_post_view_query_count_does_not_depend_on_comments(self):
+        """Авторы комментариев читаются тем же запросом, что и они сами."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertLessEqual(len(queries), 3)
+
+    def test_load_more_fragment(self):
+        """Кнопка «Показать ещё» получает следующую страницу фрагментом."""
+        first = self.client.get(self.url).context['comments']
+        response = self.client.get(
+            self.more_url, {'cursor': first.next_cursor}
+        )
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            [comment.id for comment in response.context['comments']],
+            self.ids[COMMENTS_PER_PAGE:2 * COMMENTS_PER_PAGE],
+        )
+
+    def test_load_more_json(self):
+        paginator = CommentPaginator(self.post)
+        cursor = paginator.get_page(
+            paginator.get_page().next_cursor
+        ).next_cursor
+        data = self.client.get(
+            self.more_url, {'cursor': cursor, 'format': 'json'}
+        ).json()
+        self.assertEqual(
+            [comment['id'] for comment in data['comments']],
+            self.ids[2 * COMMENTS_PER_PAGE:],
+        )
+        self.assertEqual(data['comments'][0]['author'], 'reader0')
+        self.assertIsNone(data['next'])
+
+    def test_load_more_for_unknown_post(self):
+        response = Client().get(
+            reverse('post_comments', args=('nobody', self.post.id))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_comment_ordering_uses_index(self):
+        """Порядок Meta.ordering читается по индексу без сортировки."""
+        plan = self.post.comments.all().explain()
+        self.assertIn('INDEX comment_post_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
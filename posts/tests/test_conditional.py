@@ -0,0 +1,136 @@
+# posts/tests/test_conditional.py
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import feed_cache
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='john')
+        cls.reader = User.objects.create_user(username='yoko')
+        cls.group = Group.objects.create(
+            title='Битлз', slug='beatles', description='Всё о битлах'
+        )
+        cls.post = Post.objects.create(
+            text='Imagine', author=cls.author, group=cls.group
+        )
+        cls.urls = {
+            'index': reverse('index'),
+            'group_posts': reverse('group_posts', args=(cls.group.slug,)),
+            'profile': reverse('profile', args=(cls.author.username,)),
+            'post_view': reverse(
+                'post_view', args=(cls.author.username, cls.post.id)
+            ),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        # форма комментария выдаёт cookie csrftoken, он входит в ETag
+        self.client.get(self.urls['post_view'])
+
+    def etags(self):
+        return {
+            name: self.client.get(url)['ETag']
+            for name, url in self.urls.items()
+        }
+
+    def test_unchanged_page_is_not_modified(self):
+        """Повторный запрос с ETag получает 304 без запроса ленты."""
+        for name, url in self.urls.items():
+            with self.subTest(view=name):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('no-cache', response['Cache-Control'])
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(response.status_code, 304)
+                for query in queries.captured_queries:
+                    self.assertNotIn('"posts_post"', query['sql'])
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.urls['index'])
+        response = self.client.get(
+            self.urls['index'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_post_changes_validators(self):
+        before = self.etags()
+        Post.objects.create(text='Woman', author=self.author, group=self.group)
+        after = self.etags()
+        for name in self.urls:
+            with self.subTest(view=name):
+                self.assertNotEqual(before[name], after[name])
+
+    def test_comment_changes_post_page(self):
+        before = self.etags()
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Прекрасно'
+        )
+        after = self.etags()
+        self.assertNotEqual(before['post_view'], after['post_view'])
+        self.assertNotEqual(before['group_posts'], after['group_posts'])
+
+    def test_follow_changes_author_pages(self):
+        """Подписка меняет счётчики и кнопку на страницах автора."""
+        before = self.etags()
+        Follow.objects.create(user=self.reader, author=self.author)
+        after = self.etags()
+        self.assertNotEqual(before['profile'], after['profile'])
+        self.assertNotEqual(before['post_view'], after['post_view'])
+        self.assertEqual(before['index'], after['index'])
+
+    def test_author_change_changes_author_pages(self):
+        """Новое имя автора видно в карточке и заголовке его страниц;
+        вход автора на сайт их не меняет."""
+        before = self.etags()
+        self.author.first_name = 'Джон'
+        self.author.save()
+        after = self.etags()
+        self.assertNotEqual(before['profile'], after['profile'])
+        self.assertNotEqual(before['post_view'], after['post_view'])
+        self.assertEqual(before['index'], after['index'])
+        self.assertContains(self.client.get(self.urls['profile']), 'Джон')
+        Client().force_login(self.author)
+        self.assertEqual(self.etags(), after)
+
+    def test_etag_depends_on_viewer_and_page(self):
+        url = self.urls['index']
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(Client().get(url)['ETag'], etag)
+        self.assertNotEqual(
+            self.client.get(url, {'cursor': 'x'})['ETag'], etag
+        )
+
+    def test_missing_objects_are_not_conditional(self):
+        response = self.client.get(
+            reverse('profile', args=('nobody',)), HTTP_IF_NONE_MATCH='*'
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_invalidate_moves_version_to_now(self):
+        """Сдвинутая версия - время последнего изменения области."""
+        scope = feed_cache.profile_scope(self.author.id)
+        feed_cache.versions(scope)
+        started = timezone.now()
+        feed_cache.invalidate(scope)
+        changed = feed_cache.version_time(feed_cache.versions(scope)[0])
+        self.assertGreaterEqual(changed, started)
+        self.assertLess((changed - started).total_seconds(), 5)
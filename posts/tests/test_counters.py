@@ -0,0 +1,113 @@
+# posts/tests/test_counters.py
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='yoko')
+        cls.reader = User.objects.create_user(username='sean')
+        cls.post = Post.objects.create(text='Imagine', author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении записей."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Хорошо'
+        )
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+        follow.delete()
+        comment.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_edit_keeps_concurrent_counter(self):
+        """Правка поста, прочитанного до нового комментария, не
+        возвращает старое значение счётчика."""
+        post = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Хорошо'
+        )
+        post.text = 'Imagine all the people'
+        post.save()
+        Post.objects.filter(pk=post.pk).update(thumbnail='/media/t.jpg')
+        post.text = 'Imagine no possessions'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Imagine no possessions')
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.thumbnail, '/media/t.jpg')
+
+    def test_edit_does_not_reread_post(self):
+        """Прежние группа и картинка берутся из прочитанного объекта:
+        сохранение начинается сразу с UPDATE."""
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Imagine there is no heaven'
+        with CaptureQueriesContext(connection) as queries:
+            post.save()
+        self.assertTrue(queries[0]['sql'].startswith('UPDATE'))
+
+    def test_rebuild_counters_command(self):
+        """Команда rebuild_counters восстанавливает счётчики с нуля."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Хорошо'
+        )
+        UserStats.objects.all().delete()
+        Post.objects.update(comments_count=42)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_rebuild_creates_many_stats_rows(self):
+        """Строки UserStats для сотен пользователей создаются пачками."""
+        User.objects.bulk_create(
+            User(username=f'imported{i}') for i in range(600)
+        )
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(
+            UserStats.objects.count(), User.objects.count()
+        )
+
+    def test_profile_renders_without_aggregates(self):
+        """Профиль выводит счётчики без агрегирующих запросов."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                reverse('profile', kwargs={'username': self.author})
+            )
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Записей: 1')
+        for query in queries.captured_queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('COUNT(', query['sql'].upper())
@@ -0,0 +1,86 @@
+# posts/tests/test_follows.py
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import follows
+from posts.models import Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+class FollowTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='ringo')
+        cls.reader = User.objects.create_user(username='maureen')
+        Post.objects.create(text='Octopus garden', author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_follow_is_idempotent(self):
+        """Повторная подписка не создаёт строк и не трогает счётчики."""
+        self.assertTrue(follows.follow(self.reader.pk, self.author.pk))
+        self.assertFalse(follows.follow(self.reader.pk, self.author.pk))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 1
+        )
+
+    def test_follow_created_elsewhere(self):
+        """Подписку, вставленную другим запросом, второй раз не считаем."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertFalse(follows.follow(self.reader.pk, self.author.pk))
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+
+    def test_unfollow_is_idempotent(self):
+        follows.follow(self.reader.pk, self.author.pk)
+        self.assertTrue(follows.unfollow(self.reader.pk, self.author.pk))
+        self.assertFalse(follows.unfollow(self.reader.pk, self.author.pk))
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_cannot_follow_self(self):
+        self.assertFalse(follows.follow(self.reader.pk, self.reader.pk))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_views_answer_ajax_with_json(self):
+        url = reverse('profile_follow', args=(self.author.username,))
+        for _ in range(2):
+            response = self.client.post(url, **AJAX)
+            self.assertEqual(
+                response.json(), {'following': True, 'followers_count': 1}
+            )
+        response = self.client.post(
+            reverse('profile_unfollow', args=(self.author.username,)), **AJAX
+        )
+        self.assertEqual(
+            response.json(), {'following': False, 'followers_count': 0}
+        )
+
+    def test_views_redirect_to_profile(self):
+        response = self.client.get(
+            reverse('profile_follow', args=(self.author.username,))
+        )
+        self.assertRedirects(
+            response, reverse('profile', args=(self.author.username,))
+        )
+        self.assertTrue(Follow.objects.exists())
+
+    def test_unknown_author(self):
+        for name in ('profile_follow', 'profile_unfollow'):
+            with self.subTest(view=name):
+                response = self.client.get(reverse(name, args=('nobody',)))
+                self.assertEqual(response.status_code, 404)
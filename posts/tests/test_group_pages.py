@@ -0,0 +1,137 @@
+# posts/tests/test_group_pages.py
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import group_pages, jobs
+from posts.models import Comment, Group, Job, Post
+from posts.paginator import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class GroupMapTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            title='Битлз', slug='beatles', description='Всё о битлах'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lookup_without_queries(self):
+        self.assertEqual(group_pages.get_group('beatles').id, self.group.id)
+        with self.assertNumQueries(0):
+            group = group_pages.get_group('beatles')
+            self.assertIsNone(group_pages.get_group('nothing'))
+        self.assertEqual(group.title, 'Битлз')
+
+    def test_changed_group_is_seen(self):
+        group_pages.get_group('beatles')
+        self.group.title = 'The Beatles'
+        self.group.save()
+        self.assertEqual(group_pages.get_group('beatles').title, 'The Beatles')
+        Group.objects.create(title='Стоунз', slug='stones')
+        self.assertIsNotNone(group_pages.get_group('stones'))
+
+    def test_unknown_group_is_404(self):
+        response = Client().get(reverse('group_posts', args=('nothing',)))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(JOB_QUEUE_ENABLED=True, GROUP_HOT_PAGES=2)
+class HotPagesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='john')
+        cls.group = Group.objects.create(
+            title='Битлз', slug='beatles', description='Всё о битлах'
+        )
+        cls.other = Group.objects.create(title='Уингз', slug='wings')
+        cls.url = reverse('group_posts', args=(cls.group.slug,))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def add_posts(self, count, group=None):
+        for i in range(count):
+            Post.objects.create(
+                text=f'Пост {i}', author=self.author,
+                group=group or self.group,
+            )
+
+    def run_jobs(self):
+        jobs.work(jobs.WorkerStats(), until_empty=True)
+
+    def assertServedFromCache(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        for query in queries.captured_queries:
+            self.assertNotIn('"posts_post"', query['sql'])
+        return response
+
+    def test_hot_pages_are_ready_after_change(self):
+        """После изменения первые страницы группы уже в кэше."""
+        self.add_posts(POSTS_PER_PAGE + 1)
+        self.assertTrue(
+            Job.objects.filter(name='group_pages.refresh').exists()
+        )
+        self.run_jobs()
+        first = self.assertServedFromCache(self.url)
+        self.assertContains(first, f'Пост {POSTS_PER_PAGE}')
+        second = self.assertServedFromCache(
+            f'{self.url}?cursor={first.context["cursor_page"].next_cursor}'
+        )
+        self.assertContains(second, 'Пост 0')
+
+    def test_unchanged_pages_are_not_rendered_again(self):
+        self.add_posts(2 * POSTS_PER_PAGE)
+        self.run_jobs()
+        oldest = Post.objects.order_by('pk').first()
+        with mock.patch.object(
+            group_pages, 'render_to_string',
+            wraps=group_pages.render_to_string,
+        ) as render:
+            # комментарий к посту второй страницы меняет только её
+            Comment.objects.create(
+                post=oldest, author=self.author, text='Ура'
+            )
+            self.run_jobs()
+        self.assertEqual(render.call_count, 1)
+        self.assertServedFromCache(self.url)
+
+    def test_moved_post_refreshes_both_groups(self):
+        self.add_posts(1)
+        self.run_jobs()
+        post = Post.objects.get()
+        post.group = self.other
+        post.save()
+        self.assertEqual(
+            set(Job.objects.filter(
+                name='group_pages.refresh'
+            ).values_list('key', flat=True)),
+            {f'group-pages:{self.group.id}', f'group-pages:{self.other.id}'},
+        )
+        self.run_jobs()
+        response = self.assertServedFromCache(self.url)
+        self.assertNotContains(response, 'Пост 0')
+        self.assertContains(
+            self.client.get(reverse('group_posts', args=('wings',))),
+            'Пост 0',
+        )
+
+    @override_settings(JOB_QUEUE_ENABLED=False)
+    def test_without_queue_pages_render_on_read(self):
+        queued = Job.objects.count()
+        self.add_posts(1)
+        self.assertEqual(Job.objects.count(), queued)
+        self.assertContains(self.client.get(self.url), 'Пост 0')
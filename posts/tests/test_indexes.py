@@ -0,0 +1,186 @@
+# posts/tests/test_indexes.py
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from posts import search
+from posts.models import (
+    Comment, Follow, Group, Post, SearchTerm, TimelineEntry, UserStats,
+)
+from posts.paginator import NEXT, keyset_range
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса для SQLite')
+class QueryPlanTests(TestCase):
+    """EXPLAIN запросов лент показывает проход по нужному индексу."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='pete')
+        cls.group = Group.objects.create(
+            title='Квартет',
+            slug='quartet',
+            description='Ранний состав'
+        )
+        cls.key = (timezone.now(), 100)
+
+    def assertUsesIndex(self, queryset, index, sorted_by_index=True):
+        for key in (None, self.key):
+            with self.subTest(index=index, key=key):
+                plan = keyset_range(queryset, NEXT, key)[:11].explain()
+                self.assertIn(f'INDEX {index}', plan)
+                if sorted_by_index:
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_feeds_use_composite_indexes(self):
+        """Ленты главной, группы и автора читаются по индексу по порядку."""
+        feeds = {
+            'post_date_id_idx': Post.objects.for_feed(),
+            'post_group_date_idx': Post.objects.for_feed().filter(
+                group=self.group
+            ),
+            'post_author_date_idx': Post.objects.for_feed().filter(
+                author=self.user
+            ),
+        }
+        for index, queryset in feeds.items():
+            self.assertUsesIndex(queryset, index)
+
+    def test_follow_feed_uses_follow_and_author_indexes(self):
+        """Лента подписок без TimelineEntry идёт по индексам подписок."""
+        queryset = Post.objects.for_feed().filter(
+            author__following__user=self.user
+        )
+        # для постов автора планировщик может взять и составной индекс,
+        # и индекс внешнего ключа: оба ищут по author_id
+        for key in (None, self.key):
+            with self.subTest(key=key):
+                plan = keyset_range(queryset, NEXT, key)[:11].explain()
+                self.assertIn('sqlite_autoindex_posts_follow', plan)
+                self.assertRegex(
+                    plan, r'SEARCH posts_post USING INDEX \w+ \(author_id=\?'
+                )
+
+    def test_timeline_and_comments_use_indexes(self):
+        """Лента TimelineEntry и комментарии поста читаются по индексу."""
+        plan = keyset_range(
+            TimelineEntry.objects.filter(user=self.user), NEXT, self.key,
+            id_field='post_id',
+        ).values_list('pub_date', 'post_id')[:11].explain()
+        self.assertIn('INDEX timeline_user_date_idx', plan)
+        plan = Comment.objects.filter(post_id=1).order_by('created').explain()
+        self.assertIn('INDEX comment_post_created_idx', plan)
+
+    def test_follow_pair_is_unique(self):
+        """Повторная подписка на того же автора невозможна."""
+        author = User.objects.create_user(username='stuart')
+        Follow.objects.create(user=self.user, author=author)
+        plan = Follow.objects.filter(user=self.user, author=author).explain()
+        self.assertIn('sqlite_autoindex_posts_follow', plan)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.user, author=author)
+
+
+class MigrationTests(TransactionTestCase):
+    """Схема базы до миграций доводится до текущей с данными."""
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def test_models_match_migrations(self):
+        call_command(
+            'makemigrations', 'posts', check=True, dry_run=True,
+            stdout=StringIO(),
+        )
+
+    def test_counters_and_timelines_are_filled_for_old_data(self):
+        """0001 - исходная схема, счётчики и ленты подписок заполняют
+        следующие миграции."""
+        initial = ('posts', '0001_initial')
+        apps = self.migrate(initial)
+        try:
+            old_post = apps.get_model('posts', 'Post')
+            self.assertNotIn(
+                'comments_count',
+                [field.name for field in old_post._meta.fields],
+            )
+            old_user = apps.get_model('auth', 'User')
+            author = old_user.objects.create(username='mal')
+            reader = old_user.objects.create(username='neil')
+            post = old_post.objects.create(text='Пост', author=author)
+            apps.get_model('posts', 'Comment').objects.create(
+                post=post, author=reader, text='Комментарий'
+            )
+            apps.get_model('posts', 'Follow').objects.create(
+                user=reader, author=author
+            )
+        finally:
+            executor = MigrationExecutor(connection)
+            executor.migrate(executor.loader.graph.leaf_nodes())
+        self.assertEqual(Post.objects.get().comments_count, 1)
+        stats = UserStats.objects.get(user__username='mal')
+        self.assertEqual((stats.posts_count, stats.followers_count), (1, 1))
+        self.assertEqual(
+            UserStats.objects.get(user__username='neil').following_count, 1
+        )
+        self.assertQuerysetEqual(
+            TimelineEntry.objects.filter(user__username='neil'),
+            [post.pk], transform=lambda entry: entry.post_id,
+        )
+
+    def test_search_index_is_split_by_comments(self):
+        """Проиндексированные комментарии становятся отдельными
+        строками индекса в обеих реализациях поиска."""
+        apps = self.migrate(('posts', '0008_job'))
+        try:
+            author = apps.get_model('auth', 'User').objects.create(
+                username='mal'
+            )
+            post = apps.get_model('posts', 'Post').objects.create(
+                text='Сад', author=author
+            )
+            apps.get_model('posts', 'Comment').objects.create(
+                post=post, author=author, text='Лабиринт'
+            )
+            apps.get_model('posts', 'SearchTerm').objects.bulk_create([
+                apps.get_model('posts', 'SearchTerm')(
+                    term=term, post=post, weight=weight
+                )
+                for term, weight in (('сад', 2), ('лабиринт', 1))
+            ])
+            if search.fts5_available():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'INSERT INTO posts_post_search '
+                        "(rowid, text, comments) VALUES (%s, 'сад', "
+                        "'лабиринт')",
+                        [post.pk],
+                    )
+        finally:
+            executor = MigrationExecutor(connection)
+            executor.migrate(executor.loader.graph.leaf_nodes())
+        comment = Comment.objects.get()
+        self.assertEqual(
+            SearchTerm.objects.get(term='лабиринт').comment, comment
+        )
+        backends = ['fts5', 'terms'] if search.fts5_available() else ['terms']
+        for backend in backends:
+            with self.subTest(backend=backend), \
+                    override_settings(SEARCH_BACKEND=backend):
+                self.assertEqual(
+                    search.search_post_ids('сад лабиринт'), [post.pk]
+                )
+                search.remove_comments(comment.pk)
+                self.assertEqual(search.search_post_ids('лабиринт'), [])
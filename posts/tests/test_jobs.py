@@ -0,0 +1,137 @@
+# posts/tests/test_jobs.py
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import jobs, search
+from posts.models import Follow, Job, Post, TimelineEntry
+
+User = get_user_model()
+
+calls = []
+
+
+@jobs.handler('test.record')
+def record(payload):
+    calls.append(payload)
+    if payload == 'again' and len(calls) == 1:
+        # та же задача поставлена, пока воркер её выполняет
+        jobs.enqueue('test.record', payload, key='again')
+
+
+@jobs.handler('test.batch', batch=True)
+def record_batch(payloads):
+    if 'bad' in payloads:
+        raise ValueError('плохая задача')
+    calls.append(payloads)
+
+
+@override_settings(JOB_QUEUE_ENABLED=True)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_duplicate_key_is_one_job(self):
+        for _ in range(3):
+            jobs.enqueue('test.record', 1, key='one')
+        job = Job.objects.get()
+        self.assertEqual(job.version, 2)
+        jobs.process()
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_reenqueued_while_running_runs_again(self):
+        jobs.enqueue('test.record', 'again', key='again')
+        jobs.process()
+        self.assertEqual(Job.objects.get().claim, '')
+        jobs.process()
+        self.assertEqual(calls, ['again', 'again'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_batch_is_one_call(self):
+        for n in range(3):
+            jobs.enqueue('test.batch', n)
+        stats = jobs.WorkerStats()
+        self.assertEqual(jobs.process(stats=stats), 3)
+        self.assertEqual(calls, [[0, 1, 2]])
+        self.assertEqual(stats.done, 3)
+        self.assertEqual(len(stats.latencies), 3)
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    def test_failed_job_is_retried_then_given_up(self):
+        """Сломанная задача не держит пачку, повторяется с паузой и
+        после JOB_MAX_ATTEMPTS попыток помечается проваленной."""
+        for payload in (0, 'bad', 2):
+            jobs.enqueue('test.batch', payload)
+        stats = jobs.WorkerStats()
+        with self.assertLogs('posts.jobs', 'ERROR'):
+            jobs.process(stats=stats)
+        self.assertEqual(calls, [[0], [2]])
+        bad = Job.objects.get()
+        self.assertEqual(bad.attempts, 1)
+        self.assertGreater(bad.run_after, timezone.now())
+        self.assertIn('плохая задача', bad.error)
+        self.assertEqual(jobs.process(), 0)
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs('posts.jobs', 'ERROR'):
+            jobs.process(stats=stats)
+        bad.refresh_from_db()
+        self.assertTrue(bad.failed)
+        self.assertEqual((stats.retried, stats.failed), (1, 1))
+        self.assertEqual(jobs.process(), 0)
+
+    def test_claimed_jobs_are_not_claimed_twice(self):
+        jobs.enqueue('test.record', 1)
+        self.assertEqual(len(jobs.claim()), 1)
+        self.assertEqual(jobs.claim(), [])
+        # срок аренды упавшего воркера истёк
+        Job.objects.update(locked_until=timezone.now())
+        self.assertEqual(len(jobs.claim()), 1)
+
+    @override_settings(JOB_QUEUE_ENABLED=False)
+    def test_disabled_queue_runs_at_once(self):
+        jobs.enqueue('test.record', 1)
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+
+@override_settings(JOB_QUEUE_ENABLED=True, RATE_LIMIT_ENABLED=False)
+class WriteViewJobsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='ringo')
+        cls.reader = User.objects.create_user(username='maureen')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_side_effects_wait_for_worker(self):
+        self.client.post(reverse('new_post'), {'text': 'Octopus garden'})
+        post = Post.objects.get()
+        self.assertEqual(
+            set(Job.objects.values_list('name', flat=True)),
+            {'timeline.fan_out', 'search.index'},
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(search.search_post_ids('octopus'), [])
+        comment_url = reverse('add_comment', args=('ringo', post.id))
+        for text in ('Под водой', 'В тени'):
+            self.client.post(comment_url, {'text': text})
+        # комментарии индексируются своими задачами, без поста
+        self.assertEqual(Job.objects.filter(name='search.index').count(), 1)
+        self.assertEqual(
+            Job.objects.filter(name='search.index_comments').count(), 2
+        )
+        jobs.work(jobs.WorkerStats(), until_empty=True)
+        self.assertFalse(Job.objects.exists())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(search.search_post_ids('тени'), [post.id])
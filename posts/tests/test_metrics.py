@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from yatube.metrics import MetricsMiddleware, registry
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tufte')
+        Post.objects.create(text='Данные и чернила', author=cls.user)
+
+    def setUp(self):
+        registry.clear()
+        self.client = Client()
+
+    def test_request_observed(self):
+        """Запрос попадает в гистограммы своего имени URL: число
+        запросов к базе, время в базе, в шаблонах и всего."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('index'))
+        duration = registry.get('yatube_request_duration_seconds', 'index')
+        db_time = registry.get('yatube_request_db_seconds', 'index')
+        template = registry.get('yatube_request_template_seconds', 'index')
+        count = registry.get('yatube_request_queries', 'index')
+        self.assertEqual(duration.count, 1)
+        self.assertEqual(count.sum, len(queries))
+        self.assertGreater(template.sum, 0)
+        self.assertLessEqual(db_time.sum, duration.sum)
+        self.assertLessEqual(template.sum, duration.sum)
+
+    def test_prometheus_format(self):
+        """/metrics отдаёт гистограммы в текстовом формате Prometheus."""
+        self.client.get(reverse('index'))
+        self.client.get(reverse('profile', args=(self.user.username,)))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(
+            response['Content-Type'], 'text/plain; version=0.0.4'
+        )
+        body = response.content.decode()
+        self.assertIn('# TYPE yatube_request_queries histogram', body)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="profile",le="+Inf"} 1',
+            body,
+        )
+        self.assertIn('yatube_request_queries_count{view="index"} 1', body)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        """Выключенные метрики не подключают middleware и не отдаются."""
+        with self.assertRaises(MiddlewareNotUsed):
+            MetricsMiddleware(lambda request: None)
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
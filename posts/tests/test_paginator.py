@@ -0,0 +1,85 @@
+# posts/tests/test_paginator.py
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post
+from posts.paginator import KeysetPaginator, decode_cursor
+
+User = get_user_model()
+
+
+class KeysetPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='ringo')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user) for i in range(25)
+        )
+        # Одинаковая дата у всех записей: порядок держится только на id
+        Post.objects.update(pub_date=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def walk(self, paginator):
+        pages, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append([post.id for post in page])
+            if not page.has_next():
+                return pages, page
+            cursor = page.next_cursor
+
+    def test_pages_cover_feed_without_gaps(self):
+        """Переход по курсорам проходит ленту целиком и без повторов."""
+        pages, _ = self.walk(KeysetPaginator(Post.objects.all()))
+        self.assertEqual([len(ids) for ids in pages], [10, 10, 5])
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_previous_cursor_returns_same_page(self):
+        """Курсор назад возвращает предыдущую страницу целиком."""
+        paginator = KeysetPaginator(Post.objects.all())
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        back = paginator.get_page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertEqual(back.number, 1)
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_broken_cursor_opens_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        self.assertIsNone(decode_cursor('не-курсор'))
+        response = self.guest_client.get(
+            reverse('index'), {'cursor': '!!!'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cursor_page'].number, 1)
+
+    def test_feed_page_does_not_count_posts(self):
+        """Страница ленты не выполняет COUNT(*) и OFFSET."""
+        first = self.guest_client.get(reverse('index'))
+        cursor = first.context['cursor_page'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse('index'), {'cursor': cursor})
+        feed_sql = [
+            query['sql'].upper() for query in queries.captured_queries
+            if 'FROM "POSTS_POST"' in query['sql'].upper()
+        ]
+        self.assertTrue(feed_sql)
+        for sql in feed_sql:
+            with self.subTest(sql=sql):
+                self.assertNotIn('COUNT(*)', sql)
+                self.assertNotIn('OFFSET', sql)
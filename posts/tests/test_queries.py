@@ -0,0 +1,154 @@
+# posts/tests/test_queries.py
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueryCountTests(TestCase):
+    """Число запросов страницы ленты не зависит от числа постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='george')
+        cls.author = User.objects.create_user(username='brian')
+        cls.group = Group.objects.create(
+            title='Битлз',
+            slug='beatles',
+            description='Всё о битлах'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        self.urls = {
+            'index': reverse('index'),
+            'group_posts': reverse(
+                'group_posts', kwargs={'slug': self.group.slug}
+            ),
+            'profile': reverse(
+                'profile', kwargs={'username': self.author.username}
+            ),
+            'follow_index': reverse('follow_index'),
+        }
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f'Пост {i}', author=self.author, group=self.group
+            )
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий'
+            )
+
+    def count_queries(self):
+        counts = {}
+        for name, url in self.urls.items():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.authorized_client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts[name] = len(queries)
+        return counts
+
+    def test_feed_query_count_is_constant(self):
+        """Страница с 1 и с 10 постами выполняет одинаково запросов."""
+        self.add_posts(1)
+        single = self.count_queries()
+        self.add_posts(9)
+        full = self.count_queries()
+        for name in self.urls:
+            with self.subTest(view=name):
+                self.assertEqual(full[name], single[name])
+
+    def test_feed_query_count_is_locked(self):
+        """Фиксируем число запросов каждой ленты."""
+        self.add_posts(10)
+        # сессия и пользователь дают по запросу на каждой странице,
+        # автор со счётчиками и подпиской читается одним запросом для
+        # ETag и вида, группа - в карте групп, которую после сброса кэша
+        # читает один запрос
+        expected = {
+            'index': 3,
+            'group_posts': 4,
+            'profile': 4,
+            # диапазон ленты, посты знаменитостей и сами посты
+            'follow_index': 5,
+        }
+        counts = self.count_queries()
+        for name, queries in expected.items():
+            with self.subTest(view=name):
+                self.assertEqual(counts[name], queries)
+
+    def test_feed_shows_annotated_comment_count(self):
+        """Карточка поста выводит сохранённое число комментариев."""
+        self.add_posts(1)
+        response = self.authorized_client.get(self.urls['index'])
+        self.assertEqual(response.context['page'][0].comments_count, 1)
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_cached_feed_skips_feed_query(self):
+        """Повторный показ ленты из кэша не читает таблицу постов."""
+        self.add_posts(3)
+        for name in ('index', 'group_posts', 'profile'):
+            with self.subTest(view=name):
+                self.authorized_client.get(self.urls[name])
+                with CaptureQueriesContext(connection) as queries:
+                    self.authorized_client.get(self.urls[name])
+                for query in queries.captured_queries:
+                    self.assertNotIn('"posts_post"', query['sql'])
+
+
+class AuthorCardTests(TestCase):
+    """Карточка автора профиля и страницы поста - один запрос."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='george')
+        cls.author = User.objects.create_user(username='brian')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_card_context_is_shared(self):
+        urls = (
+            reverse('profile', args=('brian',)),
+            reverse('post_view', args=('brian', self.post.id)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.context['author'], self.author)
+                self.assertTrue(response.context['is_following'])
+                self.assertFalse(response.context['is_author'])
+                self.assertContains(response, 'Записей: 1')
+
+    def test_anonymous_is_not_following(self):
+        response = Client().get(reverse('profile', args=('brian',)))
+        self.assertFalse(response.context['is_following'])
+
+    def test_post_view_query_count(self):
+        """Сессия, пользователь, карточка, пост и страница комментариев."""
+        with self.assertNumQueries(5):
+            self.client.get(reverse('post_view', args=('brian', self.post.id)))
+
+    def test_unknown_author_is_404(self):
+        for url in (
+            reverse('profile', args=('nobody',)),
+            reverse('post_view', args=('nobody', self.post.id)),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
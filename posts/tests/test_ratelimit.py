@@ -0,0 +1,166 @@
+# posts/tests/test_ratelimit.py
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (
+    Client, RequestFactory, TestCase, override_settings,
+)
+from django.urls import reverse
+
+from posts import ratelimit
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+NOW = 1_700_000_000 * ratelimit.MICROSECONDS
+
+
+class TokenBucketTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(ratelimit, '_now', return_value=NOW)
+        self.now = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_wait(self):
+        """Ведро отдаёт ёмкость сразу, дальше - по токену за интервал."""
+        for _ in range(3):
+            self.assertEqual(ratelimit.take('bucket', '3/m'), 0)
+        self.assertEqual(ratelimit.take('bucket', '3/m'), 20)
+        # отказ не тратит токен: через 20 с ровно один запрос проходит
+        self.now.return_value = NOW + 20 * ratelimit.MICROSECONDS
+        self.assertEqual(ratelimit.take('bucket', '3/m'), 0)
+        self.assertEqual(ratelimit.take('bucket', '3/m'), 20)
+
+    def test_bucket_refills(self):
+        for _ in range(3):
+            ratelimit.take('bucket', '3/m')
+        self.now.return_value = NOW + 60 * ratelimit.MICROSECONDS
+        for _ in range(3):
+            self.assertEqual(ratelimit.take('bucket', '3/m'), 0)
+        self.assertGreater(ratelimit.take('bucket', '3/m'), 0)
+
+    def test_parse_rate(self):
+        self.assertEqual(
+            ratelimit.parse_rate('10/s'), (10, ratelimit.MICROSECONDS // 10)
+        )
+        self.assertEqual(
+            ratelimit.parse_rate('2/h'), (2, 1800 * ratelimit.MICROSECONDS)
+        )
+
+
+@override_settings(RATE_LIMITS={
+    'add_comment': {'user': '2/m', 'ip': '3/m'},
+    'new_post': {'user': '1/m'},
+})
+class RateLimitedViewsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='mal')
+        cls.spammer = User.objects.create_user(username='spam')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.comment_url = reverse(
+            'add_comment', args=(cls.author.username, cls.post.id)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.spammer)
+
+    def comment(self, client=None):
+        return (client or self.client).post(
+            self.comment_url, {'text': 'Купите слона'}
+        )
+
+    def test_user_limit_returns_429(self):
+        for _ in range(2):
+            self.assertEqual(self.comment().status_code, 302)
+        response = self.comment()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertTemplateUsed(response, 'misc/429.html')
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_ip_limit_is_shared_between_users(self):
+        other = Client()
+        other.force_login(self.author)
+        self.comment()
+        self.comment()
+        self.assertEqual(self.comment(other).status_code, 302)
+        # IP исчерпан; токен пользователя при отказе возвращается
+        self.assertEqual(self.comment(other).status_code, 429)
+        cache.delete('ratelimit:add_comment:ip:127.0.0.1')
+        self.assertEqual(self.comment(other).status_code, 302)
+
+    @override_settings(RATE_LIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR')
+    def test_ip_from_trusted_header(self):
+        """За прокси ведро IP - по адресу, который дописал прокси в
+        X-Forwarded-For, а не по общему REMOTE_ADDR прокси и не по
+        присланному клиентом началу списка."""
+        other = Client()
+        other.force_login(self.author)
+        for client, header in [
+            (self.client, '1.1.1.1, 203.0.113.5'),
+            (self.client, '2.2.2.2, 203.0.113.5'),
+            (other, '198.51.100.7'),
+            (other, '198.51.100.7'),
+        ]:
+            response = client.post(
+                self.comment_url, {'text': 'Купите слона'},
+                HTTP_X_FORWARDED_FOR=header,
+            )
+            self.assertEqual(response.status_code, 302)
+        self.assertIsNone(cache.get('ratelimit:add_comment:ip:127.0.0.1'))
+        self.assertIsNone(cache.get('ratelimit:add_comment:ip:1.1.1.1'))
+        # третий запрос с того же адреса упирается в лимит IP
+        self.client.logout()
+        self.client.force_login(User.objects.create_user(username='ham'))
+        response = self.client.post(
+            self.comment_url, {'text': 'Купите слона'},
+            HTTP_X_FORWARDED_FOR='3.3.3.3, 203.0.113.5',
+        )
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post(
+            self.comment_url, {'text': 'Купите слона'},
+            HTTP_X_FORWARDED_FOR='4.4.4.4, 203.0.113.5',
+        )
+        self.assertEqual(response.status_code, 429)
+
+    def test_ip_falls_back_to_remote_addr(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='192.0.2.1')
+        self.assertEqual(ratelimit.client_ip(request), '192.0.2.1')
+        with self.settings(RATE_LIMIT_IP_HEADER='HTTP_X_REAL_IP'):
+            self.assertEqual(ratelimit.client_ip(request), '192.0.2.1')
+            request.META['HTTP_X_REAL_IP'] = '203.0.113.5'
+            self.assertEqual(ratelimit.client_ip(request), '203.0.113.5')
+
+    @override_settings(
+        RATE_LIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR', RATE_LIMIT_PROXY_HOPS=2
+    )
+    def test_proxy_hops(self):
+        """За двумя прокси адрес клиента - второй с конца; без адресов
+        от обоих прокси - REMOTE_ADDR."""
+        request = RequestFactory().get(
+            '/', REMOTE_ADDR='10.0.0.2',
+            HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.5, 10.0.0.1',
+        )
+        self.assertEqual(ratelimit.client_ip(request), '203.0.113.5')
+        request.META['HTTP_X_FORWARDED_FOR'] = '10.0.0.1'
+        self.assertEqual(ratelimit.client_ip(request), '10.0.0.2')
+
+    def test_only_writes_are_limited(self):
+        url = reverse('new_post')
+        self.client.post(url, {'text': 'Первый'})
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(
+            self.client.post(url, {'text': 'Второй'}).status_code, 429
+        )
+
+    @override_settings(RATE_LIMIT_ENABLED=False)
+    def test_disabled(self):
+        for _ in range(5):
+            self.assertEqual(self.comment().status_code, 302)
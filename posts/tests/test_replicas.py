@@ -0,0 +1,127 @@
+# posts/tests/test_replicas.py
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.management.commands.replicate_db import copy_database
+from posts.models import Post
+from yatube import replicas
+
+User = get_user_model()
+
+
+# реплика - псевдоним default: запросы выполняются, а выбор реплики
+# виден по вызовам random.choice
+@override_settings(DATABASE_REPLICAS=['default'], REPLICA_LAG=0)
+class ReplicaRoutingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='paul')
+        cls.post = Post.objects.create(text='Yesterday', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+        patcher = mock.patch.object(
+            replicas.random, 'choice', return_value='default'
+        )
+        self.choice = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_feeds_read_replica(self):
+        for url in (
+            reverse('index'),
+            reverse('profile', args=(self.author.username,)),
+            reverse('post_view', args=(self.author.username, self.post.id)),
+        ):
+            with self.subTest(url=url):
+                self.choice.reset_mock()
+                self.assertEqual(self.client.get(url).status_code, 200)
+                self.assertTrue(self.choice.called)
+
+    def test_other_views_read_primary(self):
+        response = self.client.get(reverse('new_post'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.choice.called)
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_write_pins_browser_to_primary(self):
+        """После записи автор читает основную базу и видит свой
+        комментарий, пока не истечёт окно."""
+        response = self.client.post(
+            reverse('add_comment', args=(self.author.username, self.post.id)),
+            {'text': 'Всё верно'},
+        )
+        cookie = response.cookies[replicas.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+        self.client.get(reverse('index'))
+        self.assertFalse(self.choice.called)
+        # окно истекло - браузер снова читает реплику; лента уже в
+        # кэше фрагментов, поэтому кэш сбрасывается
+        del self.client.cookies[replicas.PIN_COOKIE]
+        cache.clear()
+        self.client.get(reverse('index'))
+        self.assertTrue(self.choice.called)
+
+    @override_settings(REPLICA_LAG=60)
+    def test_recent_change_reads_primary(self):
+        """Лента, изменённая в пределах отставания, читается с основной
+        базы: под новой версией не кэшируется старое содержимое."""
+        self.client.get(reverse('index'))
+        self.assertFalse(self.choice.called)
+
+
+class ReplicaRouterTests(SimpleTestCase):
+
+    def test_sessions_and_users_read_primary(self):
+        router = replicas.ReplicaRouter()
+        state = replicas.ReadState()
+        state.replica = True
+        token = replicas._current.set(state)
+        self.addCleanup(replicas._current.reset, token)
+        with override_settings(DATABASE_REPLICAS=['replica1']):
+            self.assertEqual(router.db_for_read(Post), 'replica1')
+            self.assertIsNone(router.db_for_read(Session))
+            self.assertIsNone(router.db_for_read(User))
+            self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertFalse(router.allow_migrate('replica1', 'posts'))
+        self.assertTrue(state.wrote)
+
+    def test_no_request_reads_primary(self):
+        self.assertIsNone(replicas.ReplicaRouter().db_for_read(Post))
+
+
+class CopyDatabaseTests(SimpleTestCase):
+
+    def test_replica_gets_snapshot(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        source = os.path.join(tmpdir, 'db.sqlite3')
+        target = os.path.join(tmpdir, 'replica.sqlite3')
+        db = sqlite3.connect(source)
+        db.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT)')
+        db.execute("INSERT INTO post (text) VALUES ('Help!')")
+        db.commit()
+        copy_database(source, [target])
+        db.execute("INSERT INTO post (text) VALUES ('Michelle')")
+        db.commit()
+        db.close()
+        replica = sqlite3.connect(target)
+        self.addCleanup(replica.close)
+        self.assertEqual(
+            replica.execute('SELECT text FROM post').fetchall(), [('Help!',)]
+        )
+        copy_database(source, [target])
+        self.assertEqual(
+            replica.execute('SELECT count(*) FROM post').fetchone()[0], 2
+        )
@@ -0,0 +1,181 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Post, SearchTerm
+from posts.stemmer import stem, terms
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+
+    def test_russian_forms_share_stem(self):
+        """Формы одного слова сводятся к одной основе."""
+        forms = {
+            'книг': ('книга', 'книги', 'книгами', 'книгах'),
+            'красив': ('красивая', 'красивые', 'красивыми'),
+            'прекрасн': ('прекрасный', 'прекраснейшие'),
+            'чита': ('читать', 'читали', 'читающий'),
+        }
+        for expected, words in forms.items():
+            for word in words:
+                with self.subTest(word=word):
+                    self.assertEqual(stem(word), expected)
+
+    def test_terms(self):
+        """Текст разбивается на термы в нижнем регистре, ё - это е."""
+        self.assertEqual(
+            terms('Ёжики читали Python 3!'),
+            ['ежик', 'чита', 'python', '3'],
+        )
+
+
+class SearchTestsMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='borges')
+        cls.library = Post.objects.create(
+            text='Вавилонская библиотека хранит все книги', author=cls.user
+        )
+        cls.garden = Post.objects.create(
+            text='Сад расходящихся тропок', author=cls.user
+        )
+        cls.mirror = Post.objects.create(
+            text='Книга песка и зеркала. Книги, книги!', author=cls.user
+        )
+        Comment.objects.create(
+            post=cls.garden, author=cls.user, text='Лабиринт из книг'
+        )
+
+    def test_ranked_search(self):
+        """Находятся все формы слова, в тексте и в комментариях;
+        пост, где слово встречается чаще, выше."""
+        found = search.search_post_ids('книгами')
+        self.assertEqual(found[0], self.mirror.pk)
+        self.assertCountEqual(
+            found, [self.library.pk, self.garden.pk, self.mirror.pk]
+        )
+
+    def test_all_words_required(self):
+        """В найденном посте есть все слова запроса."""
+        self.assertEqual(
+            search.search_post_ids('книга зеркало'), [self.mirror.pk]
+        )
+        self.assertEqual(search.search_post_ids('книга слон'), [])
+        self.assertEqual(search.search_post_ids('!!!'), [])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении постов
+        и комментариев."""
+        self.garden.text = 'Сад и слон'
+        self.garden.save()
+        self.assertEqual(search.search_post_ids('слоны'), [self.garden.pk])
+        Comment.objects.filter(post=self.garden).delete()
+        self.assertNotIn(self.garden.pk, search.search_post_ids('книга'))
+        Post.objects.filter(pk=self.library.pk).delete()
+        self.assertEqual(search.search_post_ids('библиотека'), [])
+
+    def test_words_from_text_and_comments(self):
+        """Слова запроса могут встретиться в тексте поста и в разных
+        комментариях к нему."""
+        Comment.objects.create(
+            post=self.garden, author=self.user, text='Зеркала'
+        )
+        self.assertCountEqual(
+            search.search_post_ids('сад книга зеркало'), [self.garden.pk]
+        )
+
+    def test_new_comment_indexes_only_itself(self):
+        """Новый комментарий не перечитывает ветку поста."""
+        for n in range(5):
+            Comment.objects.create(
+                post=self.garden, author=self.user, text=f'Тропка {n}'
+            )
+        with mock.patch('posts.search.terms', wraps=terms) as stemmed:
+            Comment.objects.create(
+                post=self.garden, author=self.user, text='Тигры'
+            )
+        stemmed.assert_called_once_with('Тигры')
+        self.assertEqual(search.search_post_ids('тигр'), [self.garden.pk])
+
+    def test_rebuild(self):
+        """rebuild восстанавливает индекс по постам и комментариям."""
+        search.get_index().clear()
+        self.assertEqual(search.search_post_ids('сад'), [])
+        search.rebuild()
+        self.assertEqual(search.search_post_ids('сад'), [self.garden.pk])
+        self.assertEqual(
+            search.search_post_ids('лабиринт'), [self.garden.pk]
+        )
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class FtsSearchTests(SearchTestsMixin, TestCase):
+    pass
+
+
+@override_settings(SEARCH_BACKEND='terms')
+class TermSearchTests(SearchTestsMixin, TestCase):
+
+    def test_postings_weights(self):
+        """Вхождения в текст поста весят вдвое больше комментариев."""
+        weights = dict(SearchTerm.objects.filter(
+            term='книг'
+        ).values_list('post_id', 'weight'))
+        self.assertEqual(weights, {
+            self.library.pk: 2, self.garden.pk: 1, self.mirror.pk: 6,
+        })
+
+    def test_long_post(self):
+        """Пост с сотнями разных слов индексируется несколькими пачками."""
+        words = ' '.join(f'w{n}' for n in range(search.BATCH_SIZE + 100))
+        post = Post.objects.create(text=words, author=self.user)
+        self.assertEqual(search.search_post_ids('w550'), [post.pk])
+
+    def test_long_terms(self):
+        """Слова длиннее колонки терма с общим началом не ломают
+        индексацию, и каждое находит свой пост."""
+        prefix = 'x' * search.TERM_LENGTH
+        post = Post.objects.create(
+            text=f'{prefix}aaa {prefix}bbb', author=self.user
+        )
+        self.assertEqual(
+            search.search_post_ids(f'{prefix}aaa'), [post.pk]
+        )
+        self.assertEqual(
+            SearchTerm.objects.get(post=post).weight, 2 * search.TEXT_WEIGHT
+        )
+
+
+class SearchViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='calvino')
+        Post.objects.bulk_create(
+            Post(text=f'Невидимые города, часть {n}', author=user)
+            for n in range(12)
+        )
+        search.rebuild()
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные посты постранично."""
+        client = Client()
+        response = client.get(reverse('search'), {'q': 'город'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].count, 12)
+        self.assertEqual(len(response.context['page']), 10)
+        self.assertContains(response, 'Невидимые города')
+        response = client.get(reverse('search'), {'q': 'город', 'page': 2})
+        self.assertEqual(len(response.context['page']), 2)
+
+    def test_empty_query(self):
+        """Без запроса страница поиска пуста."""
+        response = Client().get(reverse('search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page']), 0)
@@ -0,0 +1,36 @@
+# posts/tests/test_sqlite.py
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase
+
+from yatube.sqlite import apply_pragmas
+
+
+@skipUnless(settings.SQLITE_PRAGMAS, 'YATUBE_SQLITE_TUNING=0')
+class SQLiteTuningTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_new_connections_get_pragmas(self):
+        """Прагмы применяются к соединению Django при открытии."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(
+                cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout']
+            )
+
+    def test_file_database_switches_to_wal(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        db = sqlite3.connect(os.path.join(tmpdir, 'db.sqlite3'))
+        self.addCleanup(db.close)
+        apply_pragmas(db, settings.SQLITE_PRAGMAS)
+        self.assertEqual(
+            db.execute('PRAGMA journal_mode').fetchone()[0], 'wal'
+        )
+        self.assertEqual(db.execute('PRAGMA synchronous').fetchone()[0], 1)
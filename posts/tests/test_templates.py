@@ -0,0 +1,50 @@
+# posts/tests/test_templates.py
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from posts.management.commands.bench_templates import build_backend
+from yatube.templates import check_templates, compile_templates
+
+
+class CompileTemplatesTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, source):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as template:
+            template.write(source)
+
+    def backend(self, cached=True):
+        backend = build_backend(debug=False, cached=cached)
+        backend.engine.dirs = [self.directory]
+        return backend
+
+    def test_project_templates_compile(self):
+        """Все шаблоны проекта разбираются, их include и extends есть."""
+        self.assertEqual(check_templates(None), [])
+
+    def test_errors_are_reported(self):
+        self.write('good.html', '{% include "includes/part.html" %}')
+        self.write('includes/part.html', '{{ post.text }}')
+        self.write('broken.html', '{% if %}')
+        self.write('missing.html', '{% extends "nothing.html" %}')
+        self.write('dynamic.html', '{% include name %}')
+        errors = compile_templates(self.directory, [self.backend()])
+        self.assertEqual(set(errors), {'broken.html', 'missing.html'})
+        self.assertIn('nothing.html', errors['missing.html'])
+
+    def test_cached_loader_is_filled(self):
+        """После компиляции шаблоны берутся из кэша загрузчика."""
+        self.write('page.html', '{% include "includes/part.html" %}')
+        self.write('includes/part.html', 'часть')
+        backend = self.backend()
+        compile_templates(self.directory, [backend])
+        shutil.rmtree(self.directory)
+        self.assertEqual(backend.get_template('page.html').render(), 'часть')
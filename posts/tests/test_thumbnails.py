@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image(name='small.gif'):
+    return SimpleUploadedFile(name, SMALL_GIF, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='painter')
+        self.post = Post.objects.create(
+            text='Пост с картинкой', author=self.user, image=image()
+        )
+        self.client = Client()
+
+    def test_placeholder_while_pending(self):
+        """Пока миниатюра не готова, в ленте выводится заглушка,
+        а не миниатюра, которую пришлось бы готовить в запросе."""
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'posts/placeholder.svg')
+        self.assertEqual(Post.objects.get().thumbnail, '')
+
+    def test_generate_stores_url(self):
+        """generate сохраняет адрес миниатюры, и лента выводит его."""
+        url = thumbnails.generate(self.post.pk)
+        self.assertTrue(url)
+        self.assertEqual(Post.objects.get().thumbnail, url)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, f'src="{url}"')
+        self.assertNotContains(response, 'posts/placeholder.svg')
+
+    def test_new_image_resets_thumbnail(self):
+        """Новая картинка сбрасывает миниатюру старой."""
+        thumbnails.generate(self.post.pk)
+        post = Post.objects.get()
+        post.text = 'Только текст'
+        post.save()
+        self.assertNotEqual(Post.objects.get().thumbnail, '')
+        post.image = image('other.gif')
+        post.save()
+        self.assertEqual(Post.objects.get().thumbnail, '')
+
+    def test_post_without_image(self):
+        """Для поста без картинки нечего готовить."""
+        post = Post.objects.create(text='Без картинки', author=self.user)
+        self.assertIsNone(thumbnails.generate(post.pk))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailScheduleTests(TransactionTestCase):
+
+    def test_scheduled_after_commit(self):
+        """Миниатюра готовится после фиксации сохранения поста."""
+        user = User.objects.create_user(username='sculptor')
+        post = Post.objects.create(
+            text='Пост с картинкой', author=user, image=image()
+        )
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail)
@@ -0,0 +1,95 @@
+# posts/tests/test_timeline.py
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='cynthia')
+        cls.author = User.objects.create_user(username='julian')
+        cls.other = User.objects.create_user(username='mimi')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def feed(self, cursor=None):
+        params = {'cursor': cursor} if cursor else {}
+        return self.authorized_client.get(reverse('follow_index'), params)
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Hey Jude', author=self.author)
+        Post.objects.create(text='Не в ленте', author=self.other)
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'post')),
+            [(self.reader.id, post.id)]
+        )
+        self.assertEqual(list(self.feed().context['page']), [post])
+
+    def test_fan_out_to_many_followers(self):
+        """Рассылка больше чем на одну пачку вставки доходит до всех."""
+        followers = User.objects.bulk_create(
+            User(username=f'fan{i}') for i in range(600)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=self.author)
+            for user in User.objects.filter(username__startswith='fan')
+        )
+        Post.objects.create(text='Let It Be', author=self.author)
+        self.assertEqual(TimelineEntry.objects.count(), len(followers))
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """Подписка добавляет прошлые посты автора, отписка убирает."""
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            [post.id for post in self.feed().context['page']],
+            [post.id for post in reversed(posts)]
+        )
+        Follow.objects.get(user=self.reader, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(len(self.feed().context['page']), 0)
+
+    def test_timeline_pages_follow_cursor(self):
+        """Лента подписок листается курсором без пропусков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(15):
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+        first = self.feed().context['cursor_page']
+        second = self.feed(first.next_cursor).context['cursor_page']
+        self.assertEqual(len(first), 10)
+        self.assertEqual(len(second), 5)
+        self.assertFalse(second.has_next())
+        self.assertFalse(set(first) & set(second))
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_read_on_demand(self):
+        """Посты знаменитости не рассылаются, но видны в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Let it be', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(list(self.feed().context['page']), [post])
+
+    def test_rebuild_timelines_command(self):
+        """Команда rebuild_timelines восстанавливает ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Yesterday', author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(list(self.feed().context['page']), [post])
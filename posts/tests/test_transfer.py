@@ -0,0 +1,116 @@
+# posts/tests/test_transfer.py
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import search
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.transfer import export_records, import_records
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='brian')
+        cls.reader = User.objects.create_user(username='cynthia')
+        cls.group = Group.objects.create(
+            title='Битлз', slug='beatles', description='Всё о битлах'
+        )
+        cls.post = Post.objects.create(
+            text='Yesterday', author=cls.author, group=cls.group
+        )
+        Post.objects.create(text='Help', author=cls.reader)
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Красиво'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def snapshot(self):
+        return (
+            sorted(Post.objects.values_list(
+                'text', 'pub_date', 'author__username', 'group__slug'
+            ), key=str),
+            sorted(Comment.objects.values_list(
+                'post__text', 'author__username', 'text', 'created'
+            )),
+            sorted(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+        )
+
+    def export(self):
+        output = StringIO()
+        counts = export_records(output)
+        return output.getvalue().splitlines(), counts
+
+    def test_roundtrip_into_empty_database(self):
+        """Выгрузка и загрузка в пустую базу сохраняют данные и даты."""
+        before = self.snapshot()
+        lines, counts = self.export()
+        self.assertEqual(counts, {
+            'group': 1, 'user': 2, 'post': 2, 'comment': 1, 'follow': 1,
+        })
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        import_records(lines)
+        self.assertEqual(self.snapshot(), before)
+        post = Post.objects.get(text='Yesterday')
+        self.assertEqual(post.comments_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(search.search_post_ids('красиво'), [post.pk])
+        brian = User.objects.get(username='brian')
+        self.assertFalse(brian.has_usable_password())
+
+    def test_import_remaps_post_ids(self):
+        """Комментарии попадают к своим постам, хотя id постов новые."""
+        lines, _ = self.export()
+        Comment.objects.all().delete()
+        Post.objects.all().delete()
+        Post.objects.create(text='Занимает старый id', author=self.author)
+        counts = import_records(lines)
+        self.assertEqual(counts['post'], 2)
+        comment = Comment.objects.get()
+        self.assertEqual(comment.post.text, 'Yesterday')
+        self.assertNotEqual(comment.post_id, self.post.pk)
+        # пользователи, группа и подписка уже были - не дублируются
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_commands_with_gzip(self):
+        path = os.path.join(self.tmpdir, 'yatube.ndjson.gz')
+        call_command('export_posts', path, stderr=StringIO())
+        with open(path, 'rb') as dump:
+            self.assertEqual(dump.read(2), b'\x1f\x8b')
+        before = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        out = StringIO()
+        call_command(
+            'import_posts', path, '--batch-size', '1', stdout=out,
+            stderr=StringIO(),
+        )
+        self.assertIn('post: 2', out.getvalue())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_unknown_model_rolls_back(self):
+        lines, _ = self.export()
+        Comment.objects.all().delete()
+        Post.objects.all().delete()
+        with self.assertRaises(ValueError):
+            import_records(lines + ['{"model": "like"}'])
+        self.assertFalse(Post.objects.exists())
@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.forms import modelform_factory
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import images
+from posts.models import Post
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def png(name='photo.png', size=(2400, 1200)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+def noisy_jpeg(name='noise.jpg', size=(400, 400)):
+    # шум плохо сжимается: файл заметно больше заголовка JPEG
+    buffer = BytesIO()
+    Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(
+        buffer, 'JPEG', quality=95
+    )
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ansel')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_new_post_keeps_image(self):
+        """Картинка нового поста сохраняется перекодированной
+        и уменьшенной, миниатюра для ленты готова сразу."""
+        response = self.client.post(
+            reverse('new_post'), {'text': 'Закат', 'image': png()}
+        )
+        self.assertRedirects(response, reverse('index'))
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith(f'.{images.EXTENSION}'))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, images.FORMAT)
+            self.assertEqual(stored.size, (1920, 960))
+        self.assertIn(images.THUMBNAIL_DIR, post.thumbnail)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, f'src="{post.thumbnail}"')
+
+    def test_edit_replaces_thumbnail(self):
+        """Новая картинка при редактировании приходит с новой миниатюрой."""
+        self.client.post(
+            reverse('new_post'), {'text': 'Закат', 'image': png()}
+        )
+        post = Post.objects.get()
+        self.client.post(
+            reverse('post_edit', args=(self.user.username, post.pk)),
+            {'text': 'Рассвет', 'image': png('dawn.png', (100, 100))},
+        )
+        edited = Post.objects.get()
+        self.assertNotEqual(edited.image.name, post.image.name)
+        self.assertNotEqual(edited.thumbnail, post.thumbnail)
+        self.assertIn('dawn', edited.thumbnail)
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=1000)
+    def test_too_many_pixels(self):
+        """Слишком большая по размерам картинка отклоняется формой."""
+        response = self.client.post(
+            reverse('new_post'), {'text': 'Панорама', 'image': png()}
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка 2400×1200 слишком большая.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(
+        IMAGE_UPLOAD_MAX_SIZE=1024, FILE_UPLOAD_MAX_MEMORY_SIZE=0
+    )
+    def test_too_large_file(self):
+        """Файл больше лимита не записывается целиком и отклоняется."""
+        response = self.client.post(
+            reverse('new_post'), {'text': 'Панорама', 'image': png()}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 1,0\xa0КБ.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024)
+    def test_size_checked_by_any_form(self):
+        """Размер проверяет валидатор поля: форма модели по умолчанию
+        отклоняет файл, который иначе приняла бы как картинку."""
+        form = modelform_factory(Post, fields=('text', 'author', 'image'))(
+            {'text': 'Панорама', 'author': self.user.pk},
+            {'image': png()},
+        )
+        self.assertEqual(form.errors['image'], ['Файл больше 1,0\xa0КБ.'])
+
+    @override_settings(
+        IMAGE_UPLOAD_MAX_SIZE=64 * 1024, FILE_UPLOAD_MAX_MEMORY_SIZE=0
+    )
+    def test_admin_rejects_truncated_upload(self):
+        """Обрезанная загрузка не сохраняется и через админку, хотя
+        начало JPEG сходит за картинку."""
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+        response = self.client.post(
+            reverse('admin:posts_post_add'),
+            {
+                'text': 'Панорама', 'author': self.user.pk,
+                'image': noisy_jpeg(),
+            },
+        )
+        self.assertContains(response, 'Файл больше 64,0\xa0КБ.')
+        self.assertFalse(Post.objects.exists())
@@ -2,14 +2,12 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.core.cache.utils import make_template_fragment_key
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, Client
 from django.urls import reverse
 
 import shutil
 import tempfile
-from time import sleep
 
 from posts.models import Post, Group
 
@@ -283,9 +281,9 @@ class PostURLTests(TestCase):
         )
 
     def test_templatetag_cache(self):
-        '''Проверяем работу templatetag кэша на главной странице'''
-        key = make_template_fragment_key('index_page')
-        self.guest_client.get(reverse('index'))
+        '''Проверяем работу кэша ленты на главной странице'''
+        response = self.guest_client.get(reverse('index'))
+        key = response.context['feed_key']
         # Проверяем, что в кэш есть данные
         self.assertIsNotNone(cache.get(key))
         # Изменяем данные поста self.post_john
@@ -302,10 +300,53 @@ class PostURLTests(TestCase):
                 }),
                 form_data
         )
-        self.assertNotIn(form_data['text'], cache.get(key))
-        # Проверяем обновится ли кэш после 20 сек
-        sleep(20)
-        self.guest_client.get(reverse('index'))
-        # Проверяем, содержит ли кэш новые данные поста
-        self.assertIn(form_data['text'], cache.get(key))
-        
\ No newline at end of file
+        self.assertNotIn(form_data['text'], cache.get(key)[0])
+        # Правка сбросила версию ленты: новые данные видны сразу
+        response = self.guest_client.get(reverse('index'))
+        self.assertNotEqual(response.context['feed_key'], key)
+        self.assertContains(response, form_data['text'])
+        self.assertIn(
+            form_data['text'], cache.get(response.context['feed_key'])[0]
+        )
+
+    def test_feed_cache_varies_on_page_and_viewer(self):
+        '''Ключ ленты зависит от страницы и от того, автор ли зритель'''
+        for i in range(10):
+            Post.objects.create(text=f'Пост {i}', author=self.author_john)
+        first = self.guest_client.get(reverse('index'))
+        second = self.guest_client.get(
+            reverse('index'),
+            {'cursor': first.context['cursor_page'].next_cursor}
+        )
+        self.assertNotEqual(
+            first.context['feed_key'], second.context['feed_key']
+        )
+        profile_url = reverse(
+            'profile', kwargs={'username': self.author_john}
+        )
+        guest = self.guest_client.get(profile_url)
+        author = self.authorized_client_john.get(profile_url)
+        self.assertNotEqual(
+            guest.context['feed_key'], author.context['feed_key']
+        )
+        self.assertContains(author, 'Редактировать')
+        self.assertNotContains(guest, 'Редактировать')
+
+    def test_comment_and_group_changes_invalidate_feeds(self):
+        '''Комментарий и правка группы сбрасывают кэш лент'''
+        group_url = reverse('group_posts', kwargs={'slug': self.group.slug})
+        key = self.guest_client.get(group_url).context['feed_key']
+        self.authorized_client_paul.post(
+            reverse('add_comment', kwargs={
+                'username': self.author_john,
+                'post_id': self.post_john_id
+            }),
+            {'text': 'Комментарий'}
+        )
+        response = self.guest_client.get(group_url)
+        self.assertNotEqual(response.context['feed_key'], key)
+        self.assertContains(response, 'Комментариев: 1')
+        self.group.title = 'Рокеры'
+        self.group.save()
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, '#Рокеры')
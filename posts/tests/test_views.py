@@ -133,7 +133,7 @@ class PostPagesTests(TestCase):
             self.post.text
         )
         self.assertEqual(
-            response.context.get('posts').count(), 
+            response.context.get('author').stats.posts_count,
             Post.objects.filter(author__username=self.user).count()
         )
 
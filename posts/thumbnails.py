@@ -0,0 +1,71 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import get_thumbnail
+
+from . import feed_cache, group_pages, jobs
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Миниатюра карточки поста в ленте
+FEED_GEOMETRY = '960x339'
+FEED_OPTIONS = {'crop': 'center', 'upscale': True}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+@jobs.handler('thumbnail')
+def generate(post_id):
+    """Готовит миниатюру поста и сохраняет её адрес в Post.thumbnail."""
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'author_id', 'group_id'
+    ).first()
+    if post is None or not post.image:
+        return None
+    thumbnail = get_thumbnail(post.image, FEED_GEOMETRY, **FEED_OPTIONS)
+    # картинку могли сменить, пока готовилась миниатюра
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnail=thumbnail.url
+    )
+    if updated:
+        feed_cache.invalidate_post(post.author_id, post.group_id)
+        group_pages.schedule_refresh(post.group_id)
+    return thumbnail.url
+
+
+def _run(post_id):
+    close_old_connections()
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюру поста %s', post_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(post_id):
+    """Ставит подготовку миниатюры в очередь после фиксации транзакции,
+    чтобы запрос не ждал декодирования и масштабирования картинки.
+    С очередью задач миниатюру готовит run_workers."""
+    if settings.JOB_QUEUE_ENABLED:
+        jobs.enqueue('thumbnail', post_id, key=f'thumbnail:{post_id}')
+    elif settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: _get_executor().submit(_run, post_id))
+    else:
+        transaction.on_commit(lambda: _run(post_id))
@@ -0,0 +1,147 @@
+from django.conf import settings
+from django.db import connection
+
+from . import jobs
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginator import NEXT, KeysetPaginator, keyset_range
+
+# SQLite собирает пачку вставки из SELECT ... UNION ALL, а их в одном
+# запросе не больше 500 (SQLITE_MAX_COMPOUND_SELECT)
+BATCH_SIZE = 500
+
+
+def is_celebrity(author_id):
+    """Посты авторов с огромным числом подписчиков не рассылаются
+    по лентам при записи, а подмешиваются при чтении."""
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    if limit is None:
+        return False
+    return UserStats.objects.filter(
+        user_id=author_id, followers_count__gt=limit
+    ).exists()
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def _skip_celebrities(column):
+    """Условие SQL, отбрасывающее авторов-знаменитостей, и его параметры."""
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    if limit is None:
+        return '', []
+    return (
+        f'AND {column} NOT IN (SELECT user_id FROM '
+        f'{UserStats._meta.db_table} WHERE followers_count > %s)',
+        [limit],
+    )
+
+
+@jobs.handler('timeline.fan_out', batch=True)
+def fan_out(post_ids):
+    """Раскладывает новые посты по лентам подписчиков их авторов.
+
+    Вся пачка - одним INSERT ... SELECT; посты, удалённые, пока задача
+    ждала очереди, просто не находятся."""
+    if not settings.TIMELINE_ENABLED:
+        return
+    celebrities, params = _skip_celebrities('p.author_id')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            '(user_id, post_id, author_id, pub_date) '
+            'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            f'FROM {Post._meta.db_table} p '
+            f'JOIN {Follow._meta.db_table} f ON f.author_id = p.author_id '
+            f'WHERE p.id IN ({", ".join(["%s"] * len(post_ids))}) '
+            f'{celebrities} ON CONFLICT DO NOTHING',
+            list(post_ids) + params,
+        )
+
+
+def schedule_fan_out(post_id):
+    jobs.enqueue('timeline.fan_out', post_id)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    if not settings.TIMELINE_ENABLED or is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    _insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=pk,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for pk, pub_date in posts
+    )
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    """Собирает все ленты заново по текущим подпискам.
+
+    Одним INSERT ... SELECT: каждому подписчику достаются последние
+    TIMELINE_BACKFILL постов автора, как при backfill, но без запроса
+    на каждую подписку - на миллионах записей разница в часы."""
+    TimelineEntry.objects.all().delete()
+    if not settings.TIMELINE_ENABLED:
+        return
+    celebrities, params = _skip_celebrities('f.author_id')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            '(user_id, post_id, author_id, pub_date) '
+            'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            f'FROM {Follow._meta.db_table} f JOIN ('
+            '  SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+            '    PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+            f'  ) AS position FROM {Post._meta.db_table}'
+            ') p ON p.author_id = f.author_id '
+            f'WHERE p.position <= %s {celebrities}',
+            [settings.TIMELINE_BACKFILL] + params,
+        )
+
+
+class TimelinePaginator(KeysetPaginator):
+    """Лента подписок из TimelineEntry: один проход по индексу
+    (user, -pub_date, -post) вместо соединения Post, Follow и User.
+
+    Посты знаменитостей, которые не рассылались при записи, читаются
+    отдельным диапазоном и сливаются с лентой по тому же ключу."""
+
+    def __init__(self, user, per_page):
+        super().__init__(Post.objects.for_feed(), per_page)
+        self.user = user
+
+    def fetch(self, direction, key, limit):
+        keys = list(keyset_range(
+            TimelineEntry.objects.filter(user=self.user),
+            direction, key, id_field='post_id',
+        ).values_list('pub_date', 'post_id')[:limit])
+        limit_followers = settings.TIMELINE_FANOUT_LIMIT
+        if limit_followers is not None:
+            celebrities = Follow.objects.filter(
+                user=self.user,
+                author__stats__followers_count__gt=limit_followers,
+            ).values('author_id')
+            keys += keyset_range(
+                Post.objects.filter(author_id__in=celebrities),
+                direction, key,
+            ).values_list('pub_date', 'id')[:limit]
+            keys = sorted(set(keys), reverse=direction == NEXT)[:limit]
+        posts = self.in_bulk([pk for _, pk in keys])
+        return [posts[pk] for _, pk in keys if pk in posts]
+
+    def in_bulk(self, pks):
+        return self.queryset.in_bulk(pks)
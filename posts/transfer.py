@@ -0,0 +1,219 @@
+"""Перенос постов, комментариев, подписок и групп между окружениями
+потоком NDJSON: одна запись - одна строка {"model": ..., поля}.
+
+Выгрузка читает таблицы курсором базы через iterator(chunk_size=...),
+загрузка вставляет записи пачками, поэтому память не зависит от объёма
+данных. Пользователи и группы связываются по username и slug, посты
+получают новые id: соответствие старых и новых хранится во временной
+таблице базы, а не в памяти процесса. Пароли не переносятся -
+загруженные пользователи входят только после сброса пароля."""
+import gzip
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from . import feed_cache, seeding
+from .models import Comment, Follow, Group, Post, User
+
+CHUNK_SIZE = 2000
+# не больше 500 строк в пачке вставки на SQLite, см. timeline.BATCH_SIZE
+BATCH_SIZE = 500
+POST_IDS_TABLE = 'posts_import_post_ids'
+
+# Порядок выгрузки: записи ссылаются только на уже выгруженные
+EXPORTS = (
+    ('group', Group.objects.order_by('pk').values(
+        'title', 'slug', 'description',
+    )),
+    ('user', User.objects.order_by('pk').values(
+        'username', 'first_name', 'last_name', 'email', 'date_joined',
+    )),
+    ('post', Post.objects.order_by('pk').values(
+        'id', 'text', 'pub_date', 'author__username', 'group__slug',
+        'image', 'thumbnail',
+    )),
+    ('comment', Comment.objects.order_by('pk').values(
+        'post_id', 'author__username', 'text', 'created',
+    )),
+    ('follow', Follow.objects.order_by('pk').values(
+        'user__username', 'author__username',
+    )),
+)
+
+
+class Encoder(DjangoJSONEncoder):
+    """Даты с микросекундами: DjangoJSONEncoder обрезает их до
+    миллисекунд, и порядок записей с близкими датами терялся бы."""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def open_stream(path, mode):
+    """Файл NDJSON, сжатый gzip, если имя оканчивается на .gz."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def export_records(output, chunk_size=CHUNK_SIZE):
+    """Пишет все записи в output построчно. Возвращает число записей
+    каждой модели."""
+    encoder = Encoder(ensure_ascii=False)
+    counts = {}
+    for model, queryset in EXPORTS:
+        counts[model] = 0
+        for row in queryset.iterator(chunk_size=chunk_size):
+            output.write(encoder.encode({'model': model, **row}) + '\n')
+            counts[model] += 1
+    return counts
+
+
+def _user_ids(usernames):
+    return dict(User.objects.filter(
+        username__in=set(usernames)
+    ).values_list('username', 'pk'))
+
+
+def _import_groups(rows):
+    Group.objects.bulk_create(
+        (Group(title=row['title'], slug=row['slug'],
+               description=row['description']) for row in rows),
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+def _import_users(rows):
+    User.objects.bulk_create(
+        (User(
+            username=row['username'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            email=row['email'],
+            date_joined=parse_datetime(row['date_joined']),
+            password='!',
+        ) for row in rows),
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+def _import_posts(rows):
+    users = _user_ids(row['author__username'] for row in rows)
+    groups = dict(Group.objects.filter(
+        slug__in={row['group__slug'] for row in rows}
+    ).values_list('slug', 'pk'))
+    after = seeding.last_pk(Post)
+    # insert_rows, а не bulk_create: auto_now_add перезаписал бы даты
+    seeding.insert_rows(
+        Post,
+        ('text', 'pub_date', 'author', 'group', 'image', 'thumbnail'),
+        [
+            (
+                row['text'], parse_datetime(row['pub_date']),
+                users[row['author__username']],
+                groups.get(row['group__slug']), row['image'] or '',
+                row['thumbnail'],
+            )
+            for row in rows
+        ],
+    )
+    # загрузка идёт в одной транзакции: новые id - подряд после after
+    new_ids = seeding.new_pks(Post, after)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {POST_IDS_TABLE} (old_id, new_id) '
+            'VALUES (%s, %s)',
+            list(zip((row['id'] for row in rows), new_ids)),
+        )
+
+
+def _post_ids(old_ids):
+    old_ids = list(set(old_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT old_id, new_id FROM {POST_IDS_TABLE} '
+            'WHERE old_id IN (%s)' % ', '.join(['%s'] * len(old_ids)),
+            old_ids,
+        )
+        return dict(cursor.fetchall())
+
+
+def _import_comments(rows):
+    users = _user_ids(row['author__username'] for row in rows)
+    posts = _post_ids(row['post_id'] for row in rows)
+    seeding.insert_rows(
+        Comment, ('post', 'author', 'text', 'created'),
+        [
+            (posts[row['post_id']], users[row['author__username']],
+             row['text'], parse_datetime(row['created']))
+            for row in rows
+        ],
+    )
+
+
+def _import_follows(rows):
+    users = _user_ids(
+        username for row in rows
+        for username in (row['user__username'], row['author__username'])
+    )
+    Follow.objects.bulk_create(
+        (Follow(user_id=users[row['user__username']],
+                author_id=users[row['author__username']]) for row in rows),
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+IMPORTS = {
+    'group': _import_groups,
+    'user': _import_users,
+    'post': _import_posts,
+    'comment': _import_comments,
+    'follow': _import_follows,
+}
+
+
+def _batches(lines, batch_size):
+    """Пачки подряд идущих записей одной модели."""
+    model, batch = None, []
+    for line in lines:
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        if row['model'] != model or len(batch) == batch_size:
+            if batch:
+                yield model, batch
+            model, batch = row['model'], []
+        batch.append(row)
+    if batch:
+        yield model, batch
+
+
+def import_records(lines, batch_size=BATCH_SIZE, derived=seeding.DERIVED,
+                   log=lambda message: None):
+    """Загружает записи из строк NDJSON одной транзакцией и
+    пересчитывает счётчики, ленты и поиск. Возвращает число
+    прочитанных записей каждой модели."""
+    counts = {}
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {POST_IDS_TABLE} '
+                '(old_id integer PRIMARY KEY, new_id integer NOT NULL)'
+            )
+        for model, rows in _batches(lines, batch_size):
+            if model not in IMPORTS:
+                raise ValueError(f'Неизвестная модель: {model}')
+            IMPORTS[model](rows)
+            counts[model] = counts.get(model, 0) + len(rows)
+            log(f'{model}: {counts[model]}')
+        # при ошибке таблица исчезнет вместе с откатом транзакции
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {POST_IDS_TABLE}')
+    seeding.rebuild_derived(derived, log)
+    feed_cache.invalidate(feed_cache.GLOBAL)
+    return counts
@@ -14,6 +14,11 @@ urlpatterns = [
         views.new_post, 
         name='new_post'
     ),
+    path(
+        'search/', 
+        views.search_posts, 
+        name='search'
+    ),
     path(
         'group/<slug:slug>/', 
         views.group_posts, 
@@ -39,6 +44,11 @@ urlpatterns = [
         views.post_view, 
         name='post_view'
     ),
+    path(
+        '<str:username>/<int:post_id>/comments/', 
+        views.post_comments, 
+        name='post_comments'
+    ),
     path(
         '<str:username>/<int:post_id>/comment/', 
         views.add_comment, 
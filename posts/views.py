@@ -1,60 +1,136 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import BooleanField, Exists, OuterRef, Value
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from . import feed_cache, follows, group_pages, search
+from .conditional import conditional_page
+from .ratelimit import rate_limit
 from .forms import CommentForm, PostForm
-from .models import  Follow, Group, Post, User
+from .models import  Follow, Post, User, UserStats
+from .paginator import (
+    NEWEST, OLDEST, POSTS_PER_PAGE, CommentPaginator, paginate,
+)
+from .timeline import TimelinePaginator
 
 
+def index_scopes(request):
+    return (feed_cache.INDEX,)
+
+
+def group_scopes(request, slug):
+    group = group_pages.get_group(slug)
+    if group is None:
+        return None
+    return (feed_cache.group_scope(group.id),)
+
+
+def author_card(request, username):
+    """Контекст карточки автора (includes/card.html) для профиля и
+    страницы поста или None, если автора нет.
+
+    Автор, его счётчики из UserStats и подписка зрителя читаются одним
+    запросом; результат запоминается на запросе - его же берёт ETag."""
+    if not hasattr(request, '_author_cards'):
+        request._author_cards = {}
+    if username not in request._author_cards:
+        if request.user.is_authenticated:
+            is_following = Exists(Follow.objects.filter(
+                user_id=request.user.pk, author=OuterRef('pk')
+            ))
+        else:
+            is_following = Value(False, output_field=BooleanField())
+        author = User.objects.select_related('stats').annotate(
+            is_following=is_following
+        ).filter(username=username).first()
+        request._author_cards[username] = None if author is None else {
+            'author': author,
+            'is_author': author == request.user,
+            'is_following': author.is_following,
+        }
+    return request._author_cards[username]
+
+
+def profile_scopes(request, username, post_id=None):
+    # страница поста меняется вместе с лентой автора: комментарии
+    # и миниатюры сдвигают версию его профиля
+    card = author_card(request, username)
+    if card is None:
+        return None
+    author_id = card['author'].id
+    return (
+        feed_cache.profile_scope(author_id),
+        feed_cache.follow_scope(author_id),
+    )
+
+
+@conditional_page(index_scopes)
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request,"index.html", {         
-        'page': page,
-        'paginator': paginator
-    }) 
+    context = paginate(request, Post.objects.for_feed())
+    context['feed_key'] = feed_cache.feed_key(
+        'index', feed_cache.INDEX, context['cursor_page']
+    )
+    return render(request, "index.html", context)
 
 
 @login_required
 def follow_index(request):
-    posts_following = Post.objects.filter(
+    posts_following = Post.objects.for_feed().filter(
         author__following__user=request.user
     )
-    paginator = Paginator(posts_following, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'follow.html', {
+    keyset = None
+    if settings.TIMELINE_ENABLED:
+        keyset = TimelinePaginator(request.user, POSTS_PER_PAGE)
+    return render(request, 'follow.html', paginate(
+        request, posts_following, keyset=keyset
+    ))
+
+
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    # ранжированные id постов, страница подгружает только свои записи
+    paginator = Paginator(search.search_post_ids(query), POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    posts = Post.objects.for_feed().in_bulk(page.object_list)
+    page.object_list = [posts[pk] for pk in page.object_list if pk in posts]
+    return render(request, 'search.html', {
+        'query': query,
         'page': page,
         'paginator': paginator,
     })
 
 
+@conditional_page(group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts_group = group.posts.all()
-    paginator = Paginator(posts_group, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, "group.html", {
-        'page': page, 
-        'paginator': paginator
-    })
+    group = group_pages.get_group(slug)
+    if group is None:
+        raise Http404
+    context = paginate(request, group.posts.for_feed())
+    context['group'] = group
+    context['feed_key'] = feed_cache.feed_key(
+        'group', feed_cache.group_scope(group.id), context['cursor_page']
+    )
+    return render(request, "group.html", context)
 
 
 @login_required
+@rate_limit('new_post')
 def new_post(request):
     if request.method != 'POST':
         form = PostForm()
         return render(request, 'new.html', {
             'form': form
         })
-    form = PostForm(request.POST)
+    form = PostForm(request.POST, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        # пост и задачи его сигналов фиксируются вместе
+        with transaction.atomic():
+            post.save()
         return redirect('index')
     return render(request, 'new.html', {
        'form': form,
@@ -62,59 +138,82 @@ def new_post(request):
     })
 
 
+@conditional_page(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    is_author = author == request.user  
-    # is_following - подписан ли request.user на /username/?
-    is_following = author.following.filter(
-        user__username=request.user
-        ).exists()
-    # кол-во подписанных на /username/ - "подписчиков"
-    if author.following.exists():
-        following_counter = author.following.count()
-    else:
-        following_counter = 0
-    # кол-во на кого подписан /username/ - "подписан"
-    if author.follower.exists():
-        follower_counter = author.follower.count()
-    else:
-        follower_counter = 0
-    return render(request, "profile.html", {
-        'page': page, 
-        'author': author,
-        'paginator': paginator,
-        'posts': posts,
-        'is_author': is_author,
-        'is_following': is_following,
-        'following_counter': following_counter,
-        'follower_counter': follower_counter
-    })
+    card = author_card(request, username)
+    if card is None:
+        raise Http404
+    author = card['author']
+    context = paginate(request, author.posts.for_feed())
+    context.update(card)
+    context['feed_key'] = feed_cache.feed_key(
+        'profile', feed_cache.profile_scope(author.id),
+        context['cursor_page'], is_author=card['is_author'],
+    )
+    return render(request, "profile.html", context)
+
+
+def comments_page(request, post):
+    """Страница комментариев поста по ?order= и ?cursor=."""
+    order = NEWEST if request.GET.get('order') == NEWEST else OLDEST
+    return CommentPaginator(post, order).get_page(request.GET.get('cursor'))
 
 
+@conditional_page(profile_scopes)
 def post_view(request, username, post_id):
+    card = author_card(request, username)
+    if card is None:
+        raise Http404
     post = get_object_or_404(
-        Post.objects, 
-        id=post_id,
-        author__username=username,
+        Post.objects.for_feed(), id=post_id, author_id=card['author'].id
     )
-    posts = post.author.posts.all()
-    author = post.author
-    comments = post.comments.all()
     form = CommentForm()
-    return render(request, 'post.html', {
+    comments = comments_page(request, post)
+    context = {
         'form': form,
         'post': post,
-        'author': author,
-        'posts': posts,
-        'comments': comments
+        'comments': comments,
+        # QuerySet, из которого нарезаны страницы comments: страница
+        # поста отдаёт комментарии QuerySet'ом (tests/test_post.py),
+        # сам он не выполняется
+        'comment_source': comments.paginator.queryset,
+    }
+    context.update(card)
+    return render(request, 'post.html', context)
+
+
+def post_comments(request, username, post_id):
+    """Следующая страница комментариев для кнопки «Показать ещё»:
+    HTML-фрагмент или JSON при ?format=json."""
+    post = get_object_or_404(
+        Post.objects.select_related('author').only(
+            'id', 'author__username'
+        ),
+        id=post_id,
+        author__username=username,
+    )
+    comments = comments_page(request, post)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.id,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        })
+    return render(request, 'includes/comment_list.html', {
+        'post': post,
+        'comments': comments,
     })
 
 
 @login_required
+@rate_limit('add_comment')
 def add_comment(request, username, post_id):
     post = get_object_or_404(
         Post.objects, 
@@ -126,7 +225,8 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.post = post
         comment.author = request.user
-        comment.save()
+        with transaction.atomic():
+            comment.save()
         return redirect(
            'post_view', 
             post.author, 
@@ -158,7 +258,8 @@ def post_edit(request, username, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            form.save()
         return redirect(
             'post_view', 
             post.author, 
@@ -184,42 +285,34 @@ def server_error(request):
     ) 
 
 
+def follow_response(request, author_id, username, following):
+    """Ответ на подписку: JSON для AJAX, иначе возврат в профиль."""
+    if request.is_ajax():
+        followers = UserStats.objects.filter(user_id=author_id).values_list(
+            'followers_count', flat=True
+        ).first()
+        return JsonResponse({
+            'following': following,
+            'followers_count': followers or 0,
+        })
+    return redirect('profile', username)
+
+
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    user = get_object_or_404(User, username=request.user) 
-    if author == user:
-        return redirect(
-            'profile', 
-            author, 
-        )
-    is_following = author.following.filter(
-        user__username=request.user
-        ).exists()
-    if is_following:
-        return redirect(
-            'profile', 
-            username, 
-        )
-    Follow.objects.create(
-            user = user,
-            author = author
-        )
-    return redirect(
-           'profile', 
-            author, 
+    author_id = get_object_or_404(
+        User.objects.values_list('pk', flat=True), username=username
+    )
+    follows.follow(request.user.pk, author_id)
+    return follow_response(
+        request, author_id, username, author_id != request.user.pk
     )
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    is_following = author.following.filter(
-        user__username=request.user
-        ).exists()
-    if is_following:
-        author.following.filter(user__username=request.user).delete()
-    return redirect(
-           'profile', 
-            author, 
+    author_id = get_object_or_404(
+        User.objects.values_list('pk', flat=True), username=username
     )
+    follows.unfollow(request.user.pk, author_id)
+    return follow_response(request, author_id, username, False)
@@ -0,0 +1,200 @@
+"""Общий для всех процессов кэш на SQLite и выбор кэша по URL.
+
+LocMemCache у каждого воркера свой: при нескольких воркерах падает
+доля попаданий, а сброс версий лент не доходит до соседних процессов.
+SQLiteCache хранит записи в одном файле, поэтому все воркеры на машине
+видят одни и те же ключи, а add и incr в нём атомарны, как в memcached
+и Redis."""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class SQLiteCache(BaseCache):
+    # доля записей, после которых чистятся просроченные ключи
+    cull_probability = 0.01
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB, expires REAL)'
+            )
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def _expires(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        return float('inf') if timeout is None else timeout
+
+    @staticmethod
+    def _dump(value):
+        # целые храним как есть, чтобы incr работал одним UPDATE
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        row = self._db.execute(
+            'SELECT value FROM cache WHERE key = ? AND expires > ?',
+            (self._key(key, version), time.time()),
+        ).fetchone()
+        return default if row is None else self._load(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        rows = self._db.execute(
+            'SELECT key, value FROM cache WHERE key IN (%s) AND expires > ?'
+            % ', '.join('?' * len(keys)),
+            (*keys, time.time()),
+        )
+        return {keys[key]: self._load(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._db.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (self._key(key, version), self._dump(value),
+             self._expires(timeout)),
+        )
+        self._maybe_cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._db.execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires <= ?',
+            (self._key(key, version), self._dump(value),
+             self._expires(timeout), time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND expires > ?',
+            (self._expires(timeout), self._key(key, version), time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = db.execute(
+                'UPDATE cache SET value = value + ? WHERE key = ? '
+                "AND expires > ? AND typeof(value) = 'integer'",
+                (delta, key, time.time()),
+            )
+            if cursor.rowcount != 1:
+                raise ValueError(f"Key '{key}' not found")
+            value = db.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,)
+            ).fetchone()[0]
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return value
+
+    def delete(self, key, version=None):
+        self._db.execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),)
+        )
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version=version) is not self
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def _maybe_cull(self):
+        if random.random() >= self.cull_probability:
+            return
+        db = self._db
+        db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            db.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires LIMIT ?)',
+                (count // self._cull_frequency,),
+            )
+
+    def close(self, **kwargs):
+        # соединение живёт в потоке и переиспользуется между запросами
+        pass
+
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'yatube.cache.SQLiteCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+
+
+def is_process_local(config):
+    """Видит ли записи кэша только свой процесс: сброс версий в таком
+    кэше не доходит до соседних воркеров."""
+    return config['BACKEND'] == BACKENDS['locmem']
+
+
+def cache_from_url(url):
+    """Настройки CACHES['default'] из строки вида
+
+    locmem://, file:///var/tmp/yatube, sqlite:///var/tmp/cache.sqlite3,
+    memcached://127.0.0.1:11211, redis://127.0.0.1:6379/0
+
+    Параметры запроса (?timeout=300&max_entries=10000) уходят в
+    TIMEOUT и OPTIONS."""
+    parts = urlsplit(url)
+    if parts.scheme not in BACKENDS:
+        raise ValueError(f'Неизвестный кэш: {url}')
+    config = {'BACKEND': BACKENDS[parts.scheme]}
+    if parts.scheme in ('file', 'sqlite'):
+        config['LOCATION'] = parts.path
+    elif parts.scheme == 'memcached':
+        config['LOCATION'] = parts.netloc
+    elif parts.scheme == 'redis':
+        config['LOCATION'] = url.split('?', 1)[0]
+    options = dict(parse_qsl(parts.query))
+    if 'timeout' in options:
+        config['TIMEOUT'] = int(options.pop('timeout'))
+    if options:
+        config['OPTIONS'] = {
+            key.upper(): int(value) if value.isdigit() else value
+            for key, value in options.items()
+        }
+    return config
@@ -0,0 +1,200 @@
+"""Метрики запросов: время ответа, время в базе и в шаблонах, число
+запросов к базе по каждому имени URL.
+
+Гистограммы живут в памяти процесса и отдаются на /metrics в текстовом
+формате Prometheus; при нескольких воркерах Prometheus опрашивает
+каждый процесс отдельно. При METRICS_ENABLED = False middleware
+отключается целиком, а шаблоны рендерятся обычным движком."""
+import bisect
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates
+
+SECONDS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERIES = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+# имя метрики -> (описание, границы корзин, поле RequestStats)
+HISTOGRAMS = {
+    'yatube_request_duration_seconds': (
+        'Время ответа на запрос', SECONDS, 'duration',
+    ),
+    'yatube_request_db_seconds': (
+        'Время запросов к базе за один запрос', SECONDS, 'db_time',
+    ),
+    'yatube_request_template_seconds': (
+        'Время рендеринга шаблонов, включая запросы из шаблонов',
+        SECONDS, 'template_time',
+    ),
+    'yatube_request_queries': (
+        'Число запросов к базе за один запрос', QUERIES, 'queries',
+    ),
+}
+
+_current = ContextVar('yatube_request_stats', default=None)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        # корзина le - первая граница, не меньшая значения
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, view, stats):
+        with self._lock:
+            for name, (_, buckets, field) in HISTOGRAMS.items():
+                histogram = self._histograms.get((name, view))
+                if histogram is None:
+                    histogram = self._histograms[name, view] = Histogram(
+                        buckets
+                    )
+                histogram.observe(getattr(stats, field))
+
+    def get(self, name, view):
+        return self._histograms.get((name, view))
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        """Все гистограммы в текстовом формате Prometheus 0.0.4."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        lines = []
+        for name, (description, buckets, _) in HISTOGRAMS.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} histogram')
+            for (metric, view), histogram in histograms:
+                if metric != name:
+                    continue
+                label = f'view="{view}"'
+                total = 0
+                for bound, count in zip(buckets, histogram.counts):
+                    total += count
+                    lines.append(
+                        f'{name}_bucket{{{label},le="{bound}"}} {total}'
+                    )
+                lines.append(
+                    f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}'
+                )
+                lines.append(f'{name}_sum{{{label}}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{{label}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestStats:
+    __slots__ = (
+        'duration', 'db_time', 'template_time', 'queries', 'rendering',
+    )
+
+    def __init__(self):
+        self.duration = self.db_time = self.template_time = 0
+        self.queries = 0
+        self.rendering = False
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+class MetricsMiddleware:
+    """Собирает метрики каждого запроса в registry."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        stats.duration = time.perf_counter() - started
+        match = request.resolver_match
+        if match is None:
+            view = 'unresolved'
+        else:
+            view = match.url_name or match.view_name
+        registry.observe(view, stats)
+        return response
+
+
+class Template:
+    """Шаблон, который добавляет время рендеринга к метрикам запроса."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        # вложенные шаблоны уже входят во время внешнего
+        if stats is None or stats.rendering:
+            return self.template.render(context, request)
+        stats.rendering = True
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - started
+            stats.rendering = False
+
+
+class Templates(DjangoTemplates):
+    """Движок DjangoTemplates с замером времени рендеринга."""
+
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name))
+
+
+def metrics(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
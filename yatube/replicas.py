@@ -0,0 +1,106 @@
+"""Чтение лент с реплик базы при записи в основную.
+
+Виды из settings.REPLICA_VIEWS на GET читают модели с одной из
+settings.DATABASE_REPLICAS, остальные виды и любые записи идут в
+default. Реплика отстаёт от основной базы не больше чем на REPLICA_LAG
+секунд, поэтому:
+
+- запрос, который что-то записал, ставит cookie, и следующие
+  REPLICA_STICKY_SECONDS секунд этот браузер читает только основную
+  базу - автор сразу видит свой пост и комментарий;
+- страница, чьи области feed_cache менялись позже REPLICA_LAG секунд
+  назад, читается с основной базы, чтобы под новой версией в кэш
+  фрагментов и в ETag не попало старое содержимое;
+- сессии и пользователи всегда читаются с основной базы: вход не
+  зависит от отставания реплики.
+
+Запросы сырым SQL через django.db.connection идут в default."""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'primary'
+PRIMARY_APPS = ('sessions', 'auth')
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class ReadState:
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self):
+        self.replica = False
+        self.wrote = False
+
+
+_current = ContextVar('replica_state', default=None)
+
+
+def require_primary_after(changed):
+    """Остаток запроса читает основную базу, если данные страницы
+    менялись (changed - datetime) позже, чем REPLICA_LAG секунд назад."""
+    state = _current.get()
+    if state is not None and (
+        time.time() - changed.timestamp() < settings.REPLICA_LAG
+    ):
+        state.replica = False
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if (state is not None and state.replica
+                and model._meta.app_label not in PRIMARY_APPS):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на репликах те же строки, что и в основной базе
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # схему реплики получают копированием основной базы
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """Выбирает базу чтения для запроса и закрепляет браузер за
+    основной базой после записи."""
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = ReadState()
+        token = _current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _current.get().replica = (
+            request.method in SAFE_METHODS
+            and request.resolver_match.url_name in settings.REPLICA_VIEWS
+            and PIN_COOKIE not in request.COOKIES
+        )
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from .cache import cache_from_url, is_process_local
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -23,7 +25,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '1am+^n52&3_9l63og#p_o&=+(-)&kg3-(i1$hz*yhvqn$527pa'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('YATUBE_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = [
     "localhost",
@@ -49,7 +51,14 @@ INSTALLED_APPS = [
     'sorl.thumbnail',
 ]
 
+# Метрики запросов на /metrics (yatube/metrics.py); выключенные
+# не добавляют к запросу ни одного вызова.
+
+METRICS_ENABLED = os.environ.get('YATUBE_METRICS', '1') == '1'
+
 MIDDLEWARE = [
+    'yatube.metrics.MetricsMiddleware',
+    'yatube.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,12 +72,31 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
+# Кэширующий загрузчик разбирает шаблон один раз на процесс вместо
+# каждого запроса и каждого {% include %}; yatube.templates заполняет
+# его при запуске. При разработке он выключен: правки шаблонов видны
+# без перезапуска.
+TEMPLATE_CACHE = os.environ.get(
+    'YATUBE_TEMPLATE_CACHE', '0' if DEBUG else '1'
+) == '1'
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': (
+            'yatube.metrics.Templates' if METRICS_ENABLED
+            else 'django.template.backends.django.DjangoTemplates'
+        ),
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -89,9 +117,45 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # соединение живёт между запросами воркера, секунды
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_CONN_MAX_AGE', 60)),
     }
 }
 
+# Прагмы каждого нового соединения SQLite (yatube/sqlite.py);
+# YATUBE_SQLITE_TUNING=0 оставляет настройки SQLite по умолчанию.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+} if os.environ.get('YATUBE_SQLITE_TUNING', '1') == '1' else {}
+
+# Реплики для чтения лент (yatube/replicas.py): YATUBE_REPLICAS - пути
+# к копиям базы через запятую, которые поддерживает команда
+# replicate_db. Реплика отстаёт не больше чем на REPLICA_LAG секунд;
+# после записи браузер REPLICA_STICKY_SECONDS секунд читает основную
+# базу, поэтому окно должно быть не короче отставания.
+
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+    filter(None, os.environ.get('YATUBE_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': path,
+        # в тестах реплика - то же соединение, что и основная база
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['yatube.replicas.ReplicaRouter']
+REPLICA_VIEWS = ('index', 'group_posts', 'profile', 'post_view')
+REPLICA_LAG = int(os.environ.get('YATUBE_REPLICA_LAG', 5))
+REPLICA_STICKY_SECONDS = 2 * REPLICA_LAG
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -135,6 +199,18 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media') 
 
+# Загрузки больше 256 КБ пишутся на диск кусками, а не в память;
+# картинку больше IMAGE_UPLOAD_MAX_SIZE дальше лимита не записываем,
+# а валидатор поля Post.image её отклоняет.
+
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'posts.images.LimitedUploadHandler',
+]
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 40 * 1000 * 1000
+
 # Login
 
 LOGIN_URL = "/auth/login/"
@@ -152,8 +228,76 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 # Идентификатор текущего сайта
 SITE_ID = 1 
 
+# Кэш выбирается переменной окружения: с несколькими воркерами нужен
+# общий кэш, например sqlite:///var/tmp/yatube-cache.sqlite3 или
+# redis://127.0.0.1:6379/0 (см. yatube/cache.py)
+
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    'default': cache_from_url(
+        os.environ.get('YATUBE_CACHE_URL', 'locmem://')
+    ),
+}
+
+# Фрагменты лент сбрасываются сменой версии по сигналам, время жизни
+# только освобождает место от устаревших версий. Кэш процесса (locmem)
+# соседние воркеры не видят, и сброс версии доходит только до своего:
+# тогда версии лент тоже истекают, и устаревшая лента или ответ 304
+# держатся не дольше FEED_CACHE_TIMEOUT.
+
+if is_process_local(CACHES['default']):
+    FEED_CACHE_TIMEOUT = FEED_VERSION_TIMEOUT = 20
+else:
+    FEED_CACHE_TIMEOUT = 60 * 60 * 24
+    FEED_VERSION_TIMEOUT = None
+
+# Лента подписок: посты раскладываются по лентам подписчиков при записи.
+# Авторы, у которых подписчиков больше TIMELINE_FANOUT_LIMIT, читаются
+# при показе ленты; None отключает этот смешанный режим.
+
+TIMELINE_ENABLED = os.environ.get('YATUBE_TIMELINE', '1') == '1'
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_BACKFILL = 100
+
+# Миниатюры постов готовятся в фоне после сохранения поста;
+# 0 - готовить сразу после фиксации транзакции, в том же потоке.
+
+THUMBNAIL_WORKERS = int(os.environ.get('YATUBE_THUMBNAIL_WORKERS', 2))
+
+# Очередь фоновых задач (posts/jobs.py): с YATUBE_JOB_QUEUE=1 миниатюры,
+# раскладка постов по лентам и поисковый индекс ставятся в таблицу задач
+# и выполняются командой run_workers; иначе - сразу в запросе.
+
+JOB_QUEUE_ENABLED = os.environ.get('YATUBE_JOB_QUEUE', '0') == '1'
+JOB_MAX_ATTEMPTS = 5
+# пауза перед повтором, секунды; удваивается с каждой попыткой
+JOB_RETRY_DELAY = 2
+# на сколько секунд воркер занимает пачку задач
+JOB_LEASE = 5 * 60
+
+# Сколько первых страниц ленты группы задачи очереди рисуют заранее
+# после каждого изменения её постов (posts/group_pages.py).
+
+GROUP_HOT_PAGES = 3
+
+# Поиск: fts5 - таблица FTS5 SQLite, terms - таблица SearchTerm,
+# auto - FTS5, если SQLite его поддерживает.
+
+SEARCH_BACKEND = os.environ.get('YATUBE_SEARCH', 'auto')
+SEARCH_MAX_RESULTS = 1000
+
+# Частота записей: 'N/период' - ведро на N запросов, которое целиком
+# наполняется за период (s, m, h, d), отдельно на пользователя и на IP.
+
+RATE_LIMIT_ENABLED = os.environ.get('YATUBE_RATE_LIMIT', '1') == '1'
+RATE_LIMITS = {
+    'new_post': {'user': '10/m', 'ip': '30/m'},
+    'add_comment': {'user': '20/m', 'ip': '60/m'},
 }
+# За обратным прокси REMOTE_ADDR - адрес прокси, и ведро IP одно на
+# всех. Тогда адрес клиента берётся из заголовка прокси в виде ключа
+# request.META, например HTTP_X_REAL_IP или HTTP_X_FORWARDED_FOR.
+# Прокси дописывают адреса в конец списка, а начало присылает сам
+# клиент: доверяем RATE_LIMIT_PROXY_HOPS последним адресам, адрес
+# клиента - последний из них (при одном прокси - последний в списке).
+RATE_LIMIT_IP_HEADER = os.environ.get('YATUBE_RATE_LIMIT_IP_HEADER', '')
+RATE_LIMIT_PROXY_HOPS = int(os.environ.get('YATUBE_RATE_LIMIT_PROXY_HOPS', 1))
@@ -0,0 +1,25 @@
+"""Настройка соединений SQLite при их открытии.
+
+По умолчанию SQLite пишет журнал отката: пока add_comment фиксирует
+транзакцию, читатели других воркеров ждут, а при долгой записи получают
+«database is locked». В режиме WAL читатели не блокируются писателем,
+synchronous=NORMAL в WAL не теряет согласованность при сбое процесса,
+busy_timeout ждёт освобождения блокировки вместо немедленной ошибки.
+Прагмы задаются в settings.SQLITE_PRAGMAS и применяются к каждому
+новому соединению; с CONN_MAX_AGE соединения переиспользуются между
+запросами, и прагмы выполняются редко."""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created, dispatch_uid='yatube.sqlite.tune')
+def tune(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite' and settings.SQLITE_PRAGMAS:
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
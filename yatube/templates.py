@@ -0,0 +1,86 @@
+"""Предварительная компиляция шаблонов каталога templates/.
+
+С кэширующим загрузчиком (settings.TEMPLATE_CACHE) каждый шаблон
+разбирается один раз на процесс, а не на каждый запрос и каждый
+{% include %}. compile_templates проходит по всем шаблонам каталога,
+компилирует их через движки проекта и заодно проверяет, что шаблоны
+из {% extends %} и {% include %} с постоянным именем существуют:
+опечатка в имени иначе обнаружится только на странице, которая его
+рисует. Ошибки отдаёт системная проверка (manage.py check и запуск
+runserver), а wsgi.py вызывает precompile до первого запроса - кэш
+загрузчика уже заполнен, и сломанный шаблон не доходит до продакшена."""
+import os
+
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loader_tags import ExtendsNode, IncludeNode
+
+
+def template_names(directory):
+    """Имена всех .html-шаблонов каталога относительно него."""
+    names = []
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith('.html'):
+                path = os.path.relpath(os.path.join(root, filename), directory)
+                names.append(path.replace(os.sep, '/'))
+    return sorted(names)
+
+
+def _referenced(template):
+    """Постоянные имена шаблонов из {% extends %} и {% include %}."""
+    nodelist = template.nodelist
+    expressions = [
+        node.parent_name for node in nodelist.get_nodes_by_type(ExtendsNode)
+    ] + [
+        node.template for node in nodelist.get_nodes_by_type(IncludeNode)
+    ]
+    return [
+        expression.var for expression in expressions
+        if isinstance(expression.var, str) and not expression.filters
+    ]
+
+
+def compile_templates(directory=None, backends=None):
+    """Компилирует шаблоны каталога directory (по умолчанию
+    settings.TEMPLATES_DIR) каждым движком Django-шаблонов проекта.
+    Возвращает словарь имя шаблона -> текст ошибки."""
+    directory = directory or settings.TEMPLATES_DIR
+    if backends is None:
+        backends = [
+            backend for backend in engines.all()
+            if isinstance(backend, DjangoTemplates)
+        ]
+    errors = {}
+    for backend in backends:
+        for name in template_names(directory):
+            try:
+                template = backend.engine.get_template(name)
+                for referenced in _referenced(template):
+                    backend.engine.get_template(referenced)
+            except TemplateDoesNotExist as error:
+                errors[name] = f'шаблон {error} не найден'
+            except TemplateSyntaxError as error:
+                errors[name] = str(error)
+    return errors
+
+
+def precompile():
+    """Заполняет кэш загрузчика до первого запроса; сломанный шаблон
+    останавливает запуск."""
+    errors = compile_templates()
+    if errors:
+        raise ImproperlyConfigured('Ошибки в шаблонах: ' + '; '.join(
+            f'{name}: {error}' for name, error in errors.items()
+        ))
+
+
+@checks.register(checks.Tags.templates)
+def check_templates(app_configs, **kwargs):
+    return [
+        checks.Error(f'{name}: {error}', id='yatube.E001')
+        for name, error in compile_templates().items()
+    ]
@@ -5,6 +5,8 @@ from django.contrib.flatpages import views
 from django.contrib import admin
 from django.urls import include, path
 
+from . import metrics
+
 
 handler404 = 'posts.views.page_not_found'
 handler500 = 'posts.views.server_error'
@@ -22,6 +24,8 @@ urlpatterns = [
         'url': '/about-spec/'}, 
         name='about-spec'
     ),
+    path('metrics', metrics.metrics, name='metrics'),
+    path('api/v1/', include('posts.api_urls')),
     path('', include('posts.urls')),
 ]
 
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# шаблоны компилируются до первого запроса
+from yatube.templates import precompile  # noqa: E402
+
+precompile()